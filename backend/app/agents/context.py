@@ -0,0 +1,125 @@
+"""
+Token-budgeted context assembly for the RAG prompt.
+
+Retrieval returns more candidate chunks than fit in the prompt. Neighbouring
+chunks of the same file/page overlap (CHUNK_OVERLAP_TOKENS), so they are stitched
+into one span and near-duplicates are dropped. The highest-scoring spans are
+then packed into CONTEXT_TOKEN_BUDGET.
+"""
+
+import re
+from typing import Optional
+
+from langchain_core.documents import Document
+
+
+CHARS_PER_TOKEN = 4  # Rough average for English prose with Llama-family tokenizers
+MIN_OVERLAP_CHARS = 20  # Shorter suffix/prefix matches are treated as coincidence
+NEAR_DUPLICATE_SIMILARITY = 0.8  # Word-shingle Jaccard similarity
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a piece of text."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _location(metadata: dict) -> tuple:
+    """The file/page a chunk came from; only chunks sharing one are merged."""
+    return (metadata.get("filename") or metadata.get("source"), metadata.get("page"))
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    for length in range(min(len(left), len(right), max_overlap), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+class ContextSpan:
+    """Contiguous text from one file/page, built from one or more chunks."""
+
+    def __init__(self, text: str, score: float, metadata: dict):
+        self.text = text
+        self.score = score
+        self.metadata = metadata
+        self.shingles = _shingles(text)
+
+    def absorb(self, text: str, max_overlap: int) -> bool:
+        """Merge an overlapping or duplicate chunk into this span; False if unrelated."""
+        if text in self.text:
+            return True
+        if self.text in text:
+            self.text = text
+        elif (length := _overlap(self.text, text, max_overlap)):
+            self.text += text[length:]
+        elif (length := _overlap(text, self.text, max_overlap)):
+            self.text = text + self.text[length:]
+        else:
+            shingles = _shingles(text)
+            union = len(shingles | self.shingles)
+            return union > 0 and len(shingles & self.shingles) / union >= NEAR_DUPLICATE_SIMILARITY
+        self.shingles = _shingles(self.text)
+        return True
+
+
+def _trim(text: str, max_tokens: int) -> str:
+    """Cut text to a token budget, at a sentence (or word) boundary where possible."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind(". "), cut.rfind(".\n"))
+    if boundary > limit // 2:
+        return cut[:boundary + 1]
+    return cut.rsplit(" ", 1)[0]
+
+
+def build_context(
+    scored_docs: list[tuple[Document, float]],
+    token_budget: int,
+    max_overlap: int,
+) -> list[ContextSpan]:
+    """
+    Collapse overlapping chunks and pack the best spans into a token budget.
+
+    Args:
+        scored_docs: Retrieved (document, similarity) pairs, best first.
+        token_budget: Maximum estimated tokens of context text.
+        max_overlap: Longest overlap to look for between chunks, in characters.
+
+    Returns:
+        The selected spans, best first.
+    """
+    spans: list[ContextSpan] = []
+    for doc, score in scored_docs:
+        location = _location(doc.metadata)
+        target: Optional[ContextSpan] = next(
+            (s for s in spans if _location(s.metadata) == location and s.absorb(doc.page_content, max_overlap)),
+            None,
+        )
+        if target is None:
+            spans.append(ContextSpan(
+                text=doc.page_content,
+                score=score,
+                metadata=dict(doc.metadata),
+            ))
+
+    packed: list[ContextSpan] = []
+    remaining = token_budget
+    for span in spans:
+        tokens = estimate_tokens(span.text)
+        if tokens > remaining:
+            if packed:
+                continue  # A smaller, lower-ranked span may still fit
+            # Always keep (part of) the best match
+            span.text = _trim(span.text, remaining)
+            tokens = estimate_tokens(span.text)
+        packed.append(span)
+        remaining -= tokens
+    return packed
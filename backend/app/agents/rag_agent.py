@@ -2,19 +2,46 @@
 LangGraph-based RAG Agent for AML Policy FAQ Bot.
 """
 
+import asyncio
+import logging
 import re
-from typing import AsyncGenerator
+import time
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
 
+from app.agents.context import build_context
+from app.cache.faq import get_faq_index
+from app.cache.semantic_cache import get_answer_cache, scope_key
+from app.cache.singleflight import SingleFlight
+from app.core import metrics
 from app.core.config import init_settings
-from app.schemas import SourceDocument, StreamChunk
+from app.core.resources import registry
+from app.embeddings.chunking import MAX_CHARS_PER_TOKEN
+from app.embeddings.embedder import normalize_query_text
+from app.embeddings.vecstore import (
+    batch_search,
+    build_metadata_filter,
+    dense_search,
+    get_vector_store,
+    is_hybrid,
+    reciprocal_rank_fusion,
+    sparse_search,
+)
+from app.schemas import BatchQueryResult, QueryRequest, QueryResponse, SourceDocument, StreamChunk
+
+
+logger = logging.getLogger(__name__)
 
 
 class RAGState(MessagesState):
     """Extended MessagesState for RAG pipeline."""
     question: str
+    jurisdiction: Optional[str]
+    policy_filter: Optional[list[str]]
+    query_vector: Optional[list[float]]
     context: str
     sources: list[SourceDocument]
     escalate: bool
@@ -42,6 +69,73 @@ def clean_response(text: str) -> str:
     return text
 
 
+class ThinkBlockFilter:
+    """
+    Incrementally strip <think>...</think> blocks from a token stream.
+    
+    A small state machine: text is passed through until an opening tag,
+    swallowed until the closing tag, and any trailing fragment that could be
+    the start of a tag is held back until the next chunk decides it. Leading
+    and trailing whitespace is trimmed like `clean_response` does.
+    """
+    
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+    
+    def __init__(self):
+        self._buffer = ""
+        self._in_think = False
+        self._started = False
+        self._pending_ws = ""
+    
+    def feed(self, text: str) -> str:
+        """Consume a chunk and return the text that is safe to emit."""
+        self._buffer += text
+        out = []
+        while True:
+            tag = self.CLOSE_TAG if self._in_think else self.OPEN_TAG
+            idx = self._buffer.find(tag)
+            if idx != -1:
+                if not self._in_think:
+                    out.append(self._buffer[:idx])
+                self._buffer = self._buffer[idx + len(tag):]
+                self._in_think = not self._in_think
+                continue
+            
+            keep = _partial_tag_length(self._buffer, tag)
+            if not self._in_think:
+                out.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return self._emit("".join(out))
+    
+    def flush(self) -> str:
+        """Return whatever is left once the stream has ended."""
+        # An unterminated think block is reasoning, never shown to the user
+        tail = "" if self._in_think else self._buffer
+        self._buffer = ""
+        return self._emit(tail).rstrip()
+    
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._pending_ws + text
+        stripped = text.rstrip()
+        self._pending_ws = text[len(stripped):]
+        return stripped
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of `text` that is a proper prefix of `tag`."""
+    for size in range(min(len(text), len(tag) - 1), 0, -1):
+        if tag.startswith(text[-size:]):
+            return size
+    return 0
+
+
 SYSTEM_PROMPT = """You are an AML compliance assistant. Answer based ONLY on the context.
 
 RULES:
@@ -53,13 +147,29 @@ CONTEXT:
 {context}
 """
 
+ESCALATION_MESSAGE = "No relevant information found. Please escalate."
+
+
+def _flight_key(question: str, jurisdiction: Optional[str], policy_filter: Optional[list[str]]) -> tuple:
+    """Requests with the same key are duplicates and share one pipeline run."""
+    return (normalize_query_text(question), scope_key(jurisdiction, policy_filter))
+
+
+def _within_gap(scored_docs: list, relative_gap: float) -> list:
+    """Keep (document, score) pairs scoring within `relative_gap` of the best one."""
+    if not scored_docs:
+        return scored_docs
+    cutoff = scored_docs[0][1] * (1 - relative_gap)
+    return [(doc, score) for doc, score in scored_docs if score >= cutoff]
+
 
 class RAGAgent:
     """RAG Agent using LangGraph."""
     
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, llm: ChatNVIDIA | None = None):
         self.vector_store = vector_store
-        self.llm = get_llm()
+        self.llm = llm or get_llm()
+        self._flights = SingleFlight()  # Identical questions currently being answered
         self._build_graph()
     
     def _build_graph(self):
@@ -72,36 +182,171 @@ class RAGAgent:
         self.graph = graph.compile()
     
     async def _retrieve(self, state: RAGState) -> dict:
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": 3})
-        docs = await retriever.ainvoke(state["question"])
+        settings = init_settings()
+        # Qdrant drops matches below the similarity floor, so an off-topic
+        # question comes back empty and escalates without an LLM call
+        metadata_filter = build_metadata_filter(state.get("jurisdiction"), state.get("policy_filter"))
+        
+        # Reuse the cache-lookup embedding when there is one; otherwise go through
+        # the async (memoized, micro-batched) embedding path
+        query_vector = state.get("query_vector")
+        if query_vector is None:
+            query_vector = await self.vector_store.embeddings.aembed_query(state["question"])
+        dense = dense_search(
+            self.vector_store,
+            query_vector,
+            settings.RETRIEVAL_CANDIDATES,
+            settings.RETRIEVAL_SCORE_THRESHOLD,
+            metadata_filter,
+        )
+        with metrics.timer("aml_search_seconds"):
+            if is_hybrid(self.vector_store):
+                # BM25 runs alongside the dense search and needs no embedding call
+                scored_docs, sparse_docs = await asyncio.gather(
+                    dense,
+                    sparse_search(self.vector_store, state["question"], settings.RETRIEVAL_CANDIDATES, metadata_filter),
+                )
+            else:
+                scored_docs, sparse_docs = await dense, []
+        return self._assemble_context(scored_docs, sparse_docs)
+    
+    def _assemble_context(self, scored_docs: list, sparse_docs: list) -> dict:
+        """Turn dense and BM25 hits into the prompt context, sources and escalation flag."""
+        settings = init_settings()
+        
+        # Relative gap: drop matches much weaker than the best one (e.g. BM25
+        # hits on a single common word)
+        scored_docs = _within_gap(scored_docs, settings.RETRIEVAL_RELATIVE_GAP)
+        sparse_docs = _within_gap(sparse_docs, settings.RETRIEVAL_RELATIVE_GAP)
+        for doc, score in scored_docs:
+            doc.metadata["score"] = round(score, 4)
+        
+        # Escalation still depends on the dense similarity floor alone; lexical
+        # matches only re-rank and add to a question that is in scope
+        escalate = len(scored_docs) == 0
+        if not escalate and sparse_docs:
+            scored_docs = reciprocal_rank_fusion(
+                [[doc for doc, _ in scored_docs], [doc for doc, _ in sparse_docs]],
+                k=settings.RRF_K,
+            )
+            for doc, score in scored_docs:
+                doc.metadata["rrf_score"] = round(score, 4)
+        
+        # Stitch overlapping chunks and keep the best spans within the prompt budget
+        spans = build_context(
+            scored_docs, settings.CONTEXT_TOKEN_BUDGET, settings.CHUNK_OVERLAP_TOKENS * MAX_CHARS_PER_TOKEN
+        )
         
         context_parts = []
         sources = []
         
-        for i, doc in enumerate(docs):
-            context_parts.append(f"[Doc {i+1}]\n{doc.page_content}")
-            sources.append(SourceDocument(content=doc.page_content[:500], metadata=doc.metadata))
+        for i, span in enumerate(spans):
+            context_parts.append(f"[Doc {i+1}]\n{span.text}")
+            sources.append(SourceDocument(content=span.text[:500], metadata=span.metadata))
         
         return {
             "context": "\n\n".join(context_parts),
             "sources": sources,
-            "escalate": len(docs) == 0
+            "escalate": escalate
         }
     
+    def _build_prompt(self, state: RAGState) -> list:
+        return [
+            SystemMessage(content=SYSTEM_PROMPT.format(context=state["context"])),
+            HumanMessage(content=state["question"])
+        ]
+    
     async def _generate(self, state: RAGState) -> dict:
         if state.get("escalate"):
-            return {"messages": [AIMessage(content="No relevant information found. Please escalate.")]}
+            return {"messages": [AIMessage(content=ESCALATION_MESSAGE)]}
         
-        response = await self.llm.ainvoke([
-            SystemMessage(content=SYSTEM_PROMPT.format(context=state["context"])),
-            HumanMessage(content=state["question"])
-        ])
+        with metrics.timer("aml_llm_total_seconds"):
+            response = await self.llm.ainvoke(self._build_prompt(state))
+        metrics.record_token_usage(response)
         return {"messages": [response]}
     
-    async def query(self, question: str, **kwargs) -> dict:
+    async def _check_faq(
+        self,
+        question: str,
+        jurisdiction: Optional[str],
+        policy_filter: Optional[list[str]],
+    ) -> Optional[QueryResponse]:
+        """The curated answer for a canonical question, if the FAQ has one."""
+        faq_index = get_faq_index()
+        if faq_index is None:
+            return None
+        try:
+            return await faq_index.match(question, jurisdiction, policy_filter)
+        except Exception as e:
+            # The FAQ is a shortcut; questions still get answered without it
+            logger.warning(f"FAQ lookup failed: {e}")
+            return None
+    
+    async def _check_cache(
+        self,
+        question: str,
+        jurisdiction: Optional[str],
+        policy_filter: Optional[list[str]],
+    ) -> tuple[Optional[list[float]], Optional[QueryResponse]]:
+        """Embed the question and look it up in the answer cache, if enabled."""
+        if get_answer_cache() is None:
+            return None, None
+        query_vector = await self.vector_store.embeddings.aembed_query(question)
+        return query_vector, get_answer_cache().lookup(query_vector, jurisdiction, policy_filter)
+    
+    async def query(
+        self,
+        question: str,
+        jurisdiction: Optional[str] = None,
+        policy_filter: Optional[list[str]] = None,
+    ) -> dict:
+        """Answer a question; concurrent identical questions share one run."""
+        if not init_settings().SINGLE_FLIGHT_ENABLED:
+            return await self._query(question, jurisdiction, policy_filter)
+        return await self._flights.call(
+            _flight_key(question, jurisdiction, policy_filter),
+            lambda: self._query(question, jurisdiction, policy_filter),
+        )
+    
+    async def stream_query(
+        self,
+        question: str,
+        jurisdiction: Optional[str] = None,
+        policy_filter: Optional[list[str]] = None,
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Stream an answer; concurrent identical questions get the same chunks fanned out."""
+        if not init_settings().SINGLE_FLIGHT_ENABLED:
+            chunks = self._stream_query(question, jurisdiction, policy_filter)
+        else:
+            chunks = self._flights.stream(
+                _flight_key(question, jurisdiction, policy_filter),
+                lambda: self._stream_query(question, jurisdiction, policy_filter),
+            )
+        # Closing early (client cancelled) propagates to the LLM stream
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+    
+    async def _query(
+        self,
+        question: str,
+        jurisdiction: Optional[str],
+        policy_filter: Optional[list[str]],
+    ) -> dict:
+        faq_hit = await self._check_faq(question, jurisdiction, policy_filter)
+        if faq_hit is not None:
+            return {"answer": faq_hit.answer, "sources": faq_hit.sources, "escalate": False, "faq_id": faq_hit.faq_id}
+        
+        query_vector, cached = await self._check_cache(question, jurisdiction, policy_filter)
+        if cached is not None:
+            return {"answer": cached.answer, "sources": cached.sources, "escalate": cached.escalate}
+        
         result = await self.graph.ainvoke({
             "messages": [HumanMessage(content=question)],
             "question": question,
+            "jurisdiction": jurisdiction,
+            "policy_filter": policy_filter,
+            "query_vector": query_vector,
             "context": "",
             "sources": [],
             "escalate": False
@@ -110,28 +355,209 @@ class RAGAgent:
         answer = next((m.content for m in reversed(result["messages"]) if isinstance(m, AIMessage)), "")
         # Clean the response to remove <think> tags
         answer = clean_response(answer)
+        
+        if query_vector is not None:
+            get_answer_cache().store(
+                query_vector,
+                QueryResponse(answer=answer, sources=result["sources"], escalate=result["escalate"]),
+                jurisdiction,
+                policy_filter,
+            )
         return {"answer": answer, "sources": result["sources"], "escalate": result["escalate"]}
     
-    async def stream_query(self, question: str, **kwargs) -> AsyncGenerator[StreamChunk, None]:
-        initial_state = {"messages": [HumanMessage(content=question)], "question": question, "context": "", "sources": [], "escalate": False}
+    async def _stream_query(
+        self,
+        question: str,
+        jurisdiction: Optional[str],
+        policy_filter: Optional[list[str]],
+    ) -> AsyncGenerator[StreamChunk, None]:
+        faq_hit = await self._check_faq(question, jurisdiction, policy_filter)
+        if faq_hit is not None:
+            for source in faq_hit.sources:
+                yield StreamChunk(type="source", content=source.content, metadata=source.metadata)
+            yield StreamChunk(type="token", content=faq_hit.answer)
+            yield StreamChunk(type="done", content="", metadata={"faq_id": faq_hit.faq_id})
+            return
+        
+        query_vector, cached = await self._check_cache(question, jurisdiction, policy_filter)
+        if cached is not None:
+            for source in cached.sources:
+                yield StreamChunk(type="source", content=source.content, metadata=source.metadata)
+            yield StreamChunk(type="token", content=cached.answer)
+            yield StreamChunk(type="done", content="")
+            return
+        
+        initial_state = {
+            "messages": [HumanMessage(content=question)],
+            "question": question,
+            "jurisdiction": jurisdiction,
+            "policy_filter": policy_filter,
+            "query_vector": query_vector,
+            "context": "",
+            "sources": [],
+            "escalate": False,
+        }
         
+        # Retrieve once, outside the graph, so sources can go out immediately
         retrieve_result = await self._retrieve(initial_state)
         initial_state.update(retrieve_result)
         
+        for source in initial_state["sources"]:
+            yield StreamChunk(type="source", content=source.content, metadata=source.metadata)
+        
         if initial_state["escalate"]:
-            yield StreamChunk(type="token", content="No relevant information found. Please escalate.")
+            yield StreamChunk(type="token", content=ESCALATION_MESSAGE)
             yield StreamChunk(type="done", content="")
             return
         
-        # Collect full response first, then clean and yield
-        full_response = ""
-        async for chunk, metadata in self.graph.astream(initial_state, stream_mode="messages"):
-            if isinstance(chunk, AIMessage) and hasattr(chunk, 'content') and chunk.content:
-                full_response += chunk.content
+        # Forward LLM tokens as they arrive, dropping <think> blocks on the fly
+        think_filter = ThinkBlockFilter()
+        answer_parts = []
+        usage = None
+        started = time.perf_counter()
+        first_token_at = None
+        # Closed on exit, so a client disconnect ends the upstream request at once
+        async with aclosing(self.llm.astream(self._build_prompt(initial_state))) as stream:
+            async for chunk in stream:
+                if first_token_at is None and chunk.content:
+                    first_token_at = time.perf_counter()
+                if chunk.usage_metadata:
+                    usage = chunk
+                text = think_filter.feed(chunk.content) if chunk.content else ""
+                if text:
+                    answer_parts.append(text)
+                    yield StreamChunk(type="token", content=text)
+        
+        if first_token_at is not None:
+            metrics.observe("aml_llm_ttft_seconds", first_token_at - started)
+        metrics.observe("aml_llm_total_seconds", time.perf_counter() - started)
+        if usage is not None:
+            metrics.record_token_usage(usage)
+        
+        tail = think_filter.flush()
+        if tail:
+            answer_parts.append(tail)
+            yield StreamChunk(type="token", content=tail)
         
-        # Clean the response (remove <think> tags)
-        cleaned = clean_response(full_response)
-        if cleaned:
-            yield StreamChunk(type="token", content=cleaned)
+        if query_vector is not None:
+            get_answer_cache().store(
+                query_vector,
+                QueryResponse(answer="".join(answer_parts), sources=initial_state["sources"]),
+                jurisdiction,
+                policy_filter,
+            )
         
         yield StreamChunk(type="done", content="")
+    
+    async def query_batch(self, requests: list[QueryRequest]) -> AsyncGenerator[BatchQueryResult, None]:
+        """
+        Answer many questions, yielding each result as soon as it is ready.
+        
+        All questions are embedded together and searched in a single Qdrant
+        batch request; FAQ and cache hits and escalations come back first, then LLM
+        answers with at most BATCH_QUERY_CONCURRENCY generations in flight.
+        A failing question yields a result with `error` set instead of
+        aborting the batch.
+        """
+        settings = init_settings()
+        answer_cache = get_answer_cache()
+        faq_index = get_faq_index()
+        if faq_index is not None:
+            try:
+                await faq_index.ensure_loaded()
+            except Exception as e:
+                logger.warning(f"FAQ unavailable for this batch: {e}")
+                faq_index = None
+        
+        try:
+            query_vectors = await self.vector_store.embeddings.aembed_queries([r.question for r in requests])
+        except Exception as e:
+            for index in range(len(requests)):
+                yield BatchQueryResult(index=index, error=f"Embedding failed: {e}")
+            return
+        
+        pending = []
+        for index, (request, query_vector) in enumerate(zip(requests, query_vectors)):
+            cached = None
+            if faq_index is not None:
+                cached = faq_index.lookup(request.question, query_vector, request.jurisdiction, request.policy_filter)
+            if cached is None and answer_cache is not None:
+                cached = answer_cache.lookup(query_vector, request.jurisdiction, request.policy_filter)
+            if cached is not None:
+                yield BatchQueryResult(index=index, **cached.model_dump())
+            else:
+                pending.append(index)
+        if not pending:
+            return
+        
+        try:
+            with metrics.timer("aml_search_seconds"):
+                hits = await batch_search(
+                    self.vector_store,
+                    [
+                        (
+                            query_vectors[i],
+                            requests[i].question,
+                            build_metadata_filter(requests[i].jurisdiction, requests[i].policy_filter),
+                        )
+                        for i in pending
+                    ],
+                    k=settings.RETRIEVAL_CANDIDATES,
+                    score_threshold=settings.RETRIEVAL_SCORE_THRESHOLD,
+                )
+        except Exception as e:
+            for index in pending:
+                yield BatchQueryResult(index=index, error=f"Search failed: {e}")
+            return
+        
+        semaphore = asyncio.Semaphore(settings.BATCH_QUERY_CONCURRENCY)
+        
+        async def answer(index: int, state: dict) -> BatchQueryResult:
+            request = requests[index]
+            try:
+                async with semaphore:
+                    result = await self._generate(state)
+                response = QueryResponse(
+                    answer=clean_response(result["messages"][-1].content),
+                    sources=state["sources"],
+                )
+            except Exception as e:
+                logger.error(f"Batch query {index} failed: {e}")
+                return BatchQueryResult(index=index, error=str(e))
+            if answer_cache is not None:
+                answer_cache.store(query_vectors[index], response, request.jurisdiction, request.policy_filter)
+            return BatchQueryResult(index=index, **response.model_dump())
+        
+        tasks = []
+        try:
+            for index, (dense_docs, sparse_docs) in zip(pending, hits):
+                state = {"question": requests[index].question, **self._assemble_context(dense_docs, sparse_docs)}
+                if state["escalate"]:
+                    response = QueryResponse(answer=ESCALATION_MESSAGE, sources=state["sources"], escalate=True)
+                    if answer_cache is not None:
+                        answer_cache.store(
+                            query_vectors[index], response, requests[index].jurisdiction, requests[index].policy_filter
+                        )
+                    yield BatchQueryResult(index=index, **response.model_dump())
+                else:
+                    tasks.append(asyncio.create_task(answer(index, state)))
+            
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # The client went away: stop generating answers nobody will read
+            for task in tasks:
+                task.cancel()
+
+
+registry.register("llm", get_llm)
+registry.register(
+    "rag_agent",
+    lambda: RAGAgent(get_vector_store(), registry.get("llm")),
+    depends_on=("vector_store", "llm"),
+)
+
+
+def get_rag_agent() -> RAGAgent:
+    """Get the shared RAG agent with its compiled graph (created on first use)."""
+    return registry.get("rag_agent")
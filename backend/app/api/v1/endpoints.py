@@ -4,6 +4,7 @@ API endpoints for the AML Policy FAQ Bot.
 This module provides:
 - WebSocket endpoint for streaming Q&A
 - HTTP endpoints for document ingestion
+- HTTP endpoints for managing curated FAQ answers
 - Health check endpoint
 """
 
@@ -12,9 +13,13 @@ import logging
 from typing import Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 
 from app.schemas import (
+    BatchQueryRequest,
+    FaqEntry,
+    FaqEntryRequest,
     QueryRequest,
     QueryResponse,
     IngestResponse,
@@ -22,9 +27,14 @@ from app.schemas import (
     StreamChunk,
     DocumentMetadata,
 )
-from app.agents.rag_agent import RAGAgent
-from app.embeddings.vecstore import get_vector_store, add_documents_to_store
-from app.utils.file_parser import parse_multiple_files, get_supported_extensions
+from app.core import metrics
+from app.core.config import init_settings
+from app.core.health import get_health_checker
+from app.utils.file_parser import get_supported_extensions
+
+# The RAG agent, vector store and ingestion modules pull in LangGraph,
+# LangChain NVIDIA and the Qdrant SDK; routes import them on first use so a
+# cold start that only serves / or /health doesn't pay for them.
 
 
 logger = logging.getLogger(__name__)
@@ -35,36 +45,48 @@ router = APIRouter()
 
 @router.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check() -> HealthResponse:
-    """Check the health status of the API."""
-    vector_store_ok = True
-    llm_ok = True
-    
-    # Check vector store (works with both OpenSearch and Chroma)
-    try:
-        vector_store = get_vector_store()
-        # Use similarity_search - works with all vector stores
-        _ = vector_store.similarity_search("health check", k=1)
-    except Exception as e:
-        logger.error(f"Vector store health check failed: {e}")
-        vector_store_ok = False
-    
-    return HealthResponse(
-        status="healthy" if (vector_store_ok and llm_ok) else "degraded",
-        vector_store_available=vector_store_ok,
-        llm_available=llm_ok
+    """Check the health status of the API (cached readiness)."""
+    return await get_health_checker().readiness()
+
+
+@router.get("/health/live", tags=["Health"])
+async def liveness() -> dict:
+    """Liveness probe: the process is up and serving. No I/O."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=HealthResponse, tags=["Health"])
+async def readiness() -> JSONResponse:
+    """Readiness probe: 503 while Qdrant or the NVIDIA API is unavailable."""
+    health = await get_health_checker().readiness()
+    return JSONResponse(
+        status_code=200 if health.status == "healthy" else 503,
+        content=health.model_dump(),
     )
 
 
+@router.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics() -> PlainTextResponse:
+    """Pipeline stage latencies and token counts in Prometheus text format."""
+    if not metrics.enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled (set METRICS_ENABLED=true)")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # ============== Document Ingestion ==============
 
-@router.post("/ingest", response_model=IngestResponse, tags=["Ingestion"])
+@router.post("/ingest", response_model=IngestResponse, status_code=202, tags=["Ingestion"])
 async def ingest_documents(
     files: list[UploadFile] = File(..., description="Policy documents to ingest"),
     policy_name: Optional[str] = Form(default=None, description="Policy name for metadata"),
     jurisdiction: Optional[str] = Form(default=None, description="Jurisdiction for metadata"),
     version: Optional[str] = Form(default=None, description="Document version"),
 ) -> IngestResponse:
-    """Ingest policy documents into the vector store."""
+    """
+    Stage policy documents for ingestion and return a job ID immediately.
+    
+    Poll GET /ingest/{job_id} for per-file progress.
+    """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
     
@@ -76,35 +98,27 @@ async def ingest_documents(
     if version:
         metadata["version"] = version
     
-    documents, errors = await parse_multiple_files(files, metadata)
-    
-    if errors:
-        logger.warning(f"File parsing errors: {errors}")
-    
-    if not documents:
-        raise HTTPException(
-            status_code=400,
-            detail=f"No documents could be parsed. Errors: {errors}"
-        )
-    
     try:
-        chunks_created = await add_documents_to_store(documents)
+        from app.ingestion.jobs import submit_job
+        
+        return await submit_job(files, metadata)
     except Exception as e:
-        logger.error(f"Failed to add documents to vector store: {e}")
+        logger.error(f"Failed to queue ingestion job: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to store documents: {str(e)}"
+            detail=f"Failed to queue documents: {str(e)}"
         )
+
+
+@router.get("/ingest/{job_id}", response_model=IngestResponse, tags=["Ingestion"])
+async def get_ingest_job(job_id: str) -> IngestResponse:
+    """Get the status of an ingestion job."""
+    from app.ingestion.jobs import get_job
     
-    message = f"Successfully processed {len(documents)} document(s)"
-    if errors:
-        message += f". Warnings: {len(errors)} file(s) had issues"
-    
-    return IngestResponse(
-        message=message,
-        documents_processed=len(files) - len(errors),
-        chunks_created=chunks_created
-    )
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job: {job_id}")
+    return job
 
 
 @router.get("/supported-formats", tags=["Ingestion"])
@@ -119,8 +133,9 @@ async def get_supported_formats() -> dict:
 async def query_sync(request: QueryRequest) -> QueryResponse:
     """Submit a question and receive a complete answer."""
     try:
-        vector_store = get_vector_store()
-        agent = RAGAgent(vector_store)
+        from app.agents.rag_agent import get_rag_agent
+        
+        agent = get_rag_agent()
         
         result = await agent.query(
             question=request.question,
@@ -131,7 +146,8 @@ async def query_sync(request: QueryRequest) -> QueryResponse:
         return QueryResponse(
             answer=result["answer"],
             sources=result["sources"],
-            escalate=result["escalate"]
+            escalate=result["escalate"],
+            faq_id=result.get("faq_id")
         )
         
     except Exception as e:
@@ -142,47 +158,118 @@ async def query_sync(request: QueryRequest) -> QueryResponse:
         )
 
 
+@router.post("/query/batch", tags=["Query"])
+async def query_batch(request: BatchQueryRequest) -> StreamingResponse:
+    """
+    Answer many questions in one call.
+    
+    Results stream back as NDJSON (one BatchQueryResult per line) in
+    completion order; `index` refers to the question's position in the request.
+    """
+    max_size = init_settings().BATCH_QUERY_MAX_SIZE
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    if len(request.queries) > max_size:
+        raise HTTPException(status_code=400, detail=f"At most {max_size} queries per batch")
+    
+    from app.agents.rag_agent import get_rag_agent
+    
+    agent = get_rag_agent()
+    
+    async def lines():
+        async for result in agent.query_batch(request.queries):
+            yield result.model_dump_json() + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# ============== Curated FAQ ==============
+
+@router.get("/faq", response_model=list[FaqEntry], tags=["FAQ"])
+async def list_faq() -> list[FaqEntry]:
+    """List the curated FAQ entries answered without the LLM."""
+    from app.cache.faq import get_faq_index
+    
+    faq_index = get_faq_index()
+    if faq_index is None:
+        raise HTTPException(status_code=404, detail="The FAQ is disabled (set FAQ_ENABLED=true)")
+    return await faq_index.list_entries()
+
+
+@router.put("/faq/{faq_id}", response_model=FaqEntry, tags=["FAQ"])
+async def put_faq(faq_id: str, request: FaqEntryRequest) -> FaqEntry:
+    """
+    Add or replace a curated FAQ entry.
+    
+    The question and its variants are embedded before the entry is stored;
+    matching questions get `answer` and `sources` back verbatim from then on.
+    """
+    from app.cache.faq import get_faq_index
+    
+    faq_index = get_faq_index()
+    if faq_index is None:
+        raise HTTPException(status_code=404, detail="The FAQ is disabled (set FAQ_ENABLED=true)")
+    try:
+        entry = FaqEntry(id=faq_id, **request.model_dump())
+    except ValidationError:
+        raise HTTPException(status_code=400, detail=f"Invalid FAQ ID: {faq_id}")
+    try:
+        await faq_index.put(entry)
+    except Exception as e:
+        logger.error(f"Failed to save FAQ entry {faq_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save FAQ entry: {str(e)}")
+    return entry
+
+
+@router.delete("/faq/{faq_id}", status_code=204, tags=["FAQ"])
+async def delete_faq(faq_id: str) -> None:
+    """Remove a curated FAQ entry."""
+    from app.cache.faq import get_faq_index
+    
+    faq_index = get_faq_index()
+    if faq_index is None:
+        raise HTTPException(status_code=404, detail="The FAQ is disabled (set FAQ_ENABLED=true)")
+    if not await faq_index.delete(faq_id):
+        raise HTTPException(status_code=404, detail=f"Unknown FAQ entry: {faq_id}")
+
+
 # ============== WebSocket Streaming ==============
 
 @router.websocket("/ws/query")
 async def query_websocket(websocket: WebSocket):
-    """WebSocket endpoint for streaming Q&A."""
+    """
+    WebSocket endpoint for streaming Q&A.
+    
+    Several questions can be in flight per connection; chunks are tagged
+    with their `request_id` and `{"type": "cancel", "request_id": ...}`
+    aborts one. See app.api.v1.websocket for the protocol.
+    """
     await websocket.accept()
     
+    session = None
     try:
-        vector_store = get_vector_store()
-        agent = RAGAgent(vector_store)
+        from app.agents.rag_agent import get_rag_agent
+        from app.api.v1.websocket import QuerySession
+        
+        settings = init_settings()
+        session = QuerySession(
+            websocket,
+            get_rag_agent(),
+            max_in_flight=settings.WS_MAX_IN_FLIGHT,
+            send_queue_size=settings.WS_SEND_QUEUE_SIZE,
+            send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+        )
         
         while True:
             try:
                 data = await websocket.receive_text()
                 message = json.loads(data)
             except json.JSONDecodeError:
-                await websocket.send_json({"type": "error", "content": "Invalid JSON format"})
+                await session.send(StreamChunk(type="error", content="Invalid JSON format"))
                 continue
             
-            if message.get("type") == "close":
+            if not await session.handle(message):
                 break
-            
-            question = message.get("question")
-            if not question:
-                await websocket.send_json({"type": "error", "content": "Missing 'question' field"})
-                continue
-            
-            jurisdiction = message.get("jurisdiction")
-            policy_filter = message.get("policy_filter")
-            
-            try:
-                async for chunk in agent.stream_query(
-                    question=question,
-                    jurisdiction=jurisdiction,
-                    policy_filter=policy_filter
-                ):
-                    await websocket.send_json(chunk.model_dump())
-                    
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                await websocket.send_json({"type": "error", "content": f"Error: {str(e)}"})
     
     except WebSocketDisconnect:
         logger.info("WebSocket client disconnected")
@@ -192,3 +279,6 @@ async def query_websocket(websocket: WebSocket):
             await websocket.close(code=1011, reason=str(e))
         except Exception:
             pass
+    finally:
+        if session is not None:
+            await session.close()
@@ -0,0 +1,161 @@
+"""
+Multiplexed WebSocket query sessions.
+
+Protocol (JSON messages):
+
+- `{"type": "query", "request_id": "q1", "question": "...", "jurisdiction": ..., "policy_filter": [...]}`
+  starts an answer. `type` defaults to "query" and `request_id` is assigned
+  by the server when omitted. Several questions may be in flight at once.
+- `{"type": "cancel", "request_id": "q1"}` aborts an answer, including the
+  LLM stream behind it; the server replies with a `cancelled` chunk.
+- `{"type": "close"}` ends the session.
+
+Every `StreamChunk` sent back carries the `request_id` it belongs to, and
+each answer ends with a `done`, `error` or `cancelled` chunk.
+
+Outgoing chunks go through a bounded queue drained by a single writer, so a
+client that reads slowly pauses its own answers rather than buffering them
+in memory; one that stops reading for WS_SEND_TIMEOUT_SECONDS has its
+answers abandoned.
+"""
+
+import asyncio
+import logging
+import uuid
+from contextlib import aclosing
+from typing import Optional
+
+from fastapi import WebSocket
+
+from app.schemas import StreamChunk
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlowClientError(Exception):
+    """The client stopped reading and the send queue stayed full."""
+
+
+class QuerySession:
+    """One WebSocket connection: concurrent questions, cancellation and a bounded send queue."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        agent,
+        max_in_flight: int = 4,
+        send_queue_size: int = 256,
+        send_timeout: float = 30.0,
+    ):
+        self.websocket = websocket
+        self.agent = agent
+        self.max_in_flight = max_in_flight
+        self.send_timeout = send_timeout
+        self._outbox: asyncio.Queue[StreamChunk] = asyncio.Queue(maxsize=send_queue_size)
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._writer = asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        while True:
+            chunk = await self._outbox.get()
+            await self.websocket.send_json(chunk.model_dump())
+
+    async def send(self, chunk: StreamChunk) -> None:
+        """Queue a chunk for the client, waiting while the queue is full."""
+        try:
+            await asyncio.wait_for(self._outbox.put(chunk), self.send_timeout)
+        except asyncio.TimeoutError:
+            raise SlowClientError(f"Client did not read for {self.send_timeout}s")
+
+    def _notify(self, chunk: StreamChunk) -> None:
+        """Queue a final status chunk without waiting (dropped if the client is that far behind)."""
+        try:
+            self._outbox.put_nowait(chunk)
+        except asyncio.QueueFull:
+            pass
+
+    async def handle(self, message) -> bool:
+        """Act on one client message; False once the client asked to close."""
+        if not isinstance(message, dict):
+            await self.send(StreamChunk(type="error", content="Expected a JSON object"))
+            return True
+        kind = message.get("type") or "query"
+        request_id = message.get("request_id")
+        request_id = str(request_id) if request_id is not None else None
+
+        if kind == "close":
+            return False
+        if kind == "cancel":
+            task = self._in_flight.get(request_id)
+            if task is None:
+                await self.send(StreamChunk(type="error", content="Unknown request_id", request_id=request_id))
+            else:
+                task.cancel()
+            return True
+        if kind != "query":
+            await self.send(StreamChunk(type="error", content=f"Unknown message type: {kind}", request_id=request_id))
+            return True
+
+        question = message.get("question")
+        if not question:
+            await self.send(StreamChunk(type="error", content="Missing 'question' field", request_id=request_id))
+            return True
+        if request_id is None:
+            request_id = uuid.uuid4().hex[:12]
+        elif request_id in self._in_flight:
+            await self.send(StreamChunk(type="error", content="request_id already in flight", request_id=request_id))
+            return True
+        if len(self._in_flight) >= self.max_in_flight:
+            await self.send(StreamChunk(
+                type="error",
+                content=f"Too many questions in flight (max {self.max_in_flight})",
+                request_id=request_id,
+            ))
+            return True
+
+        task = asyncio.create_task(self._answer(
+            request_id, question, message.get("jurisdiction"), message.get("policy_filter")
+        ))
+        self._in_flight[request_id] = task
+        task.add_done_callback(lambda t: self._forget(request_id, t))
+        return True
+
+    def _forget(self, request_id: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(request_id) is task:
+            del self._in_flight[request_id]
+
+    async def _answer(
+        self,
+        request_id: str,
+        question: str,
+        jurisdiction: Optional[str],
+        policy_filter: Optional[list[str]],
+    ) -> None:
+        try:
+            # aclosing: on cancel, close the stream now so the LLM request is aborted
+            async with aclosing(self.agent.stream_query(
+                question=question,
+                jurisdiction=jurisdiction,
+                policy_filter=policy_filter,
+            )) as chunks:
+                async for chunk in chunks:
+                    # Chunks may be shared with other listeners of the same answer
+                    await self.send(chunk.model_copy(update={"request_id": request_id}))
+        except asyncio.CancelledError:
+            self._notify(StreamChunk(type="cancelled", request_id=request_id))
+            raise
+        except SlowClientError as e:
+            logger.warning(f"Abandoned WebSocket request {request_id}: {e}")
+        except Exception as e:
+            logger.error(f"Streaming error: {e}")
+            self._notify(StreamChunk(type="error", content=f"Error: {str(e)}", request_id=request_id))
+
+    async def close(self) -> None:
+        """Cancel every answer still running and stop the writer."""
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
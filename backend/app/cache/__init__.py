@@ -0,0 +1,13 @@
+"""Caching layers in front of the RAG pipeline."""
+
+from app.cache.faq import FaqIndex, get_faq_index
+from app.cache.semantic_cache import SemanticCache, get_answer_cache
+from app.cache.singleflight import SingleFlight
+
+__all__ = [
+    "FaqIndex",
+    "SemanticCache",
+    "SingleFlight",
+    "get_answer_cache",
+    "get_faq_index",
+]
@@ -0,0 +1,294 @@
+"""
+Curated FAQ answers served without retrieval or the LLM.
+
+Compliance keeps a list of canonical questions with approved answers and
+the policy excerpts they rest on (FaqEntry). Every question and its listed
+variants are embedded once, when the FAQ is loaded, into an in-memory matrix.
+An incoming question that matches one of them - exactly after whitespace and
+case normalization, or by cosine similarity of at least FAQ_THRESHOLD - gets
+the approved answer and pinned sources back verbatim. The same question then
+always gets the same answer, and a hit costs at most one (memoized) query
+embedding and a matrix-vector product.
+
+Entries are scoped by the question's filters: one with a `jurisdiction`
+only answers questions asked without a jurisdiction or with that one (an
+entry without one applies everywhere), and a question with a policy filter
+only matches entries whose `policy_name` is in it.
+
+The FAQ is a JSON list of entries kept in FAQ_PATH, or under FAQ_S3_KEY in
+S3_BUCKET when it is set, and edited through the /faq endpoints. Other
+containers pick up edits within FAQ_REFRESH_SECONDS.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from app.core import metrics
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.embeddings.embedder import normalize_query_text
+from app.schemas import FaqEntry, QueryResponse
+
+
+logger = logging.getLogger(__name__)
+
+_ENTRIES = TypeAdapter(list[FaqEntry])
+
+
+def _question_key(text: str) -> str:
+    return normalize_query_text(text).casefold()
+
+
+# ============== Storage ==============
+
+class FaqStore(ABC):
+    """Where the FAQ file is kept."""
+
+    @abstractmethod
+    def read_text(self) -> Optional[str]:
+        """The FAQ file's contents, or None if there is none yet."""
+
+    @abstractmethod
+    def write_text(self, text: str) -> None:
+        """Replace the FAQ file."""
+
+
+class LocalFaqStore(FaqStore):
+    """FAQ file on the local filesystem (local development, single host)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read_text(self) -> Optional[str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write_text(self, text: str) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Write-then-rename so readers never see a half-written file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+
+class S3FaqStore(FaqStore):
+    """FAQ file in S3, shared by every Lambda container."""
+
+    def __init__(self, bucket: str, key: str):
+        import boto3  # Deferred: only needed when the FAQ lives in S3
+
+        self.bucket = bucket
+        self.key = key
+        self.client = boto3.client("s3")
+
+    def read_text(self) -> Optional[str]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read().decode("utf-8")
+
+    def write_text(self, text: str) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Body=text.encode("utf-8"),
+            ContentType="application/json",
+        )
+
+
+# ============== Index ==============
+
+class FaqIndex:
+    """The loaded FAQ: entries, their exact-match keys and question embedding matrix."""
+
+    def __init__(self, store: FaqStore, embeddings, threshold: float, refresh_seconds: float):
+        self.store = store
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self._text: Optional[str] = None
+        self._entries: dict[str, FaqEntry] = {}
+        self._exact: dict[str, str] = {}  # Normalized question -> entry ID
+        self._rows: list[str] = []  # Matrix row -> entry ID
+        self._matrix = np.empty((0, 0), np.float32)
+        self._vectors: dict[str, np.ndarray] = {}  # Normalized question -> unit vector
+        self._loaded_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()  # Serializes loads and edits within the process
+
+    # ---- loading ----
+
+    async def ensure_loaded(self) -> None:
+        """Load the FAQ on first use, and refresh it in the background when it's stale."""
+        if self._loaded_at is None:
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self._load()
+        elif time.monotonic() - self._loaded_at > self.refresh_seconds and self._refresh is None:
+            # Serve from the current FAQ while another container's edits are picked up
+            self._refresh = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        try:
+            async with self._lock:
+                await self._load()
+        except Exception as e:
+            logger.warning(f"FAQ refresh failed, keeping the loaded entries: {e}")
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refresh = None
+
+    async def _load(self) -> None:
+        text = await asyncio.to_thread(self.store.read_text)
+        if text != self._text:
+            await self._build(_ENTRIES.validate_json(text) if text else [])
+            self._text = text
+        self._loaded_at = time.monotonic()
+
+    async def _build(self, entries: list[FaqEntry]) -> None:
+        """Index entries, embedding only questions that aren't already in the matrix."""
+        questions = [
+            (entry.id, question)
+            for entry in entries
+            for question in dict.fromkeys([entry.question, *entry.variants])
+        ]
+        keys = [_question_key(q) for _, q in questions]
+        missing = list(dict.fromkeys(k for k in keys if k not in self._vectors))
+        if missing:
+            texts = {_question_key(q): q for _, q in questions}
+            embedded = await self.embeddings.aembed_queries([texts[k] for k in missing])
+            for key, vector in zip(missing, embedded):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._vectors[key] = vector / (np.linalg.norm(vector) or 1.0)
+
+        self._vectors = {k: self._vectors[k] for k in keys}
+        self._entries = {entry.id: entry for entry in entries}
+        self._exact = {key: entry_id for (entry_id, _), key in zip(questions, keys)}
+        self._rows = [entry_id for entry_id, _ in questions]
+        self._matrix = np.stack([self._vectors[k] for k in keys]) if keys else np.empty((0, 0), np.float32)
+        logger.info(f"Loaded {len(entries)} FAQ entries ({len(keys)} questions)")
+
+    # ---- lookup ----
+
+    def _in_scope(self, entry: FaqEntry, jurisdiction: Optional[str], policy_filter: Optional[list[str]]) -> bool:
+        if jurisdiction and entry.jurisdiction and entry.jurisdiction != jurisdiction:
+            return False
+        return not policy_filter or entry.policy_name in policy_filter
+
+    def _response(self, entry: FaqEntry) -> QueryResponse:
+        return QueryResponse(answer=entry.answer, sources=entry.sources, faq_id=entry.id)
+
+    def lookup(
+        self,
+        question: str,
+        vector: Optional[list[float]] = None,
+        jurisdiction: Optional[str] = None,
+        policy_filter: Optional[list[str]] = None,
+    ) -> Optional[QueryResponse]:
+        """
+        The approved answer for a question, from the entries loaded so far.
+
+        Without a vector only exact (normalized) matches are found.
+        """
+        entry_id = self._exact.get(_question_key(question))
+        if entry_id is not None and self._in_scope(self._entries[entry_id], jurisdiction, policy_filter):
+            return self._response(self._entries[entry_id])
+        if vector is None or not self._rows:
+            return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        scores = self._matrix @ (query / (np.linalg.norm(query) or 1.0))
+        for row in np.argsort(scores)[::-1]:
+            if scores[row] < self.threshold:
+                break
+            entry = self._entries[self._rows[row]]
+            if self._in_scope(entry, jurisdiction, policy_filter):
+                return self._response(entry)
+        return None
+
+    async def match(
+        self,
+        question: str,
+        jurisdiction: Optional[str] = None,
+        policy_filter: Optional[list[str]] = None,
+    ) -> Optional[QueryResponse]:
+        """The approved answer for a question, embedding it if there's no exact match."""
+        await self.ensure_loaded()
+        if not self._rows:
+            return None
+        started = time.perf_counter()
+        hit = self.lookup(question, None, jurisdiction, policy_filter)
+        if hit is None:
+            vector = await self.embeddings.aembed_query(question)
+            hit = self.lookup(question, vector, jurisdiction, policy_filter)
+        metrics.observe("aml_faq_lookup_seconds", time.perf_counter() - started)
+        return hit
+
+    # ---- editing ----
+
+    async def list_entries(self) -> list[FaqEntry]:
+        await self.ensure_loaded()
+        return list(self._entries.values())
+
+    async def put(self, entry: FaqEntry) -> None:
+        """Add or replace an entry, persist the FAQ and re-index it."""
+        async with self._lock:
+            await self._load()  # Start from the latest stored FAQ
+            entries = {**self._entries, entry.id: entry}
+            await self._save(list(entries.values()))
+
+    async def delete(self, entry_id: str) -> bool:
+        """Remove an entry; False if there was none with this ID."""
+        async with self._lock:
+            await self._load()
+            if entry_id not in self._entries:
+                return False
+            await self._save([e for e in self._entries.values() if e.id != entry_id])
+            return True
+
+    async def _save(self, entries: list[FaqEntry]) -> None:
+        # Embed first so a failing embedding call doesn't store an unusable FAQ
+        await self._build(entries)
+        text = _ENTRIES.dump_json(entries, indent=2).decode("utf-8")
+        try:
+            await asyncio.to_thread(self.store.write_text, text)
+        except Exception:
+            self._text = None  # Re-read the stored FAQ on the next load
+            raise
+        self._text = text
+        self._loaded_at = time.monotonic()
+
+
+def _create_faq_index() -> FaqIndex:
+    # Deferred: registers the shared (memoizing) embeddings, and pulls in the
+    # Qdrant SDK that the /faq routes otherwise don't need at import time
+    import app.embeddings.vecstore  # noqa: F401
+
+    settings = init_settings()
+    if settings.S3_BUCKET:
+        store = S3FaqStore(settings.S3_BUCKET, settings.FAQ_S3_KEY)
+    else:
+        store = LocalFaqStore(settings.FAQ_PATH)
+    return FaqIndex(store, registry.get("embeddings"), settings.FAQ_THRESHOLD, settings.FAQ_REFRESH_SECONDS)
+
+
+registry.register("faq_index", _create_faq_index, depends_on=("embeddings",))
+
+
+def get_faq_index() -> Optional[FaqIndex]:
+    """Get the shared FAQ index, or None when the FAQ fast path is disabled."""
+    if not init_settings().FAQ_ENABLED:
+        return None
+    return registry.get("faq_index")
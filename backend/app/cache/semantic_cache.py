@@ -0,0 +1,432 @@
+"""
+Semantic answer cache for the AML Policy FAQ Bot.
+
+Stores generated answers keyed on the question embedding. A new question
+whose embedding is within a cosine-similarity threshold of a cached one -
+under the same jurisdiction / policy filter - gets the stored answer back
+without touching Qdrant or the LLM.
+
+Re-ingesting a policy invalidates the answers built from it. On Lambda the
+ingestion job runs in another container than the ones answering queries, so
+invalidations are also recorded in an InvalidationLog - one marker per
+policy, under SEMANTIC_CACHE_S3_PREFIX in S3_BUCKET or in a local directory -
+that every cache checks for newer markers at most every
+SEMANTIC_CACHE_SYNC_SECONDS.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from itertools import count
+from typing import Iterable, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.schemas import QueryResponse
+
+
+logger = logging.getLogger(__name__)
+
+CLOCK_SKEW_SECONDS = 60.0  # Markers this much older than the cache still invalidate it
+
+def scope_key(jurisdiction: Optional[str], policy_filter: Optional[list[str]]) -> str:
+    """Canonical key for the filters a cached answer was produced under."""
+    return json.dumps([jurisdiction or "", sorted(policy_filter or [])])
+
+
+def policy_key(metadata: dict) -> Optional[str]:
+    """Identify the policy a document or source belongs to."""
+    return metadata.get("policy_name") or metadata.get("filename") or metadata.get("source")
+
+
+def _normalize(vector: Iterable[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class CacheBackend(ABC):
+    """Storage for cached answers. Vectors passed in are already normalized."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    def search(self, vector: np.ndarray, scope: str, threshold: float) -> Optional[str]:
+        """Return the serialized response of the closest entry above threshold."""
+
+    @abstractmethod
+    def put(self, vector: np.ndarray, scope: str, response: str, policies: list[str]) -> None:
+        """Store a serialized response, evicting expired / least recently used entries."""
+
+    @abstractmethod
+    def invalidate(self, policies: Iterable[str]) -> int:
+        """Drop entries whose sources came from any of the given policies."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    def close(self) -> None:
+        """Release any held resources."""
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local LRU cache with TTL expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        super().__init__(max_entries, ttl_seconds)
+        # entry id -> (scope, vector, response, policies, created_at), oldest use first
+        self._entries: OrderedDict[int, tuple] = OrderedDict()
+        # scope -> (entry ids, stacked vectors), rebuilt lazily after writes
+        self._matrices: dict[str, tuple[list[int], np.ndarray]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+
+    def search(self, vector: np.ndarray, scope: str, threshold: float) -> Optional[str]:
+        with self._lock:
+            self._expire()
+            ids, matrix = self._matrix_for(scope)
+            if not ids:
+                return None
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            return self._entries[entry_id][2]
+
+    def put(self, vector: np.ndarray, scope: str, response: str, policies: list[str]) -> None:
+        with self._lock:
+            self._entries[next(self._ids)] = (scope, vector, response, policies, time.time())
+            self._matrices.pop(scope, None)
+            self._expire()
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop(evicted[0], None)
+
+    def invalidate(self, policies: Iterable[str]) -> int:
+        stale_policies = set(policies)
+        with self._lock:
+            stale = [i for i, e in self._entries.items() if stale_policies.intersection(e[3])]
+            for entry_id in stale:
+                self._matrices.pop(self._entries.pop(entry_id)[0], None)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [i for i, e in self._entries.items() if e[4] < cutoff]
+        for entry_id in expired:
+            self._matrices.pop(self._entries.pop(entry_id)[0], None)
+
+    def _matrix_for(self, scope: str) -> tuple[list[int], np.ndarray]:
+        if scope not in self._matrices:
+            ids = [i for i, e in self._entries.items() if e[0] == scope]
+            vectors = [self._entries[i][1] for i in ids]
+            self._matrices[scope] = (ids, np.stack(vectors) if vectors else np.empty((0, 0), np.float32))
+        return self._matrices[scope]
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    SQLite-backed cache that several processes can share.
+
+    Stands in for a shared cache service: point SEMANTIC_CACHE_PATH at a
+    shared filesystem so warm Lambda containers see each other's answers.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        super().__init__(max_entries, ttl_seconds)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " scope TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache_policy ("
+                " entry_id INTEGER NOT NULL REFERENCES semantic_cache(id) ON DELETE CASCADE,"
+                " policy TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_scope ON semantic_cache(scope)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_policy ON semantic_cache_policy(policy)")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def search(self, vector: np.ndarray, scope: str, threshold: float) -> Optional[str]:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector FROM semantic_cache WHERE scope = ? AND created_at >= ?",
+                (scope, cutoff),
+            ).fetchall()
+            if not rows:
+                return None
+            matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+            entry_id = rows[best][0]
+            self._conn.execute("UPDATE semantic_cache SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+            row = self._conn.execute("SELECT response FROM semantic_cache WHERE id = ?", (entry_id,)).fetchone()
+            return row[0] if row else None
+
+    def put(self, vector: np.ndarray, scope: str, response: str, policies: list[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO semantic_cache (scope, vector, response, created_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (scope, vector.astype(np.float32).tobytes(), response, now, now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO semantic_cache_policy (entry_id, policy) VALUES (?, ?)",
+                    [(cursor.lastrowid, p) for p in policies],
+                )
+                self._conn.execute("DELETE FROM semantic_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute(
+                    "DELETE FROM semantic_cache WHERE id IN ("
+                    " SELECT id FROM semantic_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def invalidate(self, policies: Iterable[str]) -> int:
+        policies = list(policies)
+        if not policies:
+            return 0
+        placeholders = ",".join("?" * len(policies))
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM semantic_cache WHERE id IN ("
+                f" SELECT entry_id FROM semantic_cache_policy WHERE policy IN ({placeholders}))",
+                policies,
+            )
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM semantic_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============== Shared invalidations ==============
+
+class InvalidationLog(ABC):
+    """When each policy's cached answers were last invalidated, shared by every container."""
+
+    @abstractmethod
+    def read(self) -> dict[str, float]:
+        """Policy -> time (epoch seconds) of its latest invalidation."""
+
+    @abstractmethod
+    def record(self, policies: list[str]) -> None:
+        """Mark the given policies invalidated now."""
+
+
+class LocalInvalidationLog(InvalidationLog):
+    """One file per policy in a local directory, dated by its modification time (single host)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def read(self) -> dict[str, float]:
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return {}
+        return {unquote(entry.name): entry.stat().st_mtime for entry in entries if entry.is_file()}
+
+    def record(self, policies: list[str]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for policy in policies:
+            with open(os.path.join(self.directory, quote(policy, safe="")), "w", encoding="utf-8") as f:
+                f.write(str(time.time()))
+
+
+class S3InvalidationLog(InvalidationLog):
+    """
+    One object per policy under a prefix in S3, dated by its LastModified.
+
+    Each writer only puts its own policies' markers, so concurrent ingestion
+    jobs don't overwrite each other, and a reader needs a single listing.
+    """
+
+    def __init__(self, bucket: str, prefix: str):
+        import boto3  # Deferred: only needed when invalidations live in S3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3")
+
+    def read(self) -> dict[str, float]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        markers = {}
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                markers[unquote(obj["Key"][len(self.prefix):])] = obj["LastModified"].timestamp()
+        return markers
+
+    def record(self, policies: list[str]) -> None:
+        for policy in policies:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self.prefix + quote(policy, safe=""),
+                Body=str(time.time()).encode("utf-8"),
+                ContentType="text/plain",
+            )
+
+
+# ============== Cache ==============
+
+class SemanticCache:
+    """Answer cache keyed on question embeddings, scoped by query filters."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        threshold: float,
+        invalidations: Optional[InvalidationLog] = None,
+        sync_seconds: float = 5.0,
+    ):
+        self.backend = backend
+        self.threshold = threshold
+        self.invalidations = invalidations
+        self.sync_seconds = sync_seconds
+        # Latest marker applied per policy; older markers predate this cache
+        self._applied: dict[str, float] = {}
+        self._baseline = time.time() - CLOCK_SKEW_SECONDS
+        self._synced_at = 0.0
+        self._syncing = False
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        vector: list[float],
+        jurisdiction: Optional[str] = None,
+        policy_filter: Optional[list[str]] = None,
+    ) -> Optional[QueryResponse]:
+        """Return a cached response for a semantically equivalent question."""
+        self._schedule_sync()
+        hit = self.backend.search(_normalize(vector), scope_key(jurisdiction, policy_filter), self.threshold)
+        return QueryResponse.model_validate_json(hit) if hit else None
+
+    def store(
+        self,
+        vector: list[float],
+        response: QueryResponse,
+        jurisdiction: Optional[str] = None,
+        policy_filter: Optional[list[str]] = None,
+    ) -> None:
+        """Cache a response. Escalations are not cached - new documents may answer them."""
+        if response.escalate or not response.sources:
+            return
+        policies = sorted({p for p in (policy_key(s.metadata) for s in response.sources) if p})
+        self.backend.put(
+            _normalize(vector),
+            scope_key(jurisdiction, policy_filter),
+            response.model_dump_json(),
+            policies,
+        )
+
+    def invalidate_policies(self, policies: Iterable[str]) -> int:
+        """Drop answers built from any of the given (re-ingested) policies, here and in other containers."""
+        policies = sorted({p for p in policies if p})
+        if policies and self.invalidations is not None:
+            try:
+                self.invalidations.record(policies)
+            except Exception as e:
+                logger.error(f"Failed to record cache invalidation of {policies} for other containers: {e}")
+        return self.backend.invalidate(policies)
+
+    def _schedule_sync(self) -> None:
+        """Pick up other containers' invalidations in the background (lookups keep serving meanwhile)."""
+        if self.invalidations is None:
+            return
+        with self._lock:
+            if self._syncing or time.monotonic() - self._synced_at < self.sync_seconds:
+                return
+            self._syncing = True
+            self._synced_at = time.monotonic()
+        threading.Thread(target=self._sync, daemon=True).start()
+
+    def _sync(self) -> None:
+        try:
+            markers = self.invalidations.read()
+            stale = [p for p, at in markers.items() if at > self._applied.get(p, self._baseline)]
+            if stale:
+                dropped = self.backend.invalidate(stale)
+                logger.info(f"Invalidated {dropped} cached answer(s) of {len(stale)} re-ingested policies")
+            self._applied.update(markers)
+        except Exception as e:
+            logger.warning(f"Failed to check cache invalidations: {e}")
+        finally:
+            with self._lock:
+                self._syncing = False
+
+
+def _create_answer_cache() -> SemanticCache:
+    settings = init_settings()
+    if settings.SEMANTIC_CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(
+            settings.SEMANTIC_CACHE_PATH,
+            settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            settings.SEMANTIC_CACHE_TTL_SECONDS,
+        )
+    elif settings.SEMANTIC_CACHE_BACKEND == "memory":
+        backend = InMemoryCacheBackend(
+            settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            settings.SEMANTIC_CACHE_TTL_SECONDS,
+        )
+    else:
+        raise ValueError(f"Unknown SEMANTIC_CACHE_BACKEND: {settings.SEMANTIC_CACHE_BACKEND}")
+    if settings.S3_BUCKET:
+        invalidations = S3InvalidationLog(settings.S3_BUCKET, settings.SEMANTIC_CACHE_S3_PREFIX)
+    else:
+        invalidations = LocalInvalidationLog(settings.SEMANTIC_CACHE_INVALIDATION_DIR)
+    return SemanticCache(
+        backend,
+        settings.SEMANTIC_CACHE_THRESHOLD,
+        invalidations,
+        settings.SEMANTIC_CACHE_SYNC_SECONDS,
+    )
+
+
+registry.register("answer_cache", _create_answer_cache, closer=lambda cache: cache.backend.close())
+
+
+def get_answer_cache() -> Optional[SemanticCache]:
+    """Get the shared answer cache, or None when caching is disabled."""
+    if not init_settings().SEMANTIC_CACHE_ENABLED:
+        return None
+    return registry.get("answer_cache")
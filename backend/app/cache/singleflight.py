@@ -0,0 +1,108 @@
+"""
+Single-flight coalescing of identical in-flight questions.
+
+When many users ask the same question at once (e.g. right after a policy
+change is announced), only the first request runs retrieval and generation.
+Concurrent duplicates - same normalized question and filters - attach to
+the running pipeline: `/query` callers await the same result, and streaming
+callers get the same chunks fanned out, replayed from the start if they join
+late. Nothing is kept once the pipeline finishes; repeats after that are the
+semantic answer cache's job.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcast:
+    """One running async iterator fanned out to any number of subscribers."""
+
+    def __init__(self, source: AsyncIterator):
+        self._items: list = []
+        self._done = False
+        self._error: BaseException | None = None
+        self._changed = asyncio.Condition()
+        self.subscribers = 0
+        self.task = asyncio.ensure_future(self._run(source))
+
+    async def _run(self, source: AsyncIterator) -> None:
+        try:
+            async for item in source:
+                self._items.append(item)
+                async with self._changed:
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            self._error = RuntimeError("Answer generation was cancelled")
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator:
+        """Every item from the start, then live ones until the source finishes."""
+        position = 0
+        try:
+            while True:
+                while position < len(self._items):
+                    yield self._items[position]
+                    position += 1
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                async with self._changed:
+                    await self._changed.wait_for(lambda: position < len(self._items) or self._done)
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self._done:
+                # Everyone went away: stop generating an answer nobody will read
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Registry of in-flight calls and streams, keyed on whatever identifies a duplicate."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self._streams: dict[Hashable, Broadcast] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def call(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `factory()`, or the identical call already running."""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._forget(self._calls, key, future))
+        else:
+            logger.debug(f"Joined in-flight query {key!r}")
+        # A caller that disconnects must not cancel the others' result
+        return await asyncio.shield(future)
+
+    def stream(self, key: Hashable, factory: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Iterate `factory()`, or subscribe to the identical stream already running."""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = Broadcast(factory())
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda _: self._forget(self._streams, key, broadcast))
+        else:
+            logger.debug(f"Joined in-flight stream {key!r} ({broadcast.subscribers} listening)")
+        # Counted now rather than on first iteration, so a subscriber that
+        # hasn't started reading yet keeps the stream alive
+        broadcast.subscribers += 1
+        return broadcast.subscribe()
+
+    @staticmethod
+    def _forget(flights: dict, key: Hashable, flight: Any) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
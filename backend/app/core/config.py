@@ -1,11 +1,18 @@
+import logging
+import os
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import SecretStr
-from functools import lru_cache
-from typing import Optional
+
+from app.core.secrets import get_secret_config
+
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseSettings):
-    """Application settings - from environment variables."""
+    """Application settings - from environment variables (and the config secret on AWS)."""
     
     # AWS (optional for local dev, set by Lambda environment)
     S3_BUCKET: Optional[str] = None
@@ -20,27 +27,164 @@ class Settings(BaseSettings):
     QDRANT_API_KEY: Optional[SecretStr] = None
     QDRANT_COLLECTION_NAME: str = "aml_policies"
     
+    # Vector backend: "qdrant" (Qdrant Cloud) or "local" (embedded exact search
+    # over snapshots kept in LOCAL_VECTOR_DIR, or in S3_BUCKET when it is set)
+    VECTOR_BACKEND: str = "qdrant"
+    LOCAL_VECTOR_DIR: str = "/tmp/aml_vectors"
+    LOCAL_VECTOR_S3_PREFIX: str = "vector-snapshots/"
+    LOCAL_VECTOR_DTYPE: str = "float32"  # "int8" keeps vectors 4x smaller in RAM
+    LOCAL_VECTOR_REFRESH_SECONDS: float = 60.0  # How often to look for a newer snapshot
+    
+    # Qdrant collection profile (app/embeddings/profiles.py): baseline, balanced,
+    # memory, accuracy or exact. Storage/index fields apply when the collection is
+    # created or migrated; search fields apply per query. Overrides are optional.
+    QDRANT_COLLECTION_PROFILE: str = "baseline"
+    QDRANT_QUANTIZATION: Optional[str] = None  # "none", "scalar" (int8) or "binary"
+    QDRANT_ON_DISK: Optional[bool] = None  # Original vectors on disk
+    QDRANT_HNSW_M: Optional[int] = None
+    QDRANT_HNSW_EF_CONSTRUCT: Optional[int] = None
+    QDRANT_SEARCH_HNSW_EF: Optional[int] = None
+    QDRANT_SEARCH_EXACT: Optional[bool] = None
+    QDRANT_RESCORE: Optional[bool] = None
+    QDRANT_OVERSAMPLING: Optional[float] = None
+    
     # LLM Settings (with defaults)
     LLM_TEMPERATURE: float = 0.1
     LLM_MAX_TOKENS: int = 512  # Reduced to enforce concise answers
     
-    # Text Splitting
-    CHUNK_SIZE: int = 1000
-    CHUNK_OVERLAP: int = 200
+    # Query embedding memoization / micro-batching
+    EMBEDDING_CACHE_SIZE: int = 4096  # Vectors kept in memory (4 KB each at 1024 dims)
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0  # How long to wait for concurrent queries to batch
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    
+    # Document parsing (CPU-bound loaders run off the event loop)
+    PARSE_EXECUTOR: str = "process"  # "process" or "thread"; falls back to threads where processes are unavailable
+    PARSE_MAX_WORKERS: Optional[int] = None  # Defaults to the CPU count
+    PDF_PAGES_PER_TASK: int = 25  # Large PDFs are split into page ranges parsed in parallel
+    
+    # Ingestion writer
+    INGEST_BATCH_SIZE: int = 64  # Chunks per embed + upsert batch
+    INGEST_CONCURRENCY: int = 4  # Batches in flight against the embedding endpoint
+    INGEST_MAX_RETRIES: int = 5
+    INGEST_BACKOFF_SECONDS: float = 1.0  # Base delay, doubled on each retry
+    
+    # Background ingestion jobs (staged in S3_BUCKET when set, else locally)
+    INGEST_STAGING_DIR: str = "/tmp/aml_ingest_staging"
+    INGEST_S3_PREFIX: str = "ingest-jobs/"
+    INGEST_WORKERS: int = 2  # In-process job workers (local / non-Lambda)
+    INGEST_ASYNC_INVOKE: bool = True  # On Lambda, run jobs in an async self-invocation
+    INGEST_JOB_TIMEOUT_SECONDS: int = 900  # A queued/running job without progress this long is failed
+    
+    # Pipeline metrics (/api/v1/metrics); no overhead when disabled
+    METRICS_ENABLED: bool = False
+    METRICS_EMF: bool = False  # Also log CloudWatch Embedded Metric Format lines
+    METRICS_NAMESPACE: str = "AMLPolicyFAQBot"
+    
+    # Cold start: "lazy" imports LangChain/Qdrant/loader modules on the first
+    # request that needs them; "eager" preloads them and the shared clients
+    # during Lambda init (worth it with provisioned concurrency)
+    STARTUP_MODE: str = "lazy"
+    
+    # Retrieval (cosine similarity); questions with no match above the floor
+    # escalate without calling the LLM
+    RETRIEVAL_SCORE_THRESHOLD: float = 0.2
+    RETRIEVAL_RELATIVE_GAP: float = 0.25  # Drop matches scoring more than 25% below the best
+    RETRIEVAL_CANDIDATES: int = 8  # Chunks fetched before dedup and packing
+    HYBRID_SEARCH_ENABLED: bool = True  # Fuse BM25 sparse results with dense (new collections)
+    RRF_K: int = 60  # Reciprocal rank fusion constant
+    CONTEXT_TOKEN_BUDGET: int = 768  # Estimated prompt tokens of retrieved context
+    
+    # Identical questions asked while one is being answered share its
+    # retrieval and LLM generation (streams are fanned out)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    
+    # WebSocket sessions (/api/v1/ws/query)
+    WS_MAX_IN_FLIGHT: int = 4  # Concurrent questions per connection
+    WS_SEND_QUEUE_SIZE: int = 256  # Chunks buffered for a slow client before answers pause
+    WS_SEND_TIMEOUT_SECONDS: float = 30.0  # Answers are abandoned after the client stops reading this long
+    
+    # Batch queries (/api/v1/query/batch)
+    BATCH_QUERY_MAX_SIZE: int = 500
+    BATCH_QUERY_CONCURRENCY: int = 8  # LLM generations in flight per batch
+    
+    # Health checks
+    HEALTH_CACHE_SECONDS: float = 10.0  # Readiness result reuse; probes in between hit no upstream
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0  # Per dependency
+    
+    # Text Splitting (in embedding model tokens; nv-embedqa-e5-v5 takes up to 512)
+    CHUNK_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 48
+    
+    # Duplicate chunk merging at ingestion (MinHash + LSH finds candidates, only identical text merges)
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.8  # Word-shingle Jaccard similarity at which differing chunks are reported
+    
+    # Curated FAQ answers checked before retrieval (app/cache/faq.py)
+    FAQ_ENABLED: bool = True
+    FAQ_PATH: str = "/tmp/aml_faq.json"  # Used when S3_BUCKET is not set
+    FAQ_S3_KEY: str = "faq/faq.json"
+    FAQ_THRESHOLD: float = 0.92  # Minimum cosine similarity to a curated question
+    FAQ_REFRESH_SECONDS: float = 60.0  # How often to pick up edits made by other containers
+    
+    # Semantic answer cache
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_BACKEND: str = "memory"  # "memory" or "sqlite"
+    SEMANTIC_CACHE_PATH: str = "/tmp/aml_semantic_cache.sqlite3"  # Used by the sqlite backend
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1024
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    # Invalidations by ingestion in other containers (S3_BUCKET when set, else a local directory)
+    SEMANTIC_CACHE_SYNC_SECONDS: float = 5.0  # How often each cache checks for them
+    SEMANTIC_CACHE_S3_PREFIX: str = "cache-invalidations/"
+    SEMANTIC_CACHE_INVALIDATION_DIR: str = "/tmp/aml_cache_invalidations"
+
+
+# Settings that were replaced; still setting one fails startup rather than
+# silently falling back to the new setting's default
+REPLACED_SETTINGS = {
+    "CHUNK_SIZE": "CHUNK_TOKENS (embedding model tokens, about a quarter of the old character count)",
+    "CHUNK_OVERLAP": "CHUNK_OVERLAP_TOKENS (embedding model tokens)",
+}
 
 
-@lru_cache
 def get_settings() -> Settings:
-    return Settings()
+    """Build settings from the environment, overridden by the config secret on AWS."""
+    secret = get_secret_config()
+    replaced = [key for key in REPLACED_SETTINGS if key in os.environ or key in secret]
+    if replaced:
+        raise ValueError("; ".join(
+            f"{key} is no longer supported, set {REPLACED_SETTINGS[key]} instead" for key in replaced
+        ))
+    
+    overrides = {}
+    for key, value in secret.items():
+        if key in Settings.model_fields:
+            overrides[key] = str(value)
+        else:
+            # Not ours (e.g. LangSmith variables): expose to libraries that
+            # read the environment, without clobbering what is already set
+            os.environ.setdefault(key, str(value))
+    return Settings(**overrides)
 
 
 # Lazy-loaded settings - only accessed when needed, not at import time
 settings: Settings = None  # type: ignore
+_settings_source: Optional[dict] = None
 
 
 def init_settings() -> Settings:
     """Initialize settings. Call this when you need settings."""
-    global settings
-    if settings is None:
+    global settings, _settings_source
+    source = get_secret_config()
+    if settings is None or source is not _settings_source:
+        rotated = settings is not None
+        _settings_source = source
         settings = get_settings()
+        if rotated:
+            # Recreate clients that were built with the previous values; the
+            # old ones are closed once the requests using them have finished
+            from app.core.resources import registry
+            
+            logger.info("Config secret changed, recreating shared resources")
+            registry.refresh()
     return settings
@@ -0,0 +1,129 @@
+"""
+Tiered health checks for the AML Policy FAQ Bot.
+
+- Liveness (`/health/live`) answers from memory and does no I/O.
+- Readiness (`/health/ready`, `/health`) checks Qdrant and the NVIDIA API
+  in parallel using the shared clients, each under a strict timeout:
+  a collection lookup (no search) and a one-word embedding (no generation) -
+  the smallest call the API authenticates.
+
+Readiness results are cached for HEALTH_CACHE_SECONDS, and concurrent
+probes during a check wait on the same one, so any number of load balancer
+or uptime probes costs at most one upstream round trip per interval.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import httpx
+
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.schemas import HealthResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Model listing is public and accepts any key; embeddings reject a bad one
+NVIDIA_EMBEDDINGS_URL = "https://integrate.api.nvidia.com/v1/embeddings"
+
+
+registry.register(
+    "health_http_client",
+    lambda: httpx.AsyncClient(timeout=init_settings().HEALTH_CHECK_TIMEOUT_SECONDS),
+    closer=lambda client: client.aclose(),
+)
+
+
+async def _check_vector_store() -> None:
+    """Qdrant is reachable and the collection exists."""
+    # Deferred: registers the shared Qdrant clients (and imports the SDK) on first use
+    from app.embeddings import vecstore  # noqa: F401
+
+    settings = init_settings()
+    exists = await registry.get("async_qdrant_client").collection_exists(settings.QDRANT_COLLECTION_NAME)
+    if not exists:
+        raise RuntimeError(f"Collection {settings.QDRANT_COLLECTION_NAME} does not exist")
+
+
+async def _check_llm() -> None:
+    """The NVIDIA API is reachable and accepts our key."""
+    settings = init_settings()
+    if not settings.NVIDIA_API_KEY:
+        raise RuntimeError("NVIDIA_API_KEY is not set")
+    response = await registry.get("health_http_client").post(
+        NVIDIA_EMBEDDINGS_URL,
+        headers={"Authorization": f"Bearer {settings.NVIDIA_API_KEY.get_secret_value()}"},
+        json={
+            "model": settings.NVIDIA_EMBEDDING_MODEL_NAME,
+            "input": ["health"],
+            "input_type": "query",
+        },
+    )
+    response.raise_for_status()
+
+
+class HealthChecker:
+    """Runs readiness checks and caches the result."""
+
+    def __init__(self):
+        self._result: Optional[HealthResponse] = None
+        self._checked_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+    @staticmethod
+    async def _run(name: str, check, timeout: float) -> Optional[str]:
+        """Run one check, returning an error message or None."""
+        try:
+            await asyncio.wait_for(check(), timeout=timeout)
+            return None
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        logger.warning(f"Health check {name} failed: {error}")
+        return error
+
+    async def _check(self) -> HealthResponse:
+        timeout = init_settings().HEALTH_CHECK_TIMEOUT_SECONDS
+        vector_store_error, llm_error = await asyncio.gather(
+            self._run("vector_store", _check_vector_store, timeout),
+            self._run("llm", _check_llm, timeout),
+        )
+        errors = {
+            name: error
+            for name, error in (("vector_store", vector_store_error), ("llm", llm_error))
+            if error
+        }
+        return HealthResponse(
+            status="degraded" if errors else "healthy",
+            vector_store_available=vector_store_error is None,
+            llm_available=llm_error is None,
+            errors=errors,
+        )
+
+    async def readiness(self) -> HealthResponse:
+        """Cached readiness; concurrent callers share one in-flight check."""
+        if self._result is not None and time.monotonic() - self._checked_at < init_settings().HEALTH_CACHE_SECONDS:
+            return self._result
+
+        if self._inflight is None or self._inflight.get_loop() is not asyncio.get_running_loop():
+            self._inflight = asyncio.ensure_future(self._check())
+            self._inflight.add_done_callback(self._store)
+        return await asyncio.shield(self._inflight)
+
+    def _store(self, future: asyncio.Future) -> None:
+        self._inflight = None
+        if not future.cancelled() and future.exception() is None:
+            self._result = future.result()
+            self._checked_at = time.monotonic()
+
+
+registry.register("health_checker", HealthChecker)
+
+
+def get_health_checker() -> HealthChecker:
+    """Get the shared health checker."""
+    return registry.get("health_checker")
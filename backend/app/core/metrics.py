@@ -0,0 +1,166 @@
+"""
+Low-overhead pipeline metrics for the AML Policy FAQ Bot.
+
+Stage timings and token counts are recorded into fixed-bucket histograms,
+exposed in Prometheus text format at `/api/v1/metrics` and optionally
+written as CloudWatch Embedded Metric Format (EMF) log lines. When
+METRICS_ENABLED is off, `observe` returns immediately and `timer` hands out
+a shared no-op context manager, so instrumented code pays nothing.
+"""
+
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Optional
+
+from app.core.config import init_settings
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, unit: str):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.unit = unit
+        self._counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+HISTOGRAMS: dict[str, Histogram] = {
+    h.name: h
+    for h in (
+        Histogram("aml_embed_seconds", "Query embedding request latency", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_faq_lookup_seconds", "FAQ fast-path lookup latency", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_search_seconds", "Qdrant similarity search latency", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_llm_prompt_tokens", "LLM prompt tokens per generation", TOKEN_BUCKETS, "Count"),
+        Histogram("aml_llm_completion_tokens", "LLM completion tokens per generation", TOKEN_BUCKETS, "Count"),
+        Histogram("aml_llm_ttft_seconds", "LLM time to first token (streaming)", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_llm_total_seconds", "LLM total generation time", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_ingest_parse_seconds", "Document parse time per file", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_ingest_split_seconds", "Text splitting time per ingestion", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_ingest_upsert_seconds", "Embed + upsert time per ingestion", SECONDS_BUCKETS, "Seconds"),
+        Histogram("aml_cold_start_seconds", "Lambda init time (config + app import)", SECONDS_BUCKETS, "Seconds"),
+    )
+}
+
+_enabled: Optional[bool] = None
+_emf: bool = False
+
+
+def enabled() -> bool:
+    """Whether metrics are being recorded (read from settings once)."""
+    global _enabled, _emf
+    if _enabled is None:
+        settings = init_settings()
+        _emf = settings.METRICS_ENABLED and settings.METRICS_EMF
+        _enabled = settings.METRICS_ENABLED
+    return _enabled
+
+
+def observe(name: str, value: float) -> None:
+    """Record a value into the named histogram."""
+    if not (_enabled if _enabled is not None else enabled()):
+        return
+    histogram = HISTOGRAMS[name]
+    histogram.observe(value)
+    if _emf:
+        _write_emf(histogram, value)
+
+
+class _Timer:
+    """Context manager observing its elapsed time into a histogram."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    """Time a block into the named histogram (a no-op when metrics are disabled)."""
+    if not (_enabled if _enabled is not None else enabled()):
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def record_token_usage(message) -> None:
+    """Record prompt/completion token counts from an LLM message's usage metadata."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    observe("aml_llm_prompt_tokens", usage.get("input_tokens", 0))
+    observe("aml_llm_completion_tokens", usage.get("output_tokens", 0))
+
+
+def render_prometheus() -> str:
+    """All histograms in Prometheus text exposition format."""
+    lines: list[str] = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def _write_emf(histogram: Histogram, value: float) -> None:
+    # One EMF line per observation; CloudWatch extracts the metric from the log
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": init_settings().METRICS_NAMESPACE,
+                "Dimensions": [[]],
+                "Metrics": [{"Name": histogram.name, "Unit": histogram.unit}],
+            }],
+        },
+        histogram.name: value,
+    }
+    sys.stdout.write(json.dumps(record) + "\n")
@@ -0,0 +1,164 @@
+"""
+Process-wide resource registry for the AML Policy FAQ Bot.
+
+Expensive clients (Qdrant connection, NVIDIA embeddings and LLM, the
+compiled RAG graph) are created once per process - or once per warm Lambda
+container - and shared across requests instead of being rebuilt per call.
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """
+    Lazily creates named resources once and shares them.
+
+    Each resource is registered with a factory, an optional closer (which may
+    be async) and the names of the resources it was built from. Refreshing a
+    resource also drops everything that depends on it, so no stale client is
+    handed out again. Dropped instances are closed once the work that may
+    still hold them (see `in_use`) has finished.
+    """
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._closers: dict[str, Optional[Callable[[Any], Any]]] = {}
+        self._depends_on: dict[str, tuple[str, ...]] = {}
+        self._instances: dict[str, Any] = {}
+        self._lock = threading.RLock()
+        # Requests / jobs in flight per generation (bumped by every refresh),
+        # and the instances each refresh dropped, waiting to be closed
+        self._generation = 0
+        self._holders: dict[int, int] = {}
+        self._retired: list[tuple[int, list[tuple[str, Any]]]] = []
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        closer: Optional[Callable[[Any], Any]] = None,
+        depends_on: Iterable[str] = (),
+    ) -> None:
+        """Register a factory for a named resource."""
+        with self._lock:
+            self._factories[name] = factory
+            self._closers[name] = closer
+            self._depends_on[name] = tuple(depends_on)
+
+    def get(self, name: str) -> Any:
+        """Return the shared instance, creating it on first use."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown resource: {name}")
+                logger.info(f"Creating shared resource: {name}")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def is_initialized(self, name: str) -> bool:
+        """Whether the resource has already been created."""
+        return name in self._instances
+
+    @contextmanager
+    def in_use(self):
+        """
+        Mark a unit of work (a request, an ingestion job) that may hold shared instances.
+
+        Instances a `refresh` drops while it runs are closed only once it - and
+        everything else started before the refresh - is done, so rotating the
+        config doesn't pull clients from under live requests.
+        """
+        with self._lock:
+            generation = self._generation
+            self._holders[generation] = self._holders.get(generation, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holders[generation] -= 1
+                if not self._holders[generation]:
+                    del self._holders[generation]
+                self._close_retired()
+
+    def refresh(self, name: Optional[str] = None) -> None:
+        """
+        Drop a resource (and its dependents) so it is recreated on next use.
+
+        The dropped instances are closed when no work that may hold them is
+        left in flight (right away if there is none).
+
+        Args:
+            name: Resource to refresh. Refreshes everything when omitted.
+        """
+        with self._lock:
+            names = list(reversed(self._instances)) if name is None else self._with_dependents(name)
+            retired = [(stale, self._instances.pop(stale)) for stale in names]
+            if retired:
+                self._retired.append((self._generation, retired))
+                self._generation += 1
+                self._close_retired()
+
+    def close(self) -> None:
+        """Close every created (and every dropped) resource, dependents first."""
+        with self._lock:
+            for name in reversed(list(self._instances)):
+                self._close_instance(name, self._instances.pop(name))
+            for _, retired in self._retired:
+                for name, instance in retired:
+                    self._close_instance(name, instance)
+            self._retired.clear()
+
+    def _close_retired(self) -> None:
+        """Close dropped instances that nothing in flight can still be using."""
+        oldest = min(self._holders, default=None)
+        while self._retired and (oldest is None or oldest > self._retired[0][0]):
+            _, retired = self._retired.pop(0)
+            for name, instance in retired:
+                self._close_instance(name, instance)
+
+    def _with_dependents(self, name: str) -> list[str]:
+        """Return the created dependents of `name` followed by `name` itself."""
+        ordered: list[str] = []
+        for other, deps in self._depends_on.items():
+            if name in deps:
+                ordered.extend(n for n in self._with_dependents(other) if n not in ordered)
+        if name not in ordered:
+            ordered.append(name)
+        return [n for n in ordered if n in self._instances]
+
+    def _close_instance(self, name: str, instance: Any) -> None:
+        closer = self._closers.get(name)
+        if closer is None:
+            return
+        try:
+            result = closer(instance)
+            if inspect.isawaitable(result):
+                _finish_async_close(result)
+        except Exception as e:
+            logger.warning(f"Failed to close resource {name}: {e}")
+
+
+def _finish_async_close(awaitable) -> None:
+    """Await an async closer from sync code, on the running loop if there is one."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(awaitable)
+    else:
+        loop.create_task(awaitable)
+
+
+# Single registry shared by the whole process
+registry = ResourceRegistry()
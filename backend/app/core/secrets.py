@@ -0,0 +1,93 @@
+"""
+Secrets Manager configuration source for the AML Policy FAQ Bot.
+
+On AWS the settings live in a JSON secret named by CONFIG_SECRET_NAME. The
+payload is fetched once, kept in memory and handed to `Settings` directly
+rather than being copied into `os.environ`. After CONFIG_SECRET_TTL_SECONDS
+the next read still returns the cached payload while a background thread
+fetches a fresh one, so a request never waits on Secrets Manager twice.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 900.0
+
+_NO_SECRET: dict = {}  # Shared so that identity checks see no change
+
+_payload: Optional[dict] = None
+_fetched_at = 0.0
+_refreshing = False
+_lock = threading.Lock()
+
+
+def _ttl_seconds() -> float:
+    return float(os.environ.get("CONFIG_SECRET_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+def _fetch(secret_name: str) -> dict:
+    import boto3  # Deferred: boto3 alone adds hundreds of ms to a cold start
+
+    client = boto3.client("secretsmanager")
+    response = client.get_secret_value(SecretId=secret_name)
+    return json.loads(response["SecretString"])
+
+
+def _refresh(secret_name: str) -> None:
+    global _payload, _fetched_at, _refreshing
+    try:
+        payload = _fetch(secret_name)
+    except Exception as e:
+        # Keep serving the cached payload; try again after another TTL
+        logger.error(f"Failed to refresh config secret: {e}")
+        payload = _payload
+    with _lock:
+        if payload != _payload:
+            _payload = payload
+        _fetched_at = time.monotonic()
+        _refreshing = False
+
+
+def get_secret_config() -> dict:
+    """
+    The configuration secret's key/value pairs, or {} when not on AWS.
+
+    Returns the same dict object until the secret's content changes, so
+    callers can detect a rotation with an identity check.
+    """
+    global _payload, _fetched_at, _refreshing
+    secret_name = os.environ.get("CONFIG_SECRET_NAME")
+    if not secret_name:
+        return _NO_SECRET  # Not on AWS, use local .env
+
+    if _payload is not None:
+        if not _refreshing and time.monotonic() - _fetched_at > _ttl_seconds():
+            with _lock:
+                start = not _refreshing
+                _refreshing = True
+            if start:
+                threading.Thread(target=_refresh, args=(secret_name,), daemon=True).start()
+        return _payload
+
+    with _lock:
+        if _payload is None:
+            try:
+                _payload = _fetch(secret_name)
+            except Exception as e:
+                logger.error(f"Failed to load config secret: {e}")
+                _payload = {}
+            _fetched_at = time.monotonic()
+        return _payload
+
+
+def prefetch_secret_config() -> None:
+    """Start loading the secret in the background (overlaps with imports on a cold start)."""
+    if os.environ.get("CONFIG_SECRET_NAME") and _payload is None:
+        threading.Thread(target=get_secret_config, daemon=True).start()
@@ -1,6 +1,7 @@
 """Embeddings module."""
 
-from app.embeddings.embedder import get_embeddings
+from app.embeddings.embedder import CachedEmbeddings, get_cached_embeddings, get_embeddings
+from app.embeddings.sparse import BM25SparseEmbeddings
 from app.embeddings.vecstore import (
     get_vector_store,
     add_documents_to_store,
@@ -8,6 +9,9 @@ from app.embeddings.vecstore import (
 )
 
 __all__ = [
+    "BM25SparseEmbeddings",
+    "CachedEmbeddings",
+    "get_cached_embeddings",
     "get_embeddings",
     "get_vector_store",
     "add_documents_to_store",
@@ -0,0 +1,257 @@
+"""
+Export a collection to a snapshot and load it back, without re-embedding.
+
+`export` pages through every point of a collection (Qdrant Cloud or the
+embedded engine) and writes a snapshot directory in the format of
+`app.embeddings.snapshot`: float32 or int8 vectors plus gzipped payloads and
+BM25 vectors. `import` bulk-loads a snapshot into a collection with
+parallel batched upserts, creating it (with the configured profile) if
+needed. Bootstrapping a new environment or recovering a collection then
+takes seconds of I/O instead of re-parsing and re-embedding every policy.
+
+Run `export` with one configuration and `import` with another to move a
+collection between Qdrant clusters or onto VECTOR_BACKEND=local.
+
+Usage (from backend/):
+    uv run python -m app.embeddings.backup export ./snapshots/aml_policies --dtype int8
+    uv run python -m app.embeddings.backup import ./snapshots/aml_policies --collection aml_policies
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from itertools import islice
+from typing import Optional
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct, SparseVector
+
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.embeddings.profiles import get_collection_profile
+from app.embeddings.snapshot import Snapshot, SnapshotWriter
+from app.embeddings.sparse import SPARSE_VECTOR_NAME, BM25SparseEmbeddings
+from app.embeddings.vecstore import (
+    CONTENT_PAYLOAD_KEY,
+    _with_backoff,
+    create_collection,
+    ensure_payload_indexes,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _split_vector(vector) -> tuple[list[float], dict]:
+    """A point's dense vector and {name: (indices, values)} of its sparse ones."""
+    if not isinstance(vector, dict):
+        return vector, {}
+    sparse = {
+        name: (v.indices, v.values)
+        for name, v in vector.items()
+        if isinstance(v, SparseVector)
+    }
+    return vector.get(""), sparse
+
+
+def export_collection(
+    client: QdrantClient,
+    collection_name: str,
+    directory: str,
+    dtype: str = "float32",
+    page_size: int = 512,
+) -> int:
+    """
+    Write every point of a collection to a snapshot directory, one page at a time.
+
+    Returns:
+        Number of points exported.
+    """
+    info = client.get_collection(collection_name)
+    vectors_config = info.config.params.vectors
+    if isinstance(vectors_config, dict):
+        vectors_config = vectors_config.get("")
+    sparse_config = info.config.params.sparse_vectors or {}
+    writer = SnapshotWriter(
+        directory,
+        vectors_config.size,
+        dtype,
+        sparse_vectors={
+            name: {"modifier": params.modifier.value if params.modifier else None}
+            for name, params in sparse_config.items()
+        },
+        payload_schema={key: str(getattr(index.data_type, "value", index.data_type))
+                        for key, index in (info.payload_schema or {}).items()},
+    )
+
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            dense, sparse = zip(*(_split_vector(p.vector) for p in points))
+            writer.write(
+                [p.id for p in points],
+                np.asarray(dense, dtype=np.float32),
+                [p.payload or {} for p in points],
+                list(sparse),
+            )
+            logger.info(f"Exported {writer.count} points from {collection_name}")
+        if offset is None:
+            break
+    writer.close()
+    return writer.count
+
+
+async def import_snapshot(
+    directory: str,
+    collection_name: str,
+    batch_size: int = 256,
+    concurrency: int = 4,
+    recreate: bool = False,
+) -> int:
+    """
+    Upsert every point of a snapshot into a collection, `concurrency` batches at a time.
+
+    The collection is created with the configured profile if it doesn't exist.
+    BM25 vectors are reused from the snapshot, or computed from the chunk text
+    when the snapshot has none and the collection wants them.
+
+    Returns:
+        Number of points imported (always the snapshot's point count).
+
+    Raises:
+        RuntimeError: If any batch failed (after retries) or points are missing.
+    """
+    snapshot = Snapshot(directory)
+    client: QdrantClient = registry.get("qdrant_client")
+    if recreate and client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    if not client.collection_exists(collection_name):
+        create_collection(client, collection_name, get_collection_profile())
+    ensure_payload_indexes(client, collection_name)
+    has_sparse = SPARSE_VECTOR_NAME in (client.get_collection(collection_name).config.params.sparse_vectors or {})
+    sparse_embeddings = BM25SparseEmbeddings()
+
+    async_client = registry.get("async_qdrant_client")
+    vectors = snapshot.vectors()
+    scales = snapshot.scales()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: list[asyncio.Task] = []
+    failures: list[BaseException] = []
+    imported = 0
+
+    async def upsert(points: list[PointStruct]) -> None:
+        nonlocal imported
+        try:
+            await _with_backoff(
+                lambda: async_client.upsert(collection_name=collection_name, points=points),
+                "Snapshot upsert",
+            )
+            imported += len(points)
+            logger.info(f"Imported {imported}/{snapshot.count} points into {collection_name}")
+        finally:
+            semaphore.release()
+
+    def record_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+
+    records = snapshot.points()
+    for start in range(0, snapshot.count, batch_size):
+        batch = list(islice(records, batch_size))
+        dense = np.asarray(vectors[start:start + len(batch)], dtype=np.float32)
+        if scales is not None:
+            dense *= scales[start:start + len(batch), None]
+        if has_sparse:
+            stored = [r.get("sparse", {}).get(SPARSE_VECTOR_NAME) for r in batch]
+            if any(s is None for s in stored):
+                computed = sparse_embeddings.embed_documents(
+                    [r["payload"].get(CONTENT_PAYLOAD_KEY, "") for r in batch]
+                )
+                stored = [s or (c.indices, c.values) for s, c in zip(stored, computed)]
+            point_vectors = [
+                {"": d.tolist(), SPARSE_VECTOR_NAME: SparseVector(indices=s[0], values=s[1])}
+                for d, s in zip(dense, stored)
+            ]
+        else:
+            point_vectors = [d.tolist() for d in dense]
+        points = [
+            PointStruct(id=r["id"], vector=v, payload=r["payload"])
+            for r, v in zip(batch, point_vectors)
+        ]
+        # Bounded: at most `concurrency` batches are held in memory / in flight
+        await semaphore.acquire()
+        if failures:
+            semaphore.release()
+            break
+        task = asyncio.create_task(upsert(points))
+        task.add_done_callback(record_failure)
+        tasks.append(task)
+    # Every task is kept and awaited, so no batch failure goes unnoticed
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, BaseException) and result not in failures:
+            failures.append(result)
+    if failures:
+        raise RuntimeError(
+            f"Snapshot import failed after {imported}/{snapshot.count} points: {failures[0]}"
+        ) from failures[0]
+    if imported != snapshot.count:
+        raise RuntimeError(f"Snapshot import incomplete: {imported}/{snapshot.count} points")
+    return imported
+
+
+def _size_mb(directory: str) -> float:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2**20
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    settings = init_settings()
+    parser = argparse.ArgumentParser(description="Export or import a vector collection snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write a collection to a snapshot directory")
+    export.add_argument("directory")
+    export.add_argument("--collection", default=settings.QDRANT_COLLECTION_NAME)
+    export.add_argument("--dtype", choices=["float32", "int8"], default="float32")
+    export.add_argument("--page-size", type=int, default=512)
+
+    load = commands.add_parser("import", help="Load a snapshot directory into a collection")
+    load.add_argument("directory")
+    load.add_argument("--collection", default=settings.QDRANT_COLLECTION_NAME)
+    load.add_argument("--batch-size", type=int, default=256)
+    load.add_argument("--concurrency", type=int, default=settings.INGEST_CONCURRENCY)
+    load.add_argument("--recreate", action="store_true", help="Drop the collection first")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            count = export_collection(
+                registry.get("qdrant_client"), args.collection, args.directory, args.dtype, args.page_size
+            )
+            print(f"Exported {count} points to {args.directory} ({_size_mb(args.directory):.1f} MB) "
+                  f"in {time.perf_counter() - started:.1f}s")
+        else:
+            try:
+                count = asyncio.run(import_snapshot(
+                    args.directory, args.collection, args.batch_size, args.concurrency, args.recreate
+                ))
+            except RuntimeError as e:
+                raise SystemExit(f"Import failed: {e}")
+            print(f"Imported {count} points into {args.collection} in {time.perf_counter() - started:.1f}s")
+    finally:
+        registry.close()  # Also saves the embedded engine's snapshot
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Token-sized, streaming chunking of parsed documents.
+
+Chunks are measured in tokens of the embedding model (nv-embedqa-e5-v5,
+which accepts 512 per passage) rather than characters, so they use the
+model's input without being truncated by it. Documents - usually one per
+PDF page - are split one at a time as they arrive, so ingestion never holds
+more than a page of chunks; each chunk keeps its page metadata and gains the
+`section` heading it falls under, carried across pages of the same file.
+"""
+
+import re
+from typing import Iterable, Iterator, Optional
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+# nv-embedqa-e5-v5 input limit, and what the passage prefix plus special tokens take of it
+EMBED_MAX_TOKENS = 512
+RESERVED_TOKENS = 8
+# count_tokens is an estimate (see benchmarks.token_count): the largest
+# allowed chunk leaves a quarter of the model's input spare
+TOKEN_ESTIMATE_HEADROOM = 0.75
+MAX_CHUNK_TOKENS = int((EMBED_MAX_TOKENS - RESERVED_TOKENS) * TOKEN_ESTIMATE_HEADROOM)
+
+# Upper bound of characters per counted token, to turn token sizes into
+# character windows (e.g. the overlap searched when stitching chunks)
+MAX_CHARS_PER_TOKEN = 12
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+# Letter runs, digit runs and single other characters
+_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# Markdown headings, numbered headings ("3.2 Customer Due Diligence",
+# "Section 4: Record Keeping") and short all-caps lines; not sentences
+_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]+(?P<markdown>[^\n]{1,100}?)"
+    r"|(?P<numbered>(?:(?i:section|article|chapter|part)[ \t]+)?(?:\d+(?:\.\d+)*|[IVX]+)[.):]?[ \t]+[A-Z][^\n]{0,80}?)"
+    r"|(?P<caps>[A-Z][A-Z0-9 ,&/()'-]{3,80}))(?<![.;:,])[ \t]*$",
+    re.MULTILINE,
+)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the embedding model's token count of a text.
+
+    Approximates its WordPiece tokenizer without loading it: common words
+    are one token, long words and numbers are split into pieces, and every
+    other character is a token of its own. Rare words can take more tokens
+    than estimated; MAX_CHUNK_TOKENS leaves headroom for that.
+    """
+    count = 0
+    for piece in _PIECE_PATTERN.findall(text):
+        if piece.isdigit():
+            count += -(-len(piece) // 3)
+        elif piece.isalpha():
+            count += 1 + max(0, len(piece) - 8) // 4
+        else:
+            count += 1
+    return count
+
+
+def _headings(text: str) -> list[tuple[int, str]]:
+    """(offset, title) of every heading line in a text."""
+    return [
+        (match.start(), next(g for g in match.groups() if g).strip())
+        for match in _HEADING_PATTERN.finditer(text)
+    ]
+
+
+class TokenChunker:
+    """Lazily splits documents into chunks of at most `chunk_tokens` tokens."""
+
+    def __init__(self, chunk_tokens: int, overlap_tokens: int):
+        if not 0 < chunk_tokens <= MAX_CHUNK_TOKENS:
+            raise ValueError(f"Chunk size must be between 1 and {MAX_CHUNK_TOKENS} tokens, got {chunk_tokens}")
+        if not 0 <= overlap_tokens < chunk_tokens:
+            raise ValueError(f"Chunk overlap must be smaller than the chunk size, got {overlap_tokens}")
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens,
+            chunk_overlap=overlap_tokens,
+            length_function=count_tokens,
+            separators=SEPARATORS,
+        )
+        self._source: Optional[str] = None
+        self._section: Optional[str] = None
+
+    def split(self, document: Document) -> Iterator[Document]:
+        """Chunks of one document, tagged with the section each starts in."""
+        source = document.metadata.get("filename") or document.metadata.get("source")
+        if source != self._source:
+            self._source, self._section = source, None
+        text = document.page_content
+        headings = _headings(text)
+        start = -1
+        for chunk in self._splitter.split_documents([document]):
+            # Chunks come in order, each starting after the previous one
+            start = text.find(chunk.page_content, start + 1)
+            section = self._section
+            for offset, title in headings:
+                if offset > start:
+                    break
+                section = title
+            if section:
+                chunk.metadata["section"] = section
+            yield chunk
+        if headings:
+            self._section = headings[-1][1]
+
+    def split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Chunks of each document in turn, consuming `documents` lazily."""
+        for document in documents:
+            yield from self.split(document)
@@ -0,0 +1,220 @@
+"""
+Near-duplicate chunk detection for ingestion (MinHash + LSH).
+
+Policy packs repeat definitions, disclaimers and standard CDD clauses across
+files and jurisdictions. Each chunk gets a MinHash signature of its word
+shingles; the signature is cut into LSH bands whose hashes are stored with
+the point (`lsh_bands`, an indexed payload field), so the index lives in the
+collection itself and persists across ingestions and containers.
+
+The bands only find candidates. A chunk is merged - not embedded, but
+recorded on the existing point - only when its text is the same as the
+point's, up to whitespace (`text_fingerprint`). Recorded on that point's
+metadata: `duplicates` lists where each copy came from, and `filenames`,
+`jurisdictions` and `policy_names` list every source, so filters match the
+merged point for any of them. Each copy's own text is kept with the point
+(`duplicate_texts`) so it can take the point's place when the original goes.
+
+Similar is not the same in policy text: "must" and "must not", "enhanced"
+and "simplified" due diligence, or "six months" and "twelve months" barely
+move a shingle similarity, and a query filtered to one jurisdiction must not
+get another's wording. So near-duplicates at or above DEDUP_THRESHOLD that
+differ in text are only reported, never merged. A chunk is also never merged
+into a point from another version of its own policy (same policy and
+jurisdiction): that is an edit, not a copy (`can_merge`).
+
+The hash functions below are fixed: changing them orphans the stored bands.
+"""
+
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.cache.semantic_cache import policy_key
+
+
+# Top-level payload fields: a point's LSH band hashes, and the text of each
+# merged copy by content hash
+LSH_PAYLOAD_KEY = "lsh_bands"
+DUPLICATE_TEXTS_KEY = "duplicate_texts"
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16  # 16 bands of 8 rows: pairs at Jaccard 0.8 share a band 95% of the time
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 3
+MIN_DEDUP_WORDS = 8  # Shorter chunks are left alone
+
+# Per-chunk origin recorded for each merged copy
+SOURCE_FIELDS = ("source", "filename", "jurisdiction", "policy_name", "version", "page", "page_label", "content_hash")
+# Metadata derived from a point's merged copies
+MERGE_FIELDS = ("duplicates", "filenames", "jurisdictions", "policy_names")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_permutations = np.random.default_rng(0x5EED).integers(1, 1 << 31, size=(2, NUM_PERMUTATIONS), dtype=np.uint64)
+_A = _permutations[0][:, None]
+_B = _permutations[1][:, None]
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash of a text's word shingles, or None if it's too short to deduplicate."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < MIN_DEDUP_WORDS:
+        return None
+    hashes = np.fromiter(
+        {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8")) for i in range(len(words) - SHINGLE_WORDS + 1)},
+        dtype=np.uint64,
+    )
+    # (a * h + b) mod p stays below 2**64: a < 2**31 and h < 2**32
+    return (((_A * hashes + _B) % _MERSENNE_PRIME) & _MAX_HASH).min(axis=1).astype("<u4")
+
+
+def lsh_bands(signature: np.ndarray) -> list[int]:
+    """One 63-bit hash per band of a signature (the band number is part of the hash)."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), digest_size=8).digest(),
+            "big",
+        ) >> 1
+        for band in range(LSH_BANDS)
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(a == b))
+
+
+def text_fingerprint(text: str) -> str:
+    """Hash of a chunk's text with runs of whitespace collapsed; copies must match it exactly."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def _scope(metadata: dict) -> tuple:
+    return policy_key(metadata), metadata.get("jurisdiction")
+
+
+def can_merge(metadata: dict, fingerprint: str, target: dict, target_fingerprint: str) -> bool:
+    """
+    Whether a chunk may be recorded as a copy of a point instead of being stored.
+
+    Only when its text is the point's (same `text_fingerprint`). Not when the
+    point comes from the chunk's own policy and jurisdiction: a chunk there
+    is an edited clause, not a copy. A copy of that policy recorded earlier
+    may only be restated by the same version (a re-ingest).
+    """
+    scope = _scope(metadata)
+    if _scope(target) == scope:
+        return False
+    if any(
+        _scope(d) == scope and d.get("version") != metadata.get("version")
+        for d in target.get("duplicates", [])
+    ):
+        return False
+    return fingerprint == target_fingerprint
+
+
+class MinHashLSH:
+    """In-memory LSH buckets, e.g. of the chunks seen so far in one ingestion."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._signatures: dict[str, np.ndarray] = {}
+        self._buckets: dict[int, list[str]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, key: str, signature: np.ndarray, bands: list[int]) -> None:
+        self._signatures[key] = signature
+        for band in bands:
+            self._buckets[band].append(key)
+
+    def find(
+        self,
+        signature: np.ndarray,
+        bands: list[int],
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> Optional[str]:
+        """The most similar indexed key at or above the threshold (and accepted), if any."""
+        candidates = {key for band in bands for key in self._buckets.get(band, ())}
+        best, best_similarity = None, self.threshold
+        for key in candidates:
+            if accept is not None and not accept(key):
+                continue
+            score = similarity(signature, self._signatures[key])
+            if score >= best_similarity:
+                best, best_similarity = key, score
+        return best
+
+
+# ============== Merged point metadata ==============
+
+def source_entry(metadata: dict) -> dict:
+    """Where a chunk came from, as recorded on the point it was merged into."""
+    return {field: metadata[field] for field in SOURCE_FIELDS if metadata.get(field) is not None}
+
+
+def file_key(metadata: dict) -> tuple:
+    """The file (within a policy and jurisdiction) a chunk or source entry belongs to."""
+    return (metadata.get("filename") or metadata.get("source"), metadata.get("policy_name"), metadata.get("jurisdiction"))
+
+
+def with_duplicates(metadata: dict, duplicates: list[dict]) -> dict:
+    """A point's metadata with its merged copies and the source lists derived from them."""
+    merged = {key: value for key, value in metadata.items() if key not in MERGE_FIELDS}
+    if duplicates:
+        everything = [merged, *duplicates]
+        merged["duplicates"] = duplicates
+        for field, values in (("filenames", "filename"), ("jurisdictions", "jurisdiction"), ("policy_names", "policy_name")):
+            merged[field] = sorted({m[values] for m in everything if m.get(values)})
+    return merged
+
+
+def duplicate_texts(metadata: dict, texts: dict) -> dict:
+    """The stored copy texts still needed by a point's `duplicates`."""
+    hashes = {d.get("content_hash") for d in metadata.get("duplicates", [])}
+    return {h: text for h, text in texts.items() if h in hashes}
+
+
+def merge_sources(metadata: dict, entries: list[dict], restated: set[tuple]) -> dict:
+    """
+    Record merged copies on a point.
+
+    Earlier entries from the files in `restated` (the ones being ingested now)
+    are replaced, so re-ingesting a file doesn't pile up copies.
+    """
+    duplicates = [d for d in metadata.get("duplicates", []) if file_key(d) not in restated]
+    for entry in entries:
+        if entry not in duplicates:
+            duplicates.append(entry)
+    return with_duplicates(metadata, duplicates)
+
+
+def drop_sources(metadata: dict, policy_name: str, jurisdiction: Optional[str], version: str) -> Optional[dict]:
+    """
+    Remove copies from other versions of a policy than `version`.
+
+    When the point's own (primary) source goes, the first remaining copy takes
+    its place (its `content_hash` then differs from the point's: the caller
+    swaps in that copy's text). Returns None if no source is left.
+    """
+    def current(m: dict) -> bool:
+        return not (
+            m.get("policy_name") == policy_name
+            and m.get("jurisdiction") == jurisdiction
+            and m.get("version") != version
+        )
+
+    duplicates = [d for d in metadata.get("duplicates", []) if current(d)]
+    if current(metadata):
+        return with_duplicates(metadata, duplicates)
+    if not duplicates:
+        return None
+    promoted = {key: value for key, value in metadata.items() if key not in SOURCE_FIELDS}
+    promoted.update(duplicates[0])
+    return with_duplicates(promoted, duplicates[1:])
@@ -1,7 +1,20 @@
 """NVIDIA AI Embeddings for the AML Policy FAQ Bot."""
 
+import asyncio
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
 from app.core.config import init_settings
+from app.core.metrics import timer
+
+
+logger = logging.getLogger(__name__)
 
 
 def get_embeddings() -> NVIDIAEmbeddings:
@@ -13,3 +26,189 @@ def get_embeddings() -> NVIDIAEmbeddings:
         model=settings.NVIDIA_EMBEDDING_MODEL_NAME,
         api_key=settings.NVIDIA_API_KEY.get_secret_value(),
     )
+
+
+def normalize_query_text(text: str) -> str:
+    """Canonical form of a query used as the memoization key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Memoizing wrapper around an embeddings model for query embeddings.
+
+    Query vectors are kept in a preallocated float32 matrix with LRU
+    eviction, so memory stays bounded at `capacity * dimension * 4` bytes.
+    Concurrent `aembed_query` calls that miss the cache are collected for a
+    few milliseconds and sent as one batched request. Document (passage)
+    embeddings are passed straight through.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        capacity: int = 4096,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 32,
+    ):
+        self.base = base
+        self.capacity = capacity
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._matrix: Optional[np.ndarray] = None  # Allocated once the dimension is known
+        self._rows: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Micro-batching state (used from the event loop only)
+        self._pending: dict[str, asyncio.Future] = {}
+        self._batch: dict[str, str] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()  # Running flushes, kept so they aren't garbage-collected
+
+    # ---- cache ----
+
+    def _lookup(self, key: str) -> Optional[list[float]]:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            self._rows.move_to_end(key)
+            return self._matrix[row].tolist()
+
+    def _store(self, key: str, vector: list[float]) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+            if key in self._rows:
+                row = self._rows[key]
+                self._rows.move_to_end(key)
+            elif len(self._rows) < self.capacity:
+                row = len(self._rows)
+                self._rows[key] = row
+            else:
+                # Reuse the least recently used row
+                _, row = self._rows.popitem(last=False)
+                self._rows[key] = row
+            self._matrix[row] = vector
+
+    def clear(self) -> None:
+        """Forget every memoized vector."""
+        with self._lock:
+            self._rows.clear()
+
+    # ---- Embeddings interface ----
+
+    def embed_query(self, text: str) -> list[float]:
+        key = normalize_query_text(text)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        with timer("aml_embed_seconds"):
+            vector = self.base.embed_query(text)
+        self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = normalize_query_text(text)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        # Identical in-flight questions share one future
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            self._batch[key] = text
+            if len(self._batch) >= self.max_batch_size:
+                self._schedule_flush(loop, delay=0)
+            elif self._flush_handle is None:
+                self._schedule_flush(loop, delay=self.batch_window)
+        return await asyncio.shield(future)
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many queries at once: memoized ones are reused, the rest go in batched requests."""
+        keys = [normalize_query_text(text) for text in texts]
+        vectors = {key: self._lookup(key) for key in keys}
+        missing = {key: text for key, text in zip(keys, texts) if vectors[key] is None}
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.max_batch_size):
+            chunk = missing_keys[start:start + self.max_batch_size]
+            with timer("aml_embed_seconds"):
+                embedded = await self._embed_query_batch([missing[k] for k in chunk])
+            for key, vector in zip(chunk, embedded):
+                self._store(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.base.aembed_documents(texts)
+
+    # ---- micro-batching ----
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, delay: float) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_later(delay, self._start_flush, loop)
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        task = loop.create_task(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushed)
+
+    def _flushed(self, task: asyncio.Task) -> None:
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Query embedding batch failed: {task.exception()}")
+
+    async def _flush(self) -> None:
+        batch, self._batch = self._batch, {}
+        self._flush_handle = None
+        if not batch:
+            return
+
+        keys = list(batch)
+        try:
+            with timer("aml_embed_seconds"):
+                vectors = await self._embed_query_batch([batch[k] for k in keys])
+        except Exception as e:
+            for key in keys:
+                future = self._pending.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, vector in zip(keys, vectors):
+            self._store(key, vector)
+            future = self._pending.pop(key)
+            if not future.done():
+                future.set_result(vector)
+
+    async def _embed_query_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed several queries in one request."""
+        if len(texts) == 1:
+            return [await self.base.aembed_query(texts[0])]
+        # NVIDIA retrieval models embed queries and passages differently, so
+        # batch with the query input type rather than via aembed_documents
+        aembed = getattr(self.base, "_aembed", None)
+        if aembed is not None:
+            return await aembed(texts, model_type="query")
+        return await asyncio.gather(*(self.base.aembed_query(t) for t in texts))
+
+
+def get_cached_embeddings() -> CachedEmbeddings:
+    """Get NVIDIA embeddings wrapped with query memoization and micro-batching."""
+    settings = init_settings()
+    return CachedEmbeddings(
+        get_embeddings(),
+        capacity=settings.EMBEDDING_CACHE_SIZE,
+        batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+        max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+    )
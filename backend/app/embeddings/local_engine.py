@@ -0,0 +1,793 @@
+"""
+Embedded vector engine for the AML Policy FAQ Bot (VECTOR_BACKEND=local).
+
+The policy corpus is tens of thousands of chunks, small enough to search
+exhaustively in process: a matrix-vector product over normalized float32 (or
+int8) rows takes a few milliseconds at most (under one for a few thousand
+chunks), where a round trip to Qdrant Cloud takes tens.
+
+`LocalVectorEngine` implements the part of the `QdrantClient` API this app
+uses - collection management, upsert/retrieve/delete/scroll, payload
+updates, filtered dense and BM25 (IDF) search, RRF fusion and batch
+queries - so `QdrantVectorStore`, hybrid and batch search and ingestion
+work on it unchanged.
+
+Collections are loaded lazily from snapshots (`app.embeddings.snapshot`) on
+first use, with the vectors memory-mapped. Writes stay in memory until
+`save()` publishes a new snapshot; other containers pick it up within
+LOCAL_VECTOR_REFRESH_SECONDS. The engine remembers the writes since its last
+save: when another container (say, a concurrent ingestion job) has published
+in the meantime, they are replayed on that newer snapshot and saved again, so
+neither writer's changes are lost.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.embeddings.snapshot import (
+    Snapshot,
+    SnapshotConflict,
+    SnapshotStore,
+    SnapshotWriter,
+    new_version,
+    quantize_int8,
+)
+
+
+logger = logging.getLogger(__name__)
+
+FUSION_RRF_K = 60  # Same constant as the app's own reciprocal rank fusion
+SCORE_BLOCK_ROWS = 256  # int8 rows upcast per step; small blocks stay in cache
+MASK_CACHE_SIZE = 64  # Filter masks kept per collection (e.g. per jurisdiction)
+SAVE_ATTEMPTS = 5  # Publishes per collection before giving up on racing writers
+
+# A recorded write: applied to a collection, returns the collection as it is
+# afterwards (a new one for create, None for delete)
+Write = Callable[[Optional["LocalCollection"]], Optional["LocalCollection"]]
+
+
+def _lookup(payload: dict, key: str) -> Any:
+    """Value at a dotted payload key ("metadata.jurisdiction"), or None."""
+    value: Any = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _values(value: Any) -> list:
+    """Array payload values match if any element does, as in Qdrant."""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _match(condition: models.FieldCondition, value: Any) -> bool:
+    values = _values(value)
+    match = condition.match
+    if isinstance(match, models.MatchValue):
+        return match.value in values
+    if isinstance(match, models.MatchAny):
+        return any(v in match.any for v in values)
+    if isinstance(match, models.MatchExcept):
+        return not any(v in match.except_ for v in values)
+    if condition.range is not None:
+        r = condition.range
+        return any(
+            isinstance(v, (int, float))
+            and (r.gt is None or v > r.gt) and (r.gte is None or v >= r.gte)
+            and (r.lt is None or v < r.lt) and (r.lte is None or v <= r.lte)
+            for v in values
+        )
+    raise ValueError(f"Unsupported filter condition for the local vector engine: {condition}")
+
+
+def _as_list(conditions) -> list:
+    if conditions is None:
+        return []
+    return conditions if isinstance(conditions, list) else [conditions]
+
+
+def _to_sparse(vector) -> tuple[list[int], list[float]]:
+    if isinstance(vector, models.SparseVector):
+        return list(vector.indices), list(vector.values)
+    return list(vector["indices"]), list(vector["values"])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalCollection:
+    """One collection: dense matrix, payloads, BM25 inverted indexes and filter masks."""
+
+    def __init__(
+        self,
+        dimension: int,
+        dtype: str = "float32",
+        sparse_vectors: Optional[dict] = None,
+        payload_schema: Optional[dict] = None,
+    ):
+        self.dimension = dimension
+        self.dtype = dtype
+        self.sparse_vectors: dict[str, dict] = sparse_vectors or {}  # name -> {"modifier": "idf" | None}
+        self.payload_schema: dict[str, str] = payload_schema or {}
+        self.ids: list = []
+        self.payloads: list[dict] = []
+        self.sparse: list[dict] = []  # Per row: name -> (indices, values)
+        self.rows: dict[str, int] = {}
+        self._vectors = np.zeros((0, dimension), dtype=dtype)
+        self._scales = np.zeros(0, dtype=np.float32) if dtype == "int8" else None
+        self._postings: dict[str, dict[int, dict[str, float]]] = {name: {} for name in self.sparse_vectors}
+        self._columns: dict[str, list] = {}
+        self._masks: dict[str, np.ndarray] = {}
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    # ---- loading and saving ----
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "LocalCollection":
+        manifest = snapshot.manifest
+        collection = cls(
+            snapshot.dimension,
+            snapshot.dtype,
+            manifest.get("sparse_vectors"),
+            manifest.get("payload_schema"),
+        )
+        collection._vectors = snapshot.vectors()  # Memory-mapped until the first write
+        collection._scales = snapshot.scales()
+        for row, point in enumerate(snapshot.points()):
+            key = str(point["id"])
+            collection.ids.append(point["id"])
+            collection.payloads.append(point["payload"])
+            sparse = {name: tuple(pair) for name, pair in (point.get("sparse") or {}).items()}
+            collection.sparse.append(sparse)
+            collection.rows[key] = row
+            collection._index_sparse(key, sparse)
+        return collection
+
+    def write_to(self, directory: str) -> None:
+        writer = SnapshotWriter(directory, self.dimension, self.dtype, self.sparse_vectors, self.payload_schema)
+        writer.write(
+            self.ids,
+            self._vectors[:self.count],
+            self.payloads,
+            self.sparse,
+            scales=self._scales[:self.count] if self._scales is not None else None,
+        )
+        writer.close()
+
+    # ---- writes ----
+
+    def _writable(self, rows_needed: int) -> None:
+        """Copy a memory-mapped matrix into RAM and grow it to hold `rows_needed` rows."""
+        capacity = len(self._vectors)
+        if isinstance(self._vectors, np.memmap) or rows_needed > capacity:
+            new_capacity = max(rows_needed, capacity * 2 if rows_needed > capacity else capacity, 1024)
+            vectors = np.zeros((new_capacity, self.dimension), dtype=self.dtype)
+            vectors[:self.count] = self._vectors[:self.count]
+            self._vectors = vectors
+            if self._scales is not None:
+                scales = np.ones(new_capacity, dtype=np.float32)
+                scales[:self.count] = self._scales[:self.count]
+                self._scales = scales
+
+    def _changed(self) -> None:
+        self._columns.clear()
+        self._masks.clear()
+
+    def _index_sparse(self, key: str, sparse: dict) -> None:
+        for name, (indices, values) in sparse.items():
+            postings = self._postings.setdefault(name, {})
+            for index, value in zip(indices, values):
+                postings.setdefault(index, {})[key] = value
+
+    def _unindex_sparse(self, key: str, sparse: dict) -> None:
+        for name, (indices, _) in sparse.items():
+            postings = self._postings.get(name, {})
+            for index in indices:
+                posting = postings.get(index)
+                if posting is not None:
+                    posting.pop(key, None)
+                    if not posting:
+                        del postings[index]
+
+    def upsert(self, points: list[models.PointStruct]) -> None:
+        dense, sparse = [], []
+        for point in points:
+            vector = point.vector
+            if isinstance(vector, dict):
+                dense.append(vector.get(""))
+                sparse.append({name: _to_sparse(v) for name, v in vector.items() if name != ""})
+            else:
+                dense.append(vector)
+                sparse.append({})
+        if any(d is None for d in dense):
+            raise ValueError("Every point needs the unnamed dense vector")
+        matrix = _normalize(np.asarray(dense, dtype=np.float32))
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {matrix.shape[1]}")
+        scales = None
+        if self.dtype == "int8":
+            matrix, scales = quantize_int8(matrix)
+
+        new = sum(1 for p in points if str(p.id) not in self.rows)
+        self._writable(self.count + new)
+        for i, point in enumerate(points):
+            key = str(point.id)
+            row = self.rows.get(key)
+            if row is None:
+                row = self.count
+                self.rows[key] = row
+                self.ids.append(point.id)
+                self.payloads.append(point.payload or {})
+                self.sparse.append(sparse[i])
+            else:
+                self._unindex_sparse(key, self.sparse[row])
+                self.payloads[row] = point.payload or {}
+                self.sparse[row] = sparse[i]
+            self._vectors[row] = matrix[i]
+            if scales is not None:
+                self._scales[row] = scales[i]
+            self._index_sparse(key, sparse[i])
+        self._changed()
+
+    def delete_rows(self, rows: list[int]) -> None:
+        """Remove rows, moving the last row into each hole so the matrix stays dense."""
+        if not rows:
+            return
+        self._writable(self.count)
+        for row in sorted(rows, reverse=True):
+            key = str(self.ids[row])
+            self._unindex_sparse(key, self.sparse[row])
+            del self.rows[key]
+            last = self.count - 1
+            if row != last:
+                moved = str(self.ids[last])
+                self.ids[row] = self.ids[last]
+                self.payloads[row] = self.payloads[last]
+                self.sparse[row] = self.sparse[last]
+                self._vectors[row] = self._vectors[last]
+                if self._scales is not None:
+                    self._scales[row] = self._scales[last]
+                self.rows[moved] = row
+            self.ids.pop()
+            self.payloads.pop()
+            self.sparse.pop()
+        self._changed()
+
+    def overwrite_payload(self, ids: list, payload: dict) -> None:
+        for point_id in ids:
+            row = self.rows.get(str(point_id))
+            if row is not None:
+                self.payloads[row] = dict(payload)
+        self._changed()
+
+    # ---- filters ----
+
+    def _column(self, key: str) -> list:
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = [_lookup(p, key) for p in self.payloads]
+        return column
+
+    def mask(self, query_filter: Optional[models.Filter]) -> Optional[np.ndarray]:
+        """Boolean row mask of a filter (None = every row), cached until the next write."""
+        if query_filter is None:
+            return None
+        cache_key = query_filter.model_dump_json()
+        mask = self._masks.get(cache_key)
+        if mask is None:
+            mask = self._filter_mask(query_filter)
+            if len(self._masks) >= MASK_CACHE_SIZE:
+                self._masks.pop(next(iter(self._masks)))
+            self._masks[cache_key] = mask
+        return mask
+
+    def _filter_mask(self, query_filter: models.Filter) -> np.ndarray:
+        mask = np.ones(self.count, dtype=bool)
+        for condition in _as_list(query_filter.must):
+            mask &= self._condition_mask(condition)
+        should = _as_list(query_filter.should)
+        if should:
+            any_mask = np.zeros(self.count, dtype=bool)
+            for condition in should:
+                any_mask |= self._condition_mask(condition)
+            mask &= any_mask
+        for condition in _as_list(query_filter.must_not):
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+    def _condition_mask(self, condition) -> np.ndarray:
+        if isinstance(condition, models.Filter):
+            return self._filter_mask(condition)
+        if isinstance(condition, models.FieldCondition):
+            column = self._column(condition.key)
+            return np.fromiter((_match(condition, v) for v in column), dtype=bool, count=self.count)
+        if isinstance(condition, models.IsEmptyCondition):
+            column = self._column(condition.is_empty.key)
+            return np.fromiter((not _values(v) for v in column), dtype=bool, count=self.count)
+        if isinstance(condition, models.IsNullCondition):
+            column = self._column(condition.is_null.key)
+            return np.fromiter((v is None for v in column), dtype=bool, count=self.count)
+        if isinstance(condition, models.HasIdCondition):
+            mask = np.zeros(self.count, dtype=bool)
+            rows = [self.rows[str(i)] for i in condition.has_id if str(i) in self.rows]
+            mask[rows] = True
+            return mask
+        raise ValueError(f"Unsupported filter condition for the local vector engine: {condition}")
+
+    # ---- search ----
+
+    def dense_scores(self, query: list[float]) -> np.ndarray:
+        """Cosine similarity of every row to the query."""
+        q = _normalize(np.asarray(query, dtype=np.float32))
+        if self.dtype != "int8":
+            return self._vectors[:self.count] @ q
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            block = self._vectors[start:min(start + SCORE_BLOCK_ROWS, self.count)].astype(np.float32)
+            scores[start:start + len(block)] = block @ q
+        return scores * self._scales[:self.count]
+
+    def search_dense(
+        self,
+        query: list[float],
+        limit: int,
+        mask: Optional[np.ndarray],
+        score_threshold: Optional[float],
+    ) -> list[tuple[int, float]]:
+        if self.count == 0 or limit <= 0:
+            return []
+        scores = self.dense_scores(query)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        limit = min(limit, self.count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        floor = -np.inf if score_threshold is None else score_threshold
+        return [(int(row), float(scores[row])) for row in top if scores[row] > -np.inf and scores[row] >= floor]
+
+    def search_sparse(
+        self,
+        name: str,
+        query,
+        limit: int,
+        mask: Optional[np.ndarray],
+        score_threshold: Optional[float],
+    ) -> list[tuple[int, float]]:
+        postings = self._postings.get(name, {})
+        use_idf = (self.sparse_vectors.get(name) or {}).get("modifier") == "idf"
+        indices, values = _to_sparse(query)
+        scores: dict[str, float] = {}
+        for index, value in zip(indices, values):
+            posting = postings.get(index)
+            if not posting:
+                continue
+            weight = value
+            if use_idf:
+                # Qdrant's IDF: ln((N - n + 0.5) / (n + 0.5) + 1)
+                n = len(posting)
+                weight *= math.log((self.count - n + 0.5) / (n + 0.5) + 1)
+            for key, doc_value in posting.items():
+                scores[key] = scores.get(key, 0.0) + weight * doc_value
+        hits = (
+            (self.rows[key], score) for key, score in scores.items()
+            if (mask is None or mask[self.rows[key]]) and (score_threshold is None or score >= score_threshold)
+        )
+        return heapq.nlargest(limit, hits, key=lambda hit: hit[1])
+
+    def record(self, row: int, with_payload, with_vectors) -> dict:
+        vector = None
+        if with_vectors:
+            dense = self._vectors[row].astype(np.float32)
+            if self._scales is not None:
+                dense = dense * self._scales[row]
+            vector = {"": dense.tolist()} if self.sparse[row] else dense.tolist()
+            for name, (indices, values) in self.sparse[row].items():
+                vector[name] = models.SparseVector(indices=list(indices), values=list(values))
+        return {"id": self.ids[row], "payload": self.payloads[row] if with_payload else None, "vector": vector}
+
+
+class LocalVectorEngine:
+    """In-process stand-in for `QdrantClient`, backed by snapshots in a SnapshotStore."""
+
+    def __init__(self, store: SnapshotStore, dtype: str = "float32", refresh_seconds: float = 60.0):
+        self.store = store
+        self.dtype = dtype
+        self.refresh_seconds = refresh_seconds
+        self._collections: dict[str, LocalCollection] = {}
+        self._versions: dict[str, Optional[str]] = {}  # Loaded snapshot version (None = not in the store)
+        self._checked_at: dict[str, float] = {}
+        self._dirty: set[str] = set()
+        self._writes: dict[str, list[Write]] = {}  # Writes since the last save, to replay on conflict
+        self._refreshing: set[str] = set()
+        self._lock = threading.RLock()
+
+    # ---- snapshots ----
+
+    def _get(self, name: str, required: bool = True) -> Optional[LocalCollection]:
+        collection = self._collections.get(name)
+        if collection is None and name not in self._versions:
+            with self._lock:
+                if name not in self._versions:
+                    self._load(name)
+            collection = self._collections.get(name)
+        elif name not in self._dirty and time.monotonic() - self._checked_at.get(name, 0.0) > self.refresh_seconds:
+            self._schedule_refresh(name)
+        if collection is None and required:
+            raise ValueError(f"Collection {name} not found")
+        return collection
+
+    def _load(self, name: str, version: Optional[str] = None) -> None:
+        version = version or self.store.current_version(name)
+        self._checked_at[name] = time.monotonic()
+        if version is None:
+            self._versions[name] = None
+            return
+        started = time.perf_counter()
+        collection = LocalCollection.from_snapshot(Snapshot(self.store.fetch(name, version)))
+        self._collections[name] = collection
+        self._versions[name] = version
+        logger.info(
+            f"Loaded {collection.count} points of {name} (snapshot {version}) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _schedule_refresh(self, name: str) -> None:
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+            self._checked_at[name] = time.monotonic()
+        threading.Thread(target=self._refresh, args=(name,), daemon=True).start()
+
+    def _refresh(self, name: str) -> None:
+        """Swap in a newer snapshot published by another container (keeps serving the old one meanwhile)."""
+        try:
+            version = self.store.current_version(name)
+            if version is not None and version != self._versions.get(name):
+                collection = LocalCollection.from_snapshot(Snapshot(self.store.fetch(name, version)))
+                with self._lock:
+                    if name not in self._dirty:
+                        self._collections[name] = collection
+                        self._versions[name] = version
+                        logger.info(f"Reloaded {name} from snapshot {version}")
+        except Exception as e:
+            logger.error(f"Failed to refresh local collection {name}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def _write(self, name: str, write: Write) -> None:
+        """
+        Apply a write to a collection, first catching up with any newer
+        published snapshot, and remember it until the next save.
+        """
+        if name not in self._dirty:
+            version = self.store.current_version(name)
+            if version is not None and version != self._versions.get(name):
+                self._load(name, version)
+        self._collections[name] = write(self._get(name, required=False))
+        self._writes.setdefault(name, []).append(write)
+        self._dirty.add(name)
+
+    def save(self) -> None:
+        """Publish a new snapshot of every collection changed since the last save."""
+        with self._lock:
+            for name in sorted(self._dirty):
+                self._publish(name)
+                self._checked_at[name] = time.monotonic()
+                self._writes.pop(name, None)
+            self._dirty.clear()
+
+    def _publish(self, name: str) -> None:
+        for _ in range(SAVE_ATTEMPTS):
+            collection = self._collections.get(name)
+            if collection is None:  # Deleted
+                self.store.delete(name)
+                self._versions[name] = None
+                return
+            version = new_version()
+            collection.write_to(self.store.staging_dir(name, version))
+            try:
+                self.store.publish(name, version, expected=self._versions.get(name))
+            except SnapshotConflict as e:
+                logger.warning(f"{e}; replaying {len(self._writes.get(name, []))} writes on it")
+                self._replay(name, e.current)
+                continue
+            self._versions[name] = version
+            logger.info(f"Saved {collection.count} points of {name} as snapshot {version}")
+            return
+        raise RuntimeError(f"Could not publish {name}: {SAVE_ATTEMPTS} attempts raced other writers")
+
+    def _replay(self, name: str, version: Optional[str]) -> None:
+        """Rebuild a collection from another writer's snapshot plus this engine's unsaved writes."""
+        collection = LocalCollection.from_snapshot(Snapshot(self.store.fetch(name, version))) if version else None
+        for write in self._writes.get(name, []):
+            collection = write(collection)
+        self._collections[name] = collection
+        self._versions[name] = version
+
+    def close(self, **kwargs) -> None:
+        self.save()
+
+    # ---- collections ----
+
+    def collection_exists(self, collection_name: str, **kwargs) -> bool:
+        return self._get(collection_name, required=False) is not None
+
+    def get_collections(self, **kwargs) -> models.CollectionsResponse:
+        names = [name for name, c in self._collections.items() if c is not None]
+        return models.CollectionsResponse(collections=[models.CollectionDescription(name=n) for n in names])
+
+    def create_collection(
+        self,
+        collection_name: str,
+        vectors_config: models.VectorParams,
+        sparse_vectors_config: Optional[dict] = None,
+        **kwargs,
+    ) -> bool:
+        """Create an empty collection; HNSW/quantization/on-disk options don't apply to exact search."""
+        if isinstance(vectors_config, dict):
+            vectors_config = vectors_config.get("")
+        if vectors_config is None or vectors_config.distance != models.Distance.COSINE:
+            raise ValueError("The local vector engine supports one unnamed cosine vector")
+        sparse = {
+            name: {"modifier": "idf" if params.modifier == models.Modifier.IDF else None}
+            for name, params in (sparse_vectors_config or {}).items()
+        }
+
+        def write(existing: Optional[LocalCollection]) -> LocalCollection:
+            # Replayed after another writer created it first: keep theirs
+            return existing if existing is not None else LocalCollection(vectors_config.size, self.dtype, sparse)
+
+        with self._lock:
+            if self._get(collection_name, required=False) is not None:
+                raise ValueError(f"Collection {collection_name} already exists")
+            self._write(collection_name, write)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            self._write(collection_name, lambda _: None)
+        return True
+
+    def update_collection(self, collection_name: str, **kwargs) -> bool:
+        self._get(collection_name)  # Index and storage settings have no effect here
+        return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        data_type = str(getattr(field_schema, "value", field_schema or "keyword"))
+
+        def write(collection: Optional[LocalCollection]) -> LocalCollection:
+            collection = _existing(collection_name, collection)
+            collection.payload_schema[field_name] = data_type
+            return collection
+
+        with self._lock:
+            self._write(collection_name, write)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def get_collection(self, collection_name: str, **kwargs) -> models.CollectionInfo:
+        collection = self._get(collection_name)
+        sparse = {
+            name: models.SparseVectorParams(modifier=models.Modifier.IDF if params.get("modifier") == "idf" else None)
+            for name, params in collection.sparse_vectors.items()
+        }
+        return models.CollectionInfo(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            segments_count=1,
+            points_count=collection.count,
+            indexed_vectors_count=collection.count,
+            config=models.CollectionConfig(
+                params=models.CollectionParams(
+                    vectors=models.VectorParams(size=collection.dimension, distance=models.Distance.COSINE),
+                    sparse_vectors=sparse or None,
+                ),
+                hnsw_config=models.HnswConfig(m=0, ef_construct=0, full_scan_threshold=0),
+                optimizer_config=models.OptimizersConfig(default_segment_number=1, flush_interval_sec=0),
+            ),
+            payload_schema={
+                key: models.PayloadIndexInfo(data_type=data_type, points=collection.count)
+                for key, data_type in collection.payload_schema.items()
+            },
+        )
+
+    def count(self, collection_name: str, count_filter: Optional[models.Filter] = None, **kwargs) -> models.CountResult:
+        collection = self._get(collection_name)
+        with self._lock:
+            mask = collection.mask(count_filter)
+            return models.CountResult(count=collection.count if mask is None else int(mask.sum()))
+
+    # ---- points ----
+
+    def upsert(self, collection_name: str, points, **kwargs) -> models.UpdateResult:
+        if isinstance(points, models.Batch):
+            raise ValueError("The local vector engine takes a list of PointStruct")
+        points = list(points)
+
+        def write(collection: Optional[LocalCollection]) -> LocalCollection:
+            collection = _existing(collection_name, collection)
+            collection.upsert(points)
+            return collection
+
+        with self._lock:
+            self._write(collection_name, write)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def retrieve(self, collection_name: str, ids: list, with_payload=True, with_vectors=False, **kwargs) -> list:
+        collection = self._get(collection_name)
+        with self._lock:
+            rows = [collection.rows[str(i)] for i in ids if str(i) in collection.rows]
+            return [models.Record(**collection.record(row, with_payload, with_vectors)) for row in rows]
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload=True,
+        with_vectors=False,
+        **kwargs,
+    ) -> tuple[list, Optional[int]]:
+        """Page through points in storage order; the offset is an opaque row position."""
+        collection = self._get(collection_name)
+        with self._lock:
+            mask = collection.mask(scroll_filter)
+            rows = range(offset or 0, collection.count)
+            if mask is not None:
+                rows = [r for r in rows if mask[r]]
+            page = list(rows[:limit + 1])
+            next_offset = page[limit] if len(page) > limit else None
+            return [models.Record(**collection.record(r, with_payload, with_vectors)) for r in page[:limit]], next_offset
+
+    def delete(self, collection_name: str, points_selector, **kwargs) -> models.UpdateResult:
+
+        def write(collection: Optional[LocalCollection]) -> LocalCollection:
+            collection = _existing(collection_name, collection)
+            if isinstance(points_selector, models.FilterSelector):
+                rows = np.flatnonzero(collection.mask(points_selector.filter)).tolist()
+            else:
+                ids = points_selector.points if isinstance(points_selector, models.PointIdsList) else points_selector
+                rows = [collection.rows[str(i)] for i in ids if str(i) in collection.rows]
+            collection.delete_rows(rows)
+            return collection
+
+        with self._lock:
+            self._write(collection_name, write)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def batch_update_points(self, collection_name: str, update_operations: list, **kwargs) -> list:
+        for operation in update_operations:
+            if not isinstance(operation, models.OverwritePayloadOperation):
+                raise ValueError(f"Unsupported update operation for the local vector engine: {type(operation).__name__}")
+
+        def write(collection: Optional[LocalCollection]) -> LocalCollection:
+            collection = _existing(collection_name, collection)
+            for operation in update_operations:
+                collection.overwrite_payload(operation.overwrite_payload.points, operation.overwrite_payload.payload)
+            return collection
+
+        with self._lock:
+            self._write(collection_name, write)
+        return [models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED) for _ in update_operations]
+
+    # ---- search ----
+
+    def _search(
+        self,
+        collection: LocalCollection,
+        query,
+        using: Optional[str],
+        query_filter: Optional[models.Filter],
+        limit: int,
+        score_threshold: Optional[float],
+        prefetch=None,
+    ) -> list[tuple[int, float]]:
+        if isinstance(query, models.NearestQuery):
+            query = query.nearest
+        mask = collection.mask(query_filter)
+        if isinstance(query, models.FusionQuery):
+            if query.fusion != models.Fusion.RRF:
+                raise ValueError(f"Unsupported fusion for the local vector engine: {query.fusion}")
+            fused: dict[int, float] = {}
+            for p in _as_list(prefetch):
+                hits = self._search(
+                    collection, p.query, p.using, _merge_filters(query_filter, p.filter),
+                    p.limit or limit, p.score_threshold,
+                )
+                for rank, (row, _) in enumerate(hits, start=1):
+                    fused[row] = fused.get(row, 0.0) + 1 / (FUSION_RRF_K + rank)
+            return heapq.nlargest(limit, fused.items(), key=lambda hit: hit[1])
+        if isinstance(query, (models.SparseVector, dict)) or (using and using in collection.sparse_vectors):
+            return collection.search_sparse(using, query, limit, mask, score_threshold)
+        return collection.search_dense(query, limit, mask, score_threshold)
+
+    def query_points(
+        self,
+        collection_name: str,
+        query=None,
+        using: Optional[str] = None,
+        prefetch=None,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload=True,
+        with_vectors=False,
+        score_threshold: Optional[float] = None,
+        **kwargs,
+    ) -> models.QueryResponse:
+        """Exact search; `search_params` (HNSW/quantization) are accepted and ignored."""
+        collection = self._get(collection_name)
+        offset = offset or 0
+        with self._lock:
+            hits = self._search(collection, query, using, query_filter, limit + offset, score_threshold, prefetch)
+            return models.QueryResponse(points=[
+                models.ScoredPoint(version=0, score=score, **collection.record(row, with_payload, with_vectors))
+                for row, score in hits[offset:]
+            ])
+
+    def query_batch_points(self, collection_name: str, requests: list[models.QueryRequest], **kwargs) -> list:
+        return [
+            self.query_points(
+                collection_name,
+                query=r.query,
+                using=r.using,
+                prefetch=r.prefetch,
+                query_filter=r.filter,
+                limit=r.limit or 10,
+                offset=r.offset,
+                with_payload=r.with_payload if r.with_payload is not None else False,
+                with_vectors=r.with_vector,
+                score_threshold=r.score_threshold,
+            )
+            for r in requests
+        ]
+
+
+def _existing(name: str, collection: Optional[LocalCollection]) -> LocalCollection:
+    if collection is None:
+        raise ValueError(f"Collection {name} not found")
+    return collection
+
+
+def _merge_filters(outer: Optional[models.Filter], inner: Optional[models.Filter]) -> Optional[models.Filter]:
+    if outer is None or inner is None:
+        return outer or inner
+    return models.Filter(must=[outer, inner])
+
+
+class AsyncLocalVectorEngine:
+    """`AsyncQdrantClient` counterpart of a LocalVectorEngine; calls run in a worker thread."""
+
+    def __init__(self, engine: LocalVectorEngine):
+        self.engine = engine
+
+    def __getattr__(self, name: str):
+        method = getattr(self.engine, name)
+
+        async def call(*args, **kwargs):
+            # The first call may load a snapshot; keep that off the event loop
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+    async def close(self, **kwargs) -> None:
+        """The sync engine owns the data; it saves when it is closed."""
@@ -0,0 +1,134 @@
+"""
+Apply a collection profile to an existing Qdrant collection.
+
+Two ways to migrate:
+
+- In place (`--in-place`): update the collection's quantization, on-disk
+  storage and HNSW parameters. Qdrant rebuilds the index in the background
+  and keeps serving searches meanwhile.
+- Copy (`--copy-to NEW`): create a new collection with the profile and copy
+  every point into it, reusing the stored dense vectors (no re-embedding)
+  and computing BM25 sparse vectors from the chunk text. This is also how an
+  older collection gains hybrid search. Point QDRANT_COLLECTION_NAME at the
+  new collection once it is done.
+
+Usage (from backend/):
+    uv run python -m app.embeddings.migrate --profile balanced --in-place
+    uv run python -m app.embeddings.migrate --profile balanced --copy-to aml_policies_v2
+"""
+
+import argparse
+import logging
+from typing import Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
+
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.embeddings.profiles import (
+    PROFILES,
+    CollectionProfile,
+    get_collection_profile,
+    hnsw_config,
+    quantization_config,
+    vectors_update,
+)
+from app.embeddings.sparse import SPARSE_VECTOR_NAME, BM25SparseEmbeddings
+from app.embeddings.vecstore import (
+    CONTENT_PAYLOAD_KEY,
+    create_collection,
+    ensure_payload_indexes,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_in_place(client: QdrantClient, collection_name: str, profile: CollectionProfile) -> None:
+    """Update an existing collection's storage and index settings to the profile."""
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_update(profile),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile),
+    )
+    logger.info(f"Collection {collection_name} updated to profile {profile.name}; Qdrant is re-indexing")
+
+
+def copy_collection(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    profile: CollectionProfile,
+    batch_size: int = 256,
+) -> int:
+    """
+    Copy every point of `source` into a new `target` collection built with the profile.
+
+    Returns:
+        Number of points copied.
+    """
+    if client.collection_exists(target):
+        raise ValueError(f"Collection {target} already exists")
+    create_collection(client, target, profile)
+    ensure_payload_indexes(client, target)
+    has_sparse = SPARSE_VECTOR_NAME in (client.get_collection(target).config.params.sparse_vectors or {})
+    sparse_embeddings = BM25SparseEmbeddings()
+
+    copied = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not points:
+            break
+        dense = [p.vector.get("") if isinstance(p.vector, dict) else p.vector for p in points]
+        if has_sparse:
+            sparse = sparse_embeddings.embed_documents([p.payload.get(CONTENT_PAYLOAD_KEY, "") for p in points])
+            vectors = [{"": d, SPARSE_VECTOR_NAME: s} for d, s in zip(dense, sparse)]
+        else:
+            vectors = dense
+        client.upsert(
+            collection_name=target,
+            points=[PointStruct(id=p.id, vector=v, payload=p.payload) for p, v in zip(points, vectors)],
+        )
+        copied += len(points)
+        logger.info(f"Copied {copied} points from {source} to {target}")
+        if offset is None:
+            break
+    return copied
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    settings = init_settings()
+    parser = argparse.ArgumentParser(description="Apply a Qdrant collection profile")
+    parser.add_argument("--profile", choices=list(PROFILES), default=settings.QDRANT_COLLECTION_PROFILE)
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION_NAME, help="Source collection")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--in-place", action="store_true", help="Update the collection's settings")
+    mode.add_argument("--copy-to", metavar="NEW", help="Copy into a new collection built with the profile")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # The profile named on the command line, with the usual QDRANT_* overrides
+    profile = get_collection_profile(settings.model_copy(update={"QDRANT_COLLECTION_PROFILE": args.profile}))
+    client = registry.get("qdrant_client")
+    try:
+        if args.in_place:
+            migrate_in_place(client, args.collection, profile)
+        else:
+            copied = copy_collection(client, args.collection, args.copy_to, profile, args.batch_size)
+            print(f"Copied {copied} points. Set QDRANT_COLLECTION_NAME={args.copy_to} to switch over.")
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Qdrant collection performance profiles for the AML Policy FAQ Bot.
+
+A profile bundles the storage and index choices made when the collection is
+created (quantization, on-disk original vectors, HNSW graph parameters) with
+the per-query search parameters that go with them (`hnsw_ef`, exact search,
+rescoring of quantized candidates against the original vectors).
+
+QDRANT_COLLECTION_PROFILE picks a named profile; the QDRANT_* overrides in
+Settings change individual fields. `benchmarks.collection_profiles` measures
+recall against exact search and latency for each profile, and
+`python -m app.embeddings.migrate` applies a profile to an existing
+collection.
+"""
+
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParamsDiff,
+)
+
+from app.core.config import Settings, init_settings
+
+
+class CollectionProfile(BaseModel):
+    """Storage, index and search settings for the dense vectors."""
+
+    name: str
+    quantization: Literal["none", "scalar", "binary"] = "none"
+    on_disk: bool = False  # Keep original float32 vectors on disk (quantized copies stay in RAM)
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: Optional[int] = None  # Search-time beam width; None = Qdrant's default (ef_construct)
+    exact: bool = False  # Brute force instead of HNSW
+    rescore: bool = True  # Re-rank quantized candidates with the original vectors
+    oversampling: float = 1.0  # Quantized candidates fetched per requested result
+
+
+PROFILES: dict[str, CollectionProfile] = {
+    p.name: p
+    for p in (
+        # What the collection was created with before profiles existed
+        CollectionProfile(name="baseline"),
+        # int8 vectors in RAM (4x smaller), originals on disk for rescoring
+        CollectionProfile(
+            name="balanced",
+            quantization="scalar",
+            on_disk=True,
+            hnsw_ef=64,
+            oversampling=2.0,
+        ),
+        # 1-bit vectors in RAM (32x smaller); needs more oversampling to keep recall
+        CollectionProfile(
+            name="memory",
+            quantization="binary",
+            on_disk=True,
+            hnsw_ef_construct=128,
+            hnsw_ef=128,
+            oversampling=3.0,
+        ),
+        # Denser graph and wider search for the best recall at more RAM/latency
+        CollectionProfile(
+            name="accuracy",
+            hnsw_m=32,
+            hnsw_ef_construct=256,
+            hnsw_ef=128,
+        ),
+        # Brute force: ground truth for benchmarks, fine for very small corpora
+        CollectionProfile(name="exact", exact=True),
+    )
+}
+
+
+def get_collection_profile(settings: Optional[Settings] = None) -> CollectionProfile:
+    """The configured profile with any QDRANT_* overrides applied."""
+    settings = settings or init_settings()
+    if settings.QDRANT_COLLECTION_PROFILE not in PROFILES:
+        raise ValueError(
+            f"Unknown QDRANT_COLLECTION_PROFILE {settings.QDRANT_COLLECTION_PROFILE!r}; "
+            f"choose one of {', '.join(PROFILES)}"
+        )
+    overrides = {
+        "quantization": settings.QDRANT_QUANTIZATION,
+        "on_disk": settings.QDRANT_ON_DISK,
+        "hnsw_m": settings.QDRANT_HNSW_M,
+        "hnsw_ef_construct": settings.QDRANT_HNSW_EF_CONSTRUCT,
+        "hnsw_ef": settings.QDRANT_SEARCH_HNSW_EF,
+        "exact": settings.QDRANT_SEARCH_EXACT,
+        "rescore": settings.QDRANT_RESCORE,
+        "oversampling": settings.QDRANT_OVERSAMPLING,
+    }
+    return PROFILES[settings.QDRANT_COLLECTION_PROFILE].model_copy(
+        update={k: v for k, v in overrides.items() if v is not None}
+    )
+
+
+def hnsw_config(profile: CollectionProfile) -> HnswConfigDiff:
+    return HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct)
+
+
+def quantization_config(profile: CollectionProfile):
+    """Quantization for create/update_collection (Disabled turns it off on update)."""
+    if profile.quantization == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8,
+            quantile=0.99,  # Clip outliers so the int8 range isn't wasted
+            always_ram=True,
+        ))
+    if profile.quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return Disabled.DISABLED
+
+
+def vectors_update(profile: CollectionProfile) -> dict[str, VectorParamsDiff]:
+    """Changes to the unnamed dense vector for update_collection."""
+    return {"": VectorParamsDiff(on_disk=profile.on_disk)}
+
+
+def search_params(profile: CollectionProfile) -> SearchParams:
+    """Per-query search parameters matching the profile."""
+    return SearchParams(
+        hnsw_ef=profile.hnsw_ef,
+        exact=profile.exact,
+        quantization=(
+            QuantizationSearchParams(rescore=profile.rescore, oversampling=profile.oversampling)
+            if profile.quantization != "none" else None
+        ),
+    )
+
+
+def profile_drift(info, profile: CollectionProfile) -> list[str]:
+    """Differences between an existing collection's storage/index settings and a profile."""
+    config = info.config
+    vectors = config.params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors.get("")
+    quantization = config.quantization_config
+    current_quantization = (
+        "scalar" if isinstance(quantization, ScalarQuantization)
+        else "binary" if isinstance(quantization, BinaryQuantization)
+        else "none"
+    )
+    current = {
+        "quantization": current_quantization,
+        "on_disk": bool(vectors is not None and vectors.on_disk),
+        "hnsw_m": config.hnsw_config.m,
+        "hnsw_ef_construct": config.hnsw_config.ef_construct,
+    }
+    return [
+        f"{field}: {value} (profile {profile.name} wants {getattr(profile, field)})"
+        for field, value in current.items()
+        if value != getattr(profile, field)
+    ]
@@ -0,0 +1,374 @@
+"""
+Vector collection snapshots for the AML Policy FAQ Bot.
+
+A snapshot is a directory holding:
+
+- `vectors.bin`: dense vectors as a raw row-major float32 or int8 matrix,
+  memory-mapped on load so only the pages a search touches are read
+- `scales.bin`: per-row float32 scale factors when the vectors are int8
+- `points.jsonl.gz`: one line per point, in matrix row order, with its ID,
+  payload and sparse vectors
+- `manifest.json`: point count, dimension, dtype, sparse vector config and
+  payload indexes. Written last, so a snapshot without one is incomplete.
+
+Snapshots are kept in a SnapshotStore - a local directory, or S3_BUCKET with
+a local download cache - under `<collection>/<version>/`, with a `CURRENT`
+object naming the version to load. Publishing swaps `CURRENT` only if it
+still names the version the writer started from (a file lock locally, a
+conditional put in S3), so concurrent writers can't overwrite each other.
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.bin"
+SCALES_FILE = "scales.bin"
+POINTS_FILE = "points.jsonl.gz"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "CURRENT.lock"
+
+VECTOR_DTYPES = ("float32", "int8")
+
+
+class SnapshotConflict(Exception):
+    """Another writer published a version since the one this write started from."""
+
+    def __init__(self, collection: str, expected: Optional[str], current: Optional[str]):
+        super().__init__(f"Snapshot of {collection} is at {current}, expected {expected}")
+        self.current = current
+
+
+def new_version() -> str:
+    """A snapshot version name; later versions sort after earlier ones."""
+    return f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (int8 rows, float32 scales)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class SnapshotWriter:
+    """Writes a snapshot incrementally, a batch of points at a time."""
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int,
+        dtype: str = "float32",
+        sparse_vectors: Optional[dict] = None,
+        payload_schema: Optional[dict] = None,
+    ):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype!r}; choose one of {', '.join(VECTOR_DTYPES)}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dimension = dimension
+        self.dtype = dtype
+        self.sparse_vectors = sparse_vectors or {}
+        self.payload_schema = payload_schema or {}
+        self.count = 0
+        self._vectors = open(os.path.join(directory, VECTORS_FILE), "wb")
+        self._scales = open(os.path.join(directory, SCALES_FILE), "wb") if dtype == "int8" else None
+        self._points = gzip.open(os.path.join(directory, POINTS_FILE), "wt", encoding="utf-8", compresslevel=6)
+
+    def write(
+        self,
+        ids: list,
+        vectors: np.ndarray,
+        payloads: list[dict],
+        sparse: Optional[list[dict]] = None,
+        scales: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Append points.
+
+        Args:
+            ids: Point IDs.
+            vectors: Dense vectors, float32 (quantized here for int8 snapshots)
+                or int8 together with `scales`.
+            payloads: Point payloads.
+            sparse: Per point, {sparse vector name: (indices, values)}.
+            scales: Row scales of already-quantized int8 vectors.
+        """
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got shape {vectors.shape}")
+        if self.dtype == "int8":
+            if vectors.dtype != np.int8:
+                vectors, scales = quantize_int8(vectors)
+            self._scales.write(np.ascontiguousarray(scales, dtype=np.float32).tobytes())
+        else:
+            vectors = vectors.astype(np.float32, copy=False)
+        self._vectors.write(np.ascontiguousarray(vectors).tobytes())
+        for i, (point_id, payload) in enumerate(zip(ids, payloads)):
+            line = {"id": point_id, "payload": payload}
+            if sparse is not None and sparse[i]:
+                line["sparse"] = {
+                    name: [list(map(int, indices)), list(map(float, values))]
+                    for name, (indices, values) in sparse[i].items()
+                }
+            self._points.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += len(ids)
+
+    def close(self) -> dict:
+        """Finish the files and write the manifest; returns the manifest."""
+        self._vectors.close()
+        if self._scales is not None:
+            self._scales.close()
+        self._points.close()
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "count": self.count,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "sparse_vectors": self.sparse_vectors,
+            "payload_schema": self.payload_schema,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        return manifest
+
+
+class Snapshot:
+    """A written snapshot: memory-mapped vectors plus a stream of point records."""
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {self.manifest.get('format')} in {directory}")
+        self.directory = directory
+        self.count: int = self.manifest["count"]
+        self.dimension: int = self.manifest["dimension"]
+        self.dtype: str = self.manifest["dtype"]
+
+    def vectors(self) -> np.ndarray:
+        """The (count, dimension) matrix, memory-mapped read-only."""
+        if self.count == 0:
+            return np.zeros((0, self.dimension), dtype=self.dtype)
+        return np.memmap(
+            os.path.join(self.directory, VECTORS_FILE), dtype=self.dtype, mode="r",
+            shape=(self.count, self.dimension),
+        )
+
+    def scales(self) -> Optional[np.ndarray]:
+        """Per-row scales of int8 vectors (None for float32)."""
+        if self.dtype != "int8":
+            return None
+        if self.count == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.memmap(os.path.join(self.directory, SCALES_FILE), dtype=np.float32, mode="r", shape=(self.count,))
+
+    def points(self) -> Iterator[dict]:
+        """Point records ({"id", "payload", "sparse"?}) in row order."""
+        with gzip.open(os.path.join(self.directory, POINTS_FILE), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+# ============== Snapshot stores ==============
+
+class SnapshotStore(ABC):
+    """Where snapshot versions of each collection are kept."""
+
+    @abstractmethod
+    def current_version(self, collection: str) -> Optional[str]:
+        """The version to load, or None if the collection has no snapshot."""
+
+    @abstractmethod
+    def staging_dir(self, collection: str, version: str) -> str:
+        """Local directory to write a new snapshot version into."""
+
+    @abstractmethod
+    def fetch(self, collection: str, version: str) -> str:
+        """Local directory holding the given version (downloaded if needed)."""
+
+    @abstractmethod
+    def publish(self, collection: str, version: str, expected: Optional[str]) -> None:
+        """
+        Make a written version current and drop older ones.
+
+        Args:
+            collection: Collection name.
+            version: The written version.
+            expected: The version the write started from (None for none).
+
+        Raises:
+            SnapshotConflict: The current version is no longer `expected`.
+        """
+
+    @abstractmethod
+    def delete(self, collection: str) -> None:
+        """Remove every version of a collection."""
+
+
+class LocalSnapshotStore(SnapshotStore):
+    """Snapshots in a local directory (local development, single host)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, collection: str, *names: str) -> str:
+        return os.path.join(self.root, collection, *names)
+
+    def current_version(self, collection: str) -> Optional[str]:
+        try:
+            with open(self._path(collection, CURRENT_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def staging_dir(self, collection: str, version: str) -> str:
+        return self._path(collection, version)
+
+    def fetch(self, collection: str, version: str) -> str:
+        return self._path(collection, version)
+
+    def publish(self, collection: str, version: str, expected: Optional[str]) -> None:
+        import fcntl  # Deferred: POSIX only, and only needed to publish local snapshots
+
+        # Lock the check-and-swap against other processes publishing on this host
+        with open(self._path(collection, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self.current_version(collection)
+            if current != expected:
+                raise SnapshotConflict(collection, expected, current)
+            # Write-then-rename so readers never see a half-written pointer
+            path = self._path(collection, CURRENT_FILE)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(f"{path}.tmp", path)
+            _prune_local(self._path(collection), keep=version)
+
+    def delete(self, collection: str) -> None:
+        shutil.rmtree(self._path(collection), ignore_errors=True)
+
+
+class S3SnapshotStore(SnapshotStore):
+    """Snapshots in S3, shared by every Lambda container and cached under a local directory."""
+
+    def __init__(self, bucket: str, prefix: str, cache_dir: str):
+        import boto3  # Deferred: only needed when snapshots live in S3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_dir = cache_dir
+        self.client = boto3.client("s3")
+
+    def _key(self, collection: str, *names: str) -> str:
+        return "/".join([f"{self.prefix}{collection}", *names])
+
+    def current_version(self, collection: str) -> Optional[str]:
+        return self._current(collection)[0]
+
+    def _current(self, collection: str) -> tuple[Optional[str], Optional[str]]:
+        """The current version and the ETag of the `CURRENT` object."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(collection, CURRENT_FILE))
+        except self.client.exceptions.NoSuchKey:
+            return None, None
+        return response["Body"].read().decode("utf-8").strip() or None, response["ETag"]
+
+    def staging_dir(self, collection: str, version: str) -> str:
+        return os.path.join(self.cache_dir, collection, version)
+
+    def fetch(self, collection: str, version: str) -> str:
+        directory = self.staging_dir(collection, version)
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            return directory
+        os.makedirs(directory, exist_ok=True)
+        for name in (VECTORS_FILE, SCALES_FILE, POINTS_FILE, MANIFEST_FILE):
+            try:
+                self.client.download_file(self.bucket, self._key(collection, version, name), os.path.join(directory, name))
+            except self.client.exceptions.ClientError as e:
+                if name != SCALES_FILE:  # Only int8 snapshots have scales
+                    raise FileNotFoundError(f"Snapshot {collection}/{version} is missing {name}") from e
+        _prune_local(os.path.join(self.cache_dir, collection), keep=version)
+        return directory
+
+    def publish(self, collection: str, version: str, expected: Optional[str]) -> None:
+        current, etag = self._current(collection)
+        if current != expected:
+            raise SnapshotConflict(collection, expected, current)
+        directory = self.staging_dir(collection, version)
+        # Manifest last, then the pointer: a reader never sees a partial version
+        for name in (VECTORS_FILE, SCALES_FILE, POINTS_FILE, MANIFEST_FILE):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                self.client.upload_file(path, self.bucket, self._key(collection, version, name))
+        # Only replace the pointer that was read above; a writer that got in
+        # between makes S3 reject the put
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._key(collection, CURRENT_FILE),
+                Body=version.encode("utf-8"),
+                ContentType="text/plain",
+                **condition,
+            )
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise
+            self._delete_prefix(self._key(collection, version) + "/")
+            raise SnapshotConflict(collection, expected, self.current_version(collection)) from e
+        # Keep the previous version for containers still downloading it
+        versions = sorted(self._versions(collection))
+        stale = [v for v in versions if v < version and v != expected]
+        for old in stale:
+            self._delete_prefix(self._key(collection, old) + "/")
+        _prune_local(os.path.join(self.cache_dir, collection), keep=version)
+
+    def delete(self, collection: str) -> None:
+        self._delete_prefix(self._key(collection) + "/")
+        shutil.rmtree(os.path.join(self.cache_dir, collection), ignore_errors=True)
+
+    def _versions(self, collection: str) -> list[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        prefix = self._key(collection) + "/"
+        versions = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+            versions.extend(p["Prefix"][len(prefix):].rstrip("/") for p in page.get("CommonPrefixes", []))
+        return versions
+
+    def _delete_prefix(self, prefix: str) -> None:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            keys = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+            if keys:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys})
+
+
+def _prune_local(directory: str, keep: str) -> None:
+    """
+    Remove local snapshot versions other than `keep` (open memory maps stay valid).
+
+    Versions without a manifest are skipped: another writer may still be writing them.
+    """
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name != keep and os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            shutil.rmtree(path, ignore_errors=True)
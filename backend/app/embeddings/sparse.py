@@ -0,0 +1,78 @@
+"""
+BM25 sparse vectors for lexical retrieval in the AML Policy FAQ Bot.
+
+AML questions often hinge on exact terms ("CTR", "PEP", "Section 12",
+"10,000") that dense embeddings blur. Chunks are also stored with a sparse
+vector of BM25 term-frequency weights. Qdrant applies IDF over the whole
+collection at query time (`Modifier.IDF`), so term statistics stay correct
+as documents come and go, and no embedding API call is needed.
+"""
+
+import re
+import zlib
+from collections import Counter
+
+from langchain_qdrant import SparseEmbeddings
+from qdrant_client.http.models import SparseVector
+
+
+# Named sparse vector in the Qdrant collection
+SPARSE_VECTOR_NAME = "bm25"
+
+# BM25 parameters; chunks are close to CHUNK_TOKENS, so a fixed average
+# length (in terms, after stopword removal) is good enough for normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVG_CHUNK_TERMS = 100
+
+# Numbers (keeping "10,000" and "5.2" whole) and words
+_TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*|[a-z]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "may must not of on or our shall should so such than that the their then there these "
+    "they this to under was we were what when where which who whom why will with would you".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms with stopwords removed and simple plurals folded."""
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token[0].isdigit():
+            token = token.replace(",", "")
+        elif token in STOPWORDS:
+            continue
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]  # "PEPs" -> "pep", "reports" -> "report"
+        terms.append(token)
+    return terms
+
+
+def term_index(term: str) -> int:
+    """Stable 32-bit sparse index of a term."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse_vector(weights: dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+class BM25SparseEmbeddings(SparseEmbeddings):
+    """BM25 document weights and binary query vectors (IDF is applied by Qdrant)."""
+
+    def embed_documents(self, texts: list[str]) -> list[SparseVector]:
+        return [self._document_vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        return _to_sparse_vector({term_index(term): 1.0 for term in set(tokenize(text))})
+
+    def _document_vector(self, text: str) -> SparseVector:
+        terms = tokenize(text)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / AVG_CHUNK_TERMS)
+        weights: dict[int, float] = {}
+        for term, tf in Counter(terms).items():
+            index = term_index(term)
+            weights[index] = weights.get(index, 0.0) + tf * (BM25_K1 + 1) / (tf + length_norm)
+        return _to_sparse_vector(weights)
@@ -1,35 +1,129 @@
 """
 Vector store management for the AML Policy FAQ Bot.
 
-Uses Qdrant Cloud for vector storage.
+Uses Qdrant Cloud for vector storage, or the embedded engine in
+`app.embeddings.local_engine` when VECTOR_BACKEND is "local".
 """
 
-from langchain_qdrant import QdrantVectorStore
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    IsEmptyCondition,
+    MatchAny,
+    MatchValue,
+    Modifier,
+    OverwritePayloadOperation,
+    PayloadField,
+    PayloadSchemaType,
+    PointStruct,
+    QueryRequest,
+    SetPayload,
+    SparseVectorParams,
+    VectorParams,
+)
 
+from app.cache.semantic_cache import get_answer_cache, policy_key
 from app.core.config import init_settings
-from app.embeddings.embedder import get_embeddings
+from app.core.metrics import observe, timer
+from app.core.resources import registry
+from app.embeddings.chunking import TokenChunker
+from app.embeddings.dedup import (
+    DUPLICATE_TEXTS_KEY,
+    LSH_PAYLOAD_KEY,
+    MinHashLSH,
+    can_merge,
+    drop_sources,
+    duplicate_texts,
+    file_key,
+    lsh_bands,
+    merge_sources,
+    minhash_signature,
+    similarity,
+    source_entry,
+    text_fingerprint,
+    with_duplicates,
+)
+from app.embeddings.embedder import get_cached_embeddings
+from app.embeddings.local_engine import AsyncLocalVectorEngine, LocalVectorEngine
+from app.embeddings.profiles import (
+    CollectionProfile,
+    get_collection_profile,
+    hnsw_config,
+    profile_drift,
+    quantization_config,
+    search_params,
+)
+from app.embeddings.snapshot import LocalSnapshotStore, S3SnapshotStore
+from app.embeddings.sparse import SPARSE_VECTOR_NAME, BM25SparseEmbeddings
+
+logger = logging.getLogger(__name__)
 
 # NVIDIA embedding dimension (nv-embedqa-e5-v5 = 1024)
 EMBEDDING_DIMENSION = 1024
 
+# Payload keys under which langchain-qdrant stores chunk text and metadata
+CONTENT_PAYLOAD_KEY = "page_content"
+METADATA_PAYLOAD_KEY = "metadata"
+
+# Called with (chunks_written, total_chunks) as ingestion progresses
+ProgressCallback = Callable[[int, int], None]
+
+# Metadata fields written by /ingest that queries can filter on (the plural
+# ones list every source of a point that duplicate chunks were merged into)
+INDEXED_METADATA_FIELDS = ("jurisdiction", "policy_name", "jurisdictions", "policy_names")
+
+VECTOR_BACKENDS = ("qdrant", "local")
+
+# Namespace for deterministic point IDs derived from chunk content hashes
+POINT_ID_NAMESPACE = uuid.UUID("6f1c8f57-3f0e-4d55-9a4e-2b7d3c1a9e10")
+
+
+def get_text_splitter() -> TokenChunker:
+    """Get the configured text splitter (chunks sized in embedding model tokens)."""
+    settings = init_settings()
+    return TokenChunker(settings.CHUNK_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+
+
+def _check_backend(backend: str) -> None:
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown VECTOR_BACKEND {backend!r}; choose one of {', '.join(VECTOR_BACKENDS)}")
+
 
-def get_text_splitter() -> RecursiveCharacterTextSplitter:
-    """Get the configured text splitter."""
+def _create_local_engine() -> LocalVectorEngine:
+    """Embedded engine over snapshots in S3_BUCKET (shared by containers) or a local directory."""
     settings = init_settings()
-    return RecursiveCharacterTextSplitter(
-        chunk_size=settings.CHUNK_SIZE,
-        chunk_overlap=settings.CHUNK_OVERLAP,
-        separators=["\n\n", "\n", ". ", " ", ""]
+    if settings.S3_BUCKET:
+        store = S3SnapshotStore(settings.S3_BUCKET, settings.LOCAL_VECTOR_S3_PREFIX, settings.LOCAL_VECTOR_DIR)
+    else:
+        store = LocalSnapshotStore(settings.LOCAL_VECTOR_DIR)
+    return LocalVectorEngine(
+        store,
+        dtype=settings.LOCAL_VECTOR_DTYPE,
+        refresh_seconds=settings.LOCAL_VECTOR_REFRESH_SECONDS,
     )
 
 
 def _get_qdrant_client() -> QdrantClient:
-    """Get Qdrant client configured for Qdrant Cloud."""
+    """Get Qdrant client configured for Qdrant Cloud (or the embedded engine)."""
     settings = init_settings()
+    _check_backend(settings.VECTOR_BACKEND)
+    if settings.VECTOR_BACKEND == "local":
+        return registry.get("local_vector_engine")
     
     if not settings.QDRANT_URL or not settings.QDRANT_API_KEY:
         raise ValueError("QDRANT_URL and QDRANT_API_KEY are required")
@@ -41,55 +135,886 @@ def _get_qdrant_client() -> QdrantClient:
     )
 
 
-def _ensure_collection_exists(client: QdrantClient, collection_name: str):
-    """Ensure the collection exists, create if not."""
-    collections = client.get_collections().collections
-    exists = any(c.name == collection_name for c in collections)
+def _get_async_qdrant_client() -> AsyncQdrantClient:
+    """Get async Qdrant client, used for non-blocking ingestion writes."""
+    settings = init_settings()
+    _check_backend(settings.VECTOR_BACKEND)
+    if settings.VECTOR_BACKEND == "local":
+        return AsyncLocalVectorEngine(registry.get("local_vector_engine"))
     
-    if not exists:
-        client.create_collection(
+    if not settings.QDRANT_URL or not settings.QDRANT_API_KEY:
+        raise ValueError("QDRANT_URL and QDRANT_API_KEY are required")
+    
+    return AsyncQdrantClient(
+        url=settings.QDRANT_URL,
+        api_key=settings.QDRANT_API_KEY.get_secret_value(),
+        prefer_grpc=True,
+    )
+
+
+def create_collection(client: QdrantClient, collection_name: str, profile: CollectionProfile) -> None:
+    """Create a collection laid out according to a profile (plus BM25 vectors when enabled)."""
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(
+            size=EMBEDDING_DIMENSION,
+            distance=Distance.COSINE,
+            on_disk=profile.on_disk,
+        ),
+        sparse_vectors_config=(
+            {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+            if init_settings().HYBRID_SEARCH_ENABLED else None
+        ),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile) if profile.quantization != "none" else None,
+    )
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str, indexed: Optional[dict] = None) -> None:
+    """Keyword indexes keep filtered HNSW search fast; creating them is idempotent."""
+    if indexed is None:
+        indexed = client.get_collection(collection_name).payload_schema
+    for field in INDEXED_METADATA_FIELDS:
+        key = f"{METADATA_PAYLOAD_KEY}.{field}"
+        if key not in (indexed or {}):
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=key,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+    if LSH_PAYLOAD_KEY not in (indexed or {}):
+        client.create_payload_index(
             collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=EMBEDDING_DIMENSION,
-                distance=Distance.COSINE,
-            ),
+            field_name=LSH_PAYLOAD_KEY,
+            field_schema=PayloadSchemaType.INTEGER,
         )
 
 
-def get_vector_store() -> QdrantVectorStore:
-    """Get Qdrant vector store."""
+def _ensure_collection_exists(client: QdrantClient, collection_name: str) -> bool:
+    """
+    Ensure the collection and its payload indexes exist, create if not.
+    
+    Returns:
+        Whether the collection has the BM25 sparse vector for hybrid search.
+    """
+    settings = init_settings()
+    profile = get_collection_profile()
+    if not client.collection_exists(collection_name):
+        create_collection(client, collection_name, profile)
+    
+    info = client.get_collection(collection_name)
+    # The embedded engine always searches exactly; profiles only describe Qdrant
+    drift = profile_drift(info, profile) if settings.VECTOR_BACKEND == "qdrant" else []
+    if drift:
+        logger.warning(
+            f"Collection {collection_name} doesn't match profile {profile.name} ({'; '.join(drift)}); "
+            f"apply it with `python -m app.embeddings.migrate --in-place`"
+        )
+    has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    if settings.HYBRID_SEARCH_ENABLED and not has_sparse:
+        # Sparse vectors can't be added to an existing collection
+        logger.warning(
+            f"Collection {collection_name} has no '{SPARSE_VECTOR_NAME}' sparse vector; using dense-only "
+            f"search until it is copied with `python -m app.embeddings.migrate --copy-to NEW`"
+        )
+    
+    ensure_payload_indexes(client, collection_name, info.payload_schema)
+    
+    return has_sparse and settings.HYBRID_SEARCH_ENABLED
+
+
+def build_metadata_filter(
+    jurisdiction: Optional[str] = None,
+    policy_filter: Optional[list[str]] = None,
+) -> Optional[Filter]:
+    """
+    Build a Qdrant filter from the query's jurisdiction and policy names.
+    
+    Returns:
+        A Filter on the indexed metadata fields, or None to search everything.
+    """
+    conditions = []
+    if jurisdiction:
+        conditions.append(Filter(should=[
+            FieldCondition(key=f"{METADATA_PAYLOAD_KEY}.{field}", match=MatchValue(value=jurisdiction))
+            for field in ("jurisdiction", "jurisdictions")
+        ]))
+    if policy_filter:
+        conditions.append(Filter(should=[
+            FieldCondition(key=f"{METADATA_PAYLOAD_KEY}.{field}", match=MatchAny(any=list(policy_filter)))
+            for field in ("policy_name", "policy_names")
+        ]))
+    return Filter(must=conditions) if conditions else None
+
+
+def _create_vector_store() -> QdrantVectorStore:
+    """Build the Qdrant vector store on top of the shared client and embeddings."""
     settings = init_settings()
-    client = _get_qdrant_client()
+    client = registry.get("qdrant_client")
     
-    # Ensure collection exists
-    _ensure_collection_exists(client, settings.QDRANT_COLLECTION_NAME)
+    # Checked once per process, not on every request
+    hybrid = _ensure_collection_exists(client, settings.QDRANT_COLLECTION_NAME)
     
+    if not hybrid:
+        return QdrantVectorStore(
+            client=client,
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            embedding=registry.get("embeddings"),
+        )
+    # Hybrid mode: retrievers fuse dense and BM25 results in Qdrant (RRF)
     return QdrantVectorStore(
         client=client,
         collection_name=settings.QDRANT_COLLECTION_NAME,
-        embedding=get_embeddings(),
+        embedding=registry.get("embeddings"),
+        retrieval_mode=RetrievalMode.HYBRID,
+        sparse_embedding=BM25SparseEmbeddings(),
+        sparse_vector_name=SPARSE_VECTOR_NAME,
+    )
+
+
+registry.register("local_vector_engine", _create_local_engine, closer=lambda engine: engine.close())
+registry.register(
+    "qdrant_client",
+    _get_qdrant_client,
+    closer=lambda client: client.close(),
+    depends_on=("local_vector_engine",),
+)
+registry.register(
+    "async_qdrant_client",
+    _get_async_qdrant_client,
+    closer=lambda client: client.close(),
+    depends_on=("local_vector_engine",),
+)
+registry.register("embeddings", get_cached_embeddings)
+registry.register(
+    "vector_store",
+    _create_vector_store,
+    depends_on=("qdrant_client", "embeddings"),
+)
+
+
+registry.register("search_params", lambda: search_params(get_collection_profile()))
+
+
+def get_vector_store() -> QdrantVectorStore:
+    """Get the shared Qdrant vector store (created on first use)."""
+    return registry.get("vector_store")
+
+
+def get_search_params():
+    """Per-query HNSW / quantization parameters of the configured collection profile."""
+    return registry.get("search_params")
+
+
+def is_hybrid(vector_store: QdrantVectorStore) -> bool:
+    """Whether the store's collection carries BM25 sparse vectors."""
+    return vector_store.retrieval_mode == RetrievalMode.HYBRID
+
+
+async def dense_search(
+    vector_store: QdrantVectorStore,
+    query_vector: list[float],
+    k: int,
+    score_threshold: Optional[float] = None,
+    metadata_filter: Optional[Filter] = None,
+) -> list[tuple[Document, float]]:
+    """
+    Dense search with an already embedded question.
+    
+    Goes straight to the async client: the vector store's own search methods
+    re-validate the collection (a get_collection call) on every query.
+    """
+    client: AsyncQdrantClient = registry.get("async_qdrant_client")
+    response = await client.query_points(
+        collection_name=vector_store.collection_name,
+        query=query_vector,
+        query_filter=metadata_filter,
+        limit=k,
+        score_threshold=score_threshold,
+        search_params=get_search_params(),
+        with_payload=True,
+    )
+    return [(_document_from_point(point, vector_store.collection_name), point.score) for point in response.points]
+
+
+async def sparse_search(
+    vector_store: QdrantVectorStore,
+    question: str,
+    k: int,
+    metadata_filter: Optional[Filter] = None,
+) -> list[tuple[Document, float]]:
+    """BM25 search over the collection's sparse vectors (no embedding call)."""
+    client: AsyncQdrantClient = registry.get("async_qdrant_client")
+    response = await client.query_points(
+        collection_name=vector_store.collection_name,
+        query=vector_store.sparse_embeddings.embed_query(question),
+        using=SPARSE_VECTOR_NAME,
+        query_filter=metadata_filter,
+        limit=k,
+        with_payload=True,
+    )
+    return [(_document_from_point(point, vector_store.collection_name), point.score) for point in response.points]
+
+
+def _document_from_point(point, collection_name: str) -> Document:
+    """A search hit as a Document, in the same shape langchain-qdrant returns."""
+    return Document(
+        page_content=point.payload.get(CONTENT_PAYLOAD_KEY, ""),
+        metadata={
+            **(point.payload.get(METADATA_PAYLOAD_KEY) or {}),
+            "_id": point.id,
+            "_collection_name": collection_name,
+        },
+    )
+
+
+async def batch_search(
+    vector_store: QdrantVectorStore,
+    queries: list[tuple[list[float], str, Optional[Filter]]],
+    k: int,
+    score_threshold: Optional[float] = None,
+) -> list[tuple[list[tuple[Document, float]], list[tuple[Document, float]]]]:
+    """
+    Dense (and, for hybrid collections, BM25) search for many questions in one request.
+    
+    Args:
+        vector_store: The shared vector store.
+        queries: (query vector, question, metadata filter) per question.
+        k: Results per search.
+        score_threshold: Similarity floor for the dense searches.
+    
+    Returns:
+        (dense hits, sparse hits) per question, each a list of (document, score).
+    """
+    hybrid = is_hybrid(vector_store)
+    params = get_search_params()
+    requests = []
+    for query_vector, question, metadata_filter in queries:
+        requests.append(QueryRequest(
+            query=query_vector,
+            filter=metadata_filter,
+            limit=k,
+            score_threshold=score_threshold,
+            params=params,
+            with_payload=True,
+        ))
+        if hybrid:
+            requests.append(QueryRequest(
+                query=vector_store.sparse_embeddings.embed_query(question),
+                using=SPARSE_VECTOR_NAME,
+                filter=metadata_filter,
+                limit=k,
+                with_payload=True,
+            ))
+    
+    client: AsyncQdrantClient = registry.get("async_qdrant_client")
+    responses = await client.query_batch_points(vector_store.collection_name, requests=requests)
+    hits = [
+        [(_document_from_point(point, vector_store.collection_name), point.score) for point in response.points]
+        for response in responses
+    ]
+    if hybrid:
+        return list(zip(hits[0::2], hits[1::2]))
+    return [(dense, []) for dense in hits]
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = 60) -> list[tuple[Document, float]]:
+    """
+    Fuse ranked result lists by reciprocal rank (score = sum of 1 / (k + rank)).
+    
+    Documents are matched across lists by point ID; the first list's copy is kept.
+    
+    Returns:
+        (document, fused score) pairs, best first.
+    """
+    scores: dict = {}
+    documents: dict = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            point_id = doc.metadata["_id"]
+            scores[point_id] = scores.get(point_id, 0.0) + 1 / (k + rank)
+            documents.setdefault(point_id, doc)
+    return sorted(
+        ((documents[point_id], score) for point_id, score in scores.items()),
+        key=lambda pair: pair[1],
+        reverse=True,
     )
 
 
-async def add_documents_to_store(documents: list[Document]) -> int:
-    """Add documents to vector store."""
-    vector_store = get_vector_store()
+async def _with_backoff(operation: Callable[[], Awaitable], description: str):
+    """Run an async operation, retrying with exponential backoff and jitter."""
+    settings = init_settings()
+    for attempt in range(settings.INGEST_MAX_RETRIES + 1):
+        try:
+            return await operation()
+        except ValueError:
+            raise  # Bad input, retrying won't help
+        except Exception as e:
+            if attempt == settings.INGEST_MAX_RETRIES:
+                raise
+            delay = settings.INGEST_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"{description} failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(chunk: Document) -> str:
+    """
+    Deterministic point ID for a chunk.
+    
+    Derived from the content hash plus the policy it belongs to, so the same
+    text re-ingested for the same policy maps to the same point, while the
+    version is left out so unchanged chunks survive a new policy version.
+    """
+    scope = [chunk.metadata.get("jurisdiction"), policy_key(chunk.metadata), chunk.metadata["content_hash"]]
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, json.dumps(scope)))
+
+
+def _stale_version_filter(policy_name: str, jurisdiction: Optional[str], version: str, keep_ids: list[str]) -> Filter:
+    """Points of an earlier version of a policy that are not part of the new one (nor shared with another source)."""
+    if jurisdiction:
+        jurisdiction_condition = FieldCondition(
+            key=f"{METADATA_PAYLOAD_KEY}.jurisdiction", match=MatchValue(value=jurisdiction)
+        )
+    else:
+        jurisdiction_condition = IsEmptyCondition(is_empty=PayloadField(key=f"{METADATA_PAYLOAD_KEY}.jurisdiction"))
+    return Filter(
+        must=[
+            FieldCondition(key=f"{METADATA_PAYLOAD_KEY}.policy_name", match=MatchValue(value=policy_name)),
+            jurisdiction_condition,
+            IsEmptyCondition(is_empty=PayloadField(key=f"{METADATA_PAYLOAD_KEY}.duplicates")),
+        ],
+        must_not=[
+            FieldCondition(key=f"{METADATA_PAYLOAD_KEY}.version", match=MatchValue(value=version)),
+            HasIdCondition(has_id=keep_ids),
+        ],
+    )
+
+
+def _chunk_payload(chunk: Document, bands: Optional[list[int]] = None, texts: Optional[dict] = None) -> dict:
+    payload = {CONTENT_PAYLOAD_KEY: chunk.page_content, METADATA_PAYLOAD_KEY: chunk.metadata}
+    if bands:
+        payload[LSH_PAYLOAD_KEY] = bands
+    if texts:
+        payload[DUPLICATE_TEXTS_KEY] = texts
+    return payload
+
+
+def _chunk_bands(text: str) -> Optional[list[int]]:
+    signature = minhash_signature(text)
+    return lsh_bands(signature) if signature is not None else None
+
+
+async def _embed_points(vector_store: QdrantVectorStore, payloads: dict[str, dict]) -> list[PointStruct]:
+    """Points for chunk payloads, embedding their text (plus BM25 in hybrid mode)."""
+    texts = [payload[CONTENT_PAYLOAD_KEY] for payload in payloads.values()]
+    vectors = await _with_backoff(lambda: vector_store.embeddings.aembed_documents(texts), "Embedding batch")
+    if is_hybrid(vector_store):
+        # Unnamed dense vector plus the named BM25 sparse vector
+        vectors = [
+            {"": dense, SPARSE_VECTOR_NAME: sparse}
+            for dense, sparse in zip(vectors, vector_store.sparse_embeddings.embed_documents(texts))
+        ]
+    return [
+        PointStruct(id=point_id, vector=vector, payload=payload)
+        for (point_id, payload), vector in zip(payloads.items(), vectors)
+    ]
+
+
+async def _scroll_all(client: AsyncQdrantClient, collection_name: str, scroll_filter: Filter, description: str) -> list:
+    """Every point matching a filter, with payloads, a page at a time."""
+    points, offset = [], None
+    while True:
+        page, offset = await _with_backoff(
+            lambda: client.scroll(
+                collection_name, scroll_filter=scroll_filter, limit=256, offset=offset, with_payload=True
+            ),
+            description,
+        )
+        points.extend(page)
+        if offset is None:
+            return points
+
+
+async def _find_stored_duplicates(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    chunks: dict[str, Document],
+    signatures: dict[str, tuple],
+    threshold: float,
+) -> dict[str, str]:
+    """
+    Stored duplicates of new chunks, found through the LSH bands in the collection.
+    
+    Args:
+        chunks: Point ID -> new chunk.
+        signatures: Point ID -> (MinHash signature, LSH bands) of each new chunk.
+    
+    Returns:
+        Point ID of a new chunk -> ID of the stored point with the same text
+        it may be merged into. Near-duplicates that differ are only logged.
+    """
+    by_band: dict[int, list[str]] = {}
+    for point_id, (_, bands) in signatures.items():
+        for band in bands:
+            by_band.setdefault(band, []).append(point_id)
+    candidates = await _scroll_all(
+        client,
+        collection_name,
+        Filter(must=[FieldCondition(key=LSH_PAYLOAD_KEY, match=MatchAny(any=list(by_band)))]),
+        "Qdrant near-duplicate lookup",
+    )
+    
+    fingerprints = {point_id: text_fingerprint(chunks[point_id].page_content) for point_id in signatures}
+    targets: dict[str, str] = {}
+    near: set[str] = set()
+    for point in candidates:
+        text = point.payload.get(CONTENT_PAYLOAD_KEY, "")
+        stored = minhash_signature(text)
+        if stored is None:
+            continue
+        metadata = point.payload.get(METADATA_PAYLOAD_KEY) or {}
+        stored_fingerprint = text_fingerprint(text)
+        for point_id in {i for band in point.payload.get(LSH_PAYLOAD_KEY, []) for i in by_band.get(band, ())}:
+            if can_merge(chunks[point_id].metadata, fingerprints[point_id], metadata, stored_fingerprint):
+                targets[point_id] = str(point.id)
+            elif similarity(signatures[point_id][0], stored) >= threshold:
+                near.add(point_id)
+    near -= targets.keys()
+    if near:
+        logger.info(f"{len(near)} chunk(s) are near-duplicates of stored chunks with different text; stored separately")
+    return targets
+
+
+async def _merge_duplicates(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    vector_store: QdrantVectorStore,
+    merges: dict[str, list[Document]],
+    restated: set[tuple],
+) -> tuple[int, int]:
+    """
+    Record merged copies on the points they were merged into.
+    
+    Copies are checked again against the point as stored (a chunk of this
+    upload they were merged into may itself have been merged elsewhere);
+    those that may not be merged there are stored as points of their own.
+    
+    Returns:
+        Number of copies merged, and number stored as their own points.
+    """
+    merges = dict(merges)
+    points = await _with_backoff(
+        lambda: client.retrieve(collection_name, ids=list(merges), with_payload=True, with_vectors=False),
+        "Qdrant lookup",
+    )
+    updates = []
+    standalone: dict[str, dict] = {}
+    merged = 0
+    for point in points:
+        metadata = point.payload.get(METADATA_PAYLOAD_KEY) or {}
+        stored_fingerprint = text_fingerprint(point.payload.get(CONTENT_PAYLOAD_KEY, ""))
+        accepted = []
+        for copy in merges.pop(str(point.id)):
+            if can_merge(copy.metadata, text_fingerprint(copy.page_content), metadata, stored_fingerprint):
+                accepted.append(copy)
+            else:
+                standalone[chunk_point_id(copy)] = _chunk_payload(copy, _chunk_bands(copy.page_content))
+        if not accepted:
+            continue
+        merged += len(accepted)
+        metadata = merge_sources(metadata, [source_entry(c.metadata) for c in accepted], restated)
+        texts = {**point.payload.get(DUPLICATE_TEXTS_KEY, {}), **{c.metadata["content_hash"]: c.page_content for c in accepted}}
+        updates.append(OverwritePayloadOperation(overwrite_payload=SetPayload(
+            payload={**point.payload, METADATA_PAYLOAD_KEY: metadata, DUPLICATE_TEXTS_KEY: duplicate_texts(metadata, texts)},
+            points=[point.id],
+        )))
+    # Targets that are gone (e.g. deleted meanwhile) leave their copies on their own
+    for copies in merges.values():
+        for copy in copies:
+            standalone[chunk_point_id(copy)] = _chunk_payload(copy, _chunk_bands(copy.page_content))
+    
+    batch_size = init_settings().INGEST_BATCH_SIZE
+    for start in range(0, len(updates), batch_size):
+        batch = updates[start:start + batch_size]
+        await _with_backoff(
+            lambda: client.batch_update_points(collection_name=collection_name, update_operations=batch),
+            "Qdrant duplicate merge",
+        )
+    payloads = list(standalone.items())
+    for start in range(0, len(payloads), batch_size):
+        new_points = await _embed_points(vector_store, dict(payloads[start:start + batch_size]))
+        await _with_backoff(
+            lambda: client.upsert(collection_name=collection_name, points=new_points),
+            "Qdrant upsert",
+        )
+    return merged, len(standalone)
+
+
+async def _prune_shared_sources(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    vector_store: QdrantVectorStore,
+    policy_name: str,
+    jurisdiction: Optional[str],
+    version: str,
+) -> None:
+    """
+    Drop an earlier policy version from merged points; delete those left without a source.
+    
+    When a point's own source goes, the copy promoted in its place brings its
+    own text: the point is re-embedded from it under that copy's point ID.
+    """
+    points = await _scroll_all(
+        client,
+        collection_name,
+        Filter(
+            must=[FieldCondition(key=f"{METADATA_PAYLOAD_KEY}.policy_names", match=MatchValue(value=policy_name))],
+            must_not=[IsEmptyCondition(is_empty=PayloadField(key=f"{METADATA_PAYLOAD_KEY}.duplicates"))],
+        ),
+        "Qdrant shared chunk lookup",
+    )
+    updates, deletes = [], []
+    promoted: dict[str, dict] = {}
+    for point in points:
+        metadata = point.payload.get(METADATA_PAYLOAD_KEY) or {}
+        remaining = drop_sources(metadata, policy_name, jurisdiction, version)
+        if remaining is None:
+            deletes.append(point.id)
+            continue
+        if remaining == metadata:
+            continue
+        texts = point.payload.get(DUPLICATE_TEXTS_KEY, {})
+        content_hash = remaining.get("content_hash")
+        if content_hash != metadata.get("content_hash"):
+            if content_hash in texts:
+                chunk = Document(page_content=texts[content_hash], metadata=remaining)
+                deletes.append(point.id)
+                promoted[chunk_point_id(chunk)] = _chunk_payload(
+                    chunk, _chunk_bands(chunk.page_content), duplicate_texts(remaining, texts)
+                )
+                continue
+            # Merged before copy texts were kept: nothing to swap in
+            logger.warning(
+                f"Point {point.id} lost its source but has no stored text for its copy; "
+                f"re-ingest {remaining.get('filename') or remaining.get('source')} to refresh it"
+            )
+        payload = {**point.payload, METADATA_PAYLOAD_KEY: remaining}
+        payload[DUPLICATE_TEXTS_KEY] = duplicate_texts(remaining, texts)
+        updates.append(OverwritePayloadOperation(overwrite_payload=SetPayload(payload=payload, points=[point.id])))
+    if updates:
+        await _with_backoff(
+            lambda: client.batch_update_points(collection_name=collection_name, update_operations=updates),
+            "Qdrant shared chunk update",
+        )
+    if promoted:
+        new_points = await _embed_points(vector_store, promoted)
+        await _with_backoff(
+            lambda: client.upsert(collection_name=collection_name, points=new_points),
+            "Qdrant upsert",
+        )
+    deletes = [point_id for point_id in deletes if str(point_id) not in promoted]
+    if deletes:
+        await _with_backoff(
+            lambda: client.delete(collection_name=collection_name, points_selector=deletes),
+            "Qdrant shared chunk cleanup",
+        )
+
+
+class VersionPruner:
+    """
+    Deletes chunks of earlier policy versions once every upload of a new one is stored.
+    
+    Pass one to several `add_documents_to_store` calls (e.g. the files of one
+    ingestion job) to prune once, after all of them, keeping every chunk any
+    of them wrote. Pruning after each call instead would delete unchanged
+    old-version chunks that another file of the same version is still about
+    to keep.
+    """
+    
+    def __init__(self):
+        self.versions: set[tuple] = set()  # (policy_name, jurisdiction, version)
+        self.keep_ids: set[str] = set()
+    
+    def add(self, versions: set[tuple], point_ids: Iterable[str]) -> None:
+        self.versions.update(versions)
+        self.keep_ids.update(point_ids)
+    
+    async def prune(self) -> None:
+        """Drop chunks that belonged to earlier versions of the re-ingested policies."""
+        if not self.versions:
+            return
+        settings = init_settings()
+        collection_name = settings.QDRANT_COLLECTION_NAME
+        vector_store = get_vector_store()
+        client: AsyncQdrantClient = registry.get("async_qdrant_client")
+        keep_ids = list(self.keep_ids)
+        for policy_name, jurisdiction, version in self.versions:
+            await _with_backoff(
+                lambda: client.delete(
+                    collection_name=collection_name,
+                    points_selector=FilterSelector(
+                        filter=_stale_version_filter(policy_name, jurisdiction, version, keep_ids)
+                    ),
+                ),
+                "Qdrant stale chunk cleanup",
+            )
+            await _prune_shared_sources(client, collection_name, vector_store, policy_name, jurisdiction, version)
+        await _publish_local()
+        logger.info(f"Pruned earlier versions of {len(self.versions)} policy version(s)")
+        
+        answer_cache = get_answer_cache()
+        if answer_cache is not None:
+            answer_cache.invalidate_policies(policy for policy, _, _ in self.versions)
+
+
+async def _publish_local() -> None:
+    if init_settings().VECTOR_BACKEND == "local":
+        # The embedded engine holds writes in memory; publish them for other
+        # containers and the next cold start
+        await asyncio.to_thread(registry.get("local_vector_engine").save)
+
+
+async def _iter_documents(documents: Iterable[Document] | AsyncIterable[Document]) -> AsyncIterator[Document]:
+    if isinstance(documents, AsyncIterable):
+        async for document in documents:
+            yield document
+    else:
+        for document in documents:
+            yield document
+
+
+async def add_documents_to_store(
+    documents: Iterable[Document] | AsyncIterable[Document],
+    on_progress: Optional[ProgressCallback] = None,
+    pruner: Optional[VersionPruner] = None,
+) -> int:
+    """
+    Split, embed and upsert documents into the vector store.
+    
+    Documents are consumed lazily (a list, or e.g. the pages of a PDF as
+    they are parsed) and split into token-sized chunks that go straight
+    into batches of INGEST_BATCH_SIZE, with at most INGEST_CONCURRENCY
+    batches embedding/upserting at once. Memory use therefore stays flat
+    however large the document is. Rate-limited or failed calls are retried
+    with backoff.
+    
+    Each chunk gets a content hash and a deterministic point ID, so chunks
+    already in the collection are not embedded again (only their metadata is
+    refreshed). With DEDUP_ENABLED, a chunk that nearly duplicates one in this
+    upload or in the collection (see `app.embeddings.dedup`) is not embedded
+    either: it is recorded as a source of that point. When a `version` is
+    given for a `policy_name`, chunks of other versions of that policy that
+    are no longer present are deleted (or dropped from the points they were
+    merged into) once everything has been written.
+    
+    Args:
+        documents: Parsed documents to ingest.
+        on_progress: Optional callback receiving (chunks_done, chunks_so_far);
+            the total keeps growing until the documents are exhausted.
+        pruner: Collects the versions and chunks written, for the caller to
+            prune once after several calls; without one, pruning happens here.
+    
+    Returns:
+        Number of chunks the documents were split into.
+    """
+    settings = init_settings()
+    collection_name = settings.QDRANT_COLLECTION_NAME
+    vector_store = get_vector_store()  # Also makes sure the collection exists
     text_splitter = get_text_splitter()
-    chunks = text_splitter.split_documents(documents)
     
-    if not chunks:
+    client: AsyncQdrantClient = registry.get("async_qdrant_client")
+    semaphore = asyncio.Semaphore(settings.INGEST_CONCURRENCY)
+    tasks: list[asyncio.Task] = []  # Every batch, so the final gather sees each failure
+    failures: list[BaseException] = []
+    
+    point_ids: dict[str, None] = {}  # Every chunk of this upload, in order
+    versions: set[tuple] = set()
+    policies: set[str] = set()
+    files: set[tuple] = set()
+    total = done = embedded = 0
+    
+    # Near-duplicates: in-memory LSH of this upload, and merges onto existing points
+    lsh = MinHashLSH(settings.DEDUP_THRESHOLD) if settings.DEDUP_ENABLED else None
+    lsh_sources: dict[str, tuple[dict, str]] = {}  # Source entry and text fingerprint of each indexed chunk
+    near_duplicates = 0  # Similar chunks of this upload kept apart because their text differs
+    merges: dict[str, list[Document]] = {}
+    redirects: dict[str, str] = {}  # New chunks merged into stored points
+    
+    async def write_batch(batch: dict[str, Document], signatures: dict[str, tuple]) -> None:
+        nonlocal done, embedded
+        try:
+            batch_ids = list(batch)
+            existing = {
+                str(point.id): point.payload
+                for point in await _with_backoff(
+                    lambda: client.retrieve(collection_name, ids=batch_ids, with_payload=True, with_vectors=False),
+                    "Qdrant lookup",
+                )
+            }
+            
+            # Unchanged chunks only need their metadata (version, page, ...)
+            # refreshed, keeping the copies merged into them
+            payload_updates = []
+            for i, payload in existing.items():
+                stored = payload.get(METADATA_PAYLOAD_KEY) or {}
+                bands = signatures.get(i, (None, None))[1]
+                metadata = with_duplicates(batch[i].metadata, stored.get("duplicates", []))
+                if metadata != stored or (bands and payload.get(LSH_PAYLOAD_KEY) != bands):
+                    batch[i].metadata = metadata
+                    payload_updates.append(OverwritePayloadOperation(overwrite_payload=SetPayload(
+                        payload=_chunk_payload(batch[i], bands, payload.get(DUPLICATE_TEXTS_KEY)),
+                        points=[i],
+                    )))
+            if payload_updates:
+                await _with_backoff(
+                    lambda: client.batch_update_points(collection_name=collection_name, update_operations=payload_updates),
+                    "Qdrant payload update",
+                )
+            
+            new_ids = [i for i in batch_ids if i not in existing]
+            lookups = {i: signatures[i] for i in new_ids if i in signatures}
+            if lookups:
+                for point_id, target in (
+                    await _find_stored_duplicates(client, collection_name, batch, lookups, settings.DEDUP_THRESHOLD)
+                ).items():
+                    merges.setdefault(target, []).append(batch[point_id])
+                    redirects[point_id] = target
+                    new_ids.remove(point_id)
+            if new_ids:
+                points = await _embed_points(vector_store, {
+                    point_id: _chunk_payload(batch[point_id], signatures.get(point_id, (None, None))[1])
+                    for point_id in new_ids
+                })
+                await _with_backoff(
+                    lambda: client.upsert(collection_name=collection_name, points=points),
+                    "Qdrant upsert",
+                )
+            embedded += len(new_ids)
+            done += len(batch_ids)
+            logger.info(f"Ingested {done}/{total} chunks")
+            if on_progress is not None:
+                on_progress(done, total)
+        finally:
+            semaphore.release()
+    
+    async def submit(batch: dict[str, Document], signatures: dict[str, tuple]) -> None:
+        # Waiting for a free slot here is what keeps memory flat: parsing
+        # and splitting pause while INGEST_CONCURRENCY batches are in flight
+        await semaphore.acquire()
+        if failures:
+            semaphore.release()
+            raise failures[0]
+        task = asyncio.create_task(write_batch(batch, signatures))
+        tasks.append(task)
+        task.add_done_callback(record_failure)
+    
+    def record_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+    
+    batch: dict[str, Document] = {}
+    signatures: dict[str, tuple] = {}
+    split_seconds = 0.0
+    try:
+        with timer("aml_ingest_upsert_seconds"):
+            async for document in _iter_documents(documents):
+                metadata = document.metadata
+                policies.add(policy_key(metadata))
+                files.add(file_key(metadata))
+                if metadata.get("policy_name") and metadata.get("version"):
+                    versions.add((metadata["policy_name"], metadata.get("jurisdiction"), metadata["version"]))
+                
+                started = time.perf_counter()
+                chunks = list(text_splitter.split(document))
+                split_seconds += time.perf_counter() - started
+                for chunk in chunks:
+                    chunk.metadata["content_hash"] = content_hash(chunk.page_content)
+                    point_id = chunk_point_id(chunk)
+                    if point_id in point_ids:
+                        continue  # Repeated within this upload
+                    point_ids[point_id] = None
+                    total += 1
+                    signature = minhash_signature(chunk.page_content) if lsh is not None else None
+                    if signature is not None:
+                        bands = lsh_bands(signature)
+                        fingerprint = text_fingerprint(chunk.page_content)
+                        target = lsh.find(
+                            signature,
+                            bands,
+                            lambda key: can_merge(chunk.metadata, fingerprint, *lsh_sources[key]),
+                        )
+                        if target is not None:
+                            merges.setdefault(target, []).append(chunk)
+                            done += 1
+                            continue
+                        if lsh.find(signature, bands) is not None:
+                            near_duplicates += 1
+                        lsh.add(point_id, signature, bands)
+                        lsh_sources[point_id] = (source_entry(chunk.metadata), fingerprint)
+                        signatures[point_id] = (signature, bands)
+                    batch[point_id] = chunk
+                    if len(batch) == settings.INGEST_BATCH_SIZE:
+                        await submit(batch, signatures)
+                        batch, signatures = {}, {}
+            if batch:
+                await submit(batch, signatures)
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    observe("aml_ingest_split_seconds", split_seconds)
+    if near_duplicates:
+        logger.info(f"{near_duplicates} chunk(s) are near-duplicates of others in this upload with different text; stored separately")
+    
+    if not total:
         return 0
     
-    texts = [c.page_content for c in chunks]
-    metadatas = [c.metadata for c in chunks]
-    vector_store.add_texts(texts=texts, metadatas=metadatas)
+    # Copies merged into a chunk of this upload that was itself merged go to its target
+    for point_id, target in redirects.items():
+        if point_id in merges:
+            merges.setdefault(target, []).extend(merges.pop(point_id))
+    merged = 0
+    if merges:
+        merged, standalone = await _merge_duplicates(client, collection_name, vector_store, merges, files)
+        embedded += standalone
+    
+    deferred = pruner is not None
+    pruner = pruner or VersionPruner()
+    pruner.add(versions, point_ids)
+    if not deferred:
+        await pruner.prune()
+    await _publish_local()
+    
+    logger.info(
+        f"Ingestion done: {embedded} new chunk(s) embedded, {merged} merged as duplicates, "
+        f"{total - embedded - merged} unchanged, {len(versions)} policy version(s) "
+        f"{'left to prune' if deferred else 'pruned'}"
+    )
+    
+    # Cached answers built from these policies may now be out of date
+    answer_cache = get_answer_cache()
+    if answer_cache is not None and (embedded or merged or versions):
+        answer_cache.invalidate_policies(policies)
     
-    return len(chunks)
+    return total
 
 
-def get_retriever(k: int = 6):
-    """Get retriever from vector store."""
+def get_retriever(
+    k: int = 6,
+    jurisdiction: Optional[str] = None,
+    policy_filter: Optional[list[str]] = None,
+):
+    """Get retriever from vector store (hybrid when available), optionally scoped by metadata."""
+    search_kwargs = {"k": k, "search_params": get_search_params()}
+    metadata_filter = build_metadata_filter(jurisdiction, policy_filter)
+    if metadata_filter is not None:
+        search_kwargs["filter"] = metadata_filter
     return get_vector_store().as_retriever(
         search_type="similarity",
-        search_kwargs={"k": k}
+        search_kwargs=search_kwargs
     )
@@ -0,0 +1,9 @@
+"""Background ingestion jobs."""
+
+from app.ingestion.jobs import get_job, run_job, submit_job
+
+__all__ = [
+    "get_job",
+    "run_job",
+    "submit_job",
+]
@@ -0,0 +1,429 @@
+"""
+Background ingestion jobs for the AML Policy FAQ Bot.
+
+`POST /ingest` only stages the uploaded files and returns a job ID. The
+parse / split / embed / upsert work runs in a worker - an in-process task
+locally, or an asynchronous self-invocation on AWS Lambda - and its
+progress is polled through `GET /ingest/{job_id}`.
+
+Files and job status live in a staging area: the S3_BUCKET when it is set,
+otherwise a local directory.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from datetime import datetime, timezone
+from tempfile import NamedTemporaryFile
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi import UploadFile
+from langchain_core.documents import Document
+
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.embeddings.vecstore import VersionPruner, add_documents_to_store
+from app.schemas import IngestFileStatus, IngestResponse
+from app.utils.file_parser import get_file_extension, iter_file_documents
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_FILE = "status.json"
+REQUEST_FILE = "request.json"
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+# ============== Staging Area ==============
+
+class StagingArea(ABC):
+    """Where uploaded files and job status are kept until a worker is done."""
+
+    @abstractmethod
+    def save_file(self, job_id: str, name: str, fileobj: BinaryIO) -> None:
+        """Store an uploaded file."""
+
+    @abstractmethod
+    def local_path(self, job_id: str, name: str) -> tuple[str, bool]:
+        """Return a local path for a staged file and whether it is a temporary copy."""
+
+    @abstractmethod
+    def write_text(self, job_id: str, name: str, text: str) -> None:
+        """Store a small text object (job request or status)."""
+
+    @abstractmethod
+    def read_text(self, job_id: str, name: str) -> Optional[str]:
+        """Read a small text object, or None if it does not exist."""
+
+    @abstractmethod
+    def delete_files(self, job_id: str, names: list[str]) -> None:
+        """Remove staged files once the job no longer needs them."""
+
+
+class LocalStagingArea(StagingArea):
+    """Staging area in a local directory (local development, single host)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, job_id: str, name: str) -> str:
+        return os.path.join(self.root, job_id, name)
+
+    def save_file(self, job_id: str, name: str, fileobj: BinaryIO) -> None:
+        path = self._path(job_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+
+    def local_path(self, job_id: str, name: str) -> tuple[str, bool]:
+        return self._path(job_id, name), False
+
+    def write_text(self, job_id: str, name: str, text: str) -> None:
+        path = self._path(job_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so pollers never see a half-written status
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def read_text(self, job_id: str, name: str) -> Optional[str]:
+        try:
+            with open(self._path(job_id, name), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete_files(self, job_id: str, names: list[str]) -> None:
+        for name in names:
+            try:
+                os.remove(self._path(job_id, name))
+            except FileNotFoundError:
+                pass
+
+
+class S3StagingArea(StagingArea):
+    """Staging area in S3, shared by every Lambda container."""
+
+    def __init__(self, bucket: str, prefix: str):
+        import boto3  # Deferred: only needed when staging to S3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3")
+
+    def _key(self, job_id: str, name: str) -> str:
+        return f"{self.prefix}{job_id}/{name}"
+
+    def save_file(self, job_id: str, name: str, fileobj: BinaryIO) -> None:
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(job_id, name))
+
+    def local_path(self, job_id: str, name: str) -> tuple[str, bool]:
+        with NamedTemporaryFile(delete=False, suffix=get_file_extension(name)) as tmp:
+            self.client.download_fileobj(self.bucket, self._key(job_id, name), tmp)
+            return tmp.name, True
+
+    def write_text(self, job_id: str, name: str, text: str) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(job_id, name),
+            Body=text.encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def read_text(self, job_id: str, name: str) -> Optional[str]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(job_id, name))
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read().decode("utf-8")
+
+    def delete_files(self, job_id: str, names: list[str]) -> None:
+        if names:
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self._key(job_id, n)} for n in names]},
+            )
+
+
+def _create_staging_area() -> StagingArea:
+    settings = init_settings()
+    if settings.S3_BUCKET:
+        return S3StagingArea(settings.S3_BUCKET, settings.INGEST_S3_PREFIX)
+    return LocalStagingArea(settings.INGEST_STAGING_DIR)
+
+
+registry.register("ingest_staging", _create_staging_area)
+
+
+def get_staging_area() -> StagingArea:
+    """Get the shared staging area."""
+    return registry.get("ingest_staging")
+
+
+# ============== Job Status ==============
+
+class _JobTracker:
+    """Holds a job's status and persists it to the staging area."""
+
+    def __init__(self, job_id: str, job: IngestResponse, staging: StagingArea):
+        self.job_id = job_id
+        self.job = job
+        self.staging = staging
+        self._lock = asyncio.Lock()
+        self._pending: set[asyncio.Task] = set()  # save_soon writes, kept so they aren't garbage-collected
+
+    async def save(self) -> None:
+        async with self._lock:
+            self.job.updated_at = datetime.now(timezone.utc)
+            snapshot = self.job.model_dump_json()
+            await asyncio.to_thread(self.staging.write_text, self.job_id, STATUS_FILE, snapshot)
+
+    def save_soon(self) -> None:
+        """Persist from a sync callback without waiting for the write."""
+        task = asyncio.get_running_loop().create_task(self.save())
+        self._pending.add(task)
+        task.add_done_callback(self._saved)
+
+    def _saved(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to record progress of ingestion job {self.job_id}: {task.exception()}")
+
+
+async def get_job(job_id: str) -> Optional[IngestResponse]:
+    """Current status of an ingestion job, or None if it is unknown."""
+    if not _JOB_ID_PATTERN.match(job_id):
+        return None
+    staging = get_staging_area()
+    text = await asyncio.to_thread(staging.read_text, job_id, STATUS_FILE)
+    if not text:
+        return None
+    job = IngestResponse.model_validate_json(text)
+    if job.status in ("queued", "running") and job.updated_at is not None:
+        # A job whose worker died (a Lambda timeout, a lost invocation, a
+        # restarted container) would otherwise stay "running" forever
+        timeout = init_settings().INGEST_JOB_TIMEOUT_SECONDS
+        idle = (datetime.now(timezone.utc) - job.updated_at).total_seconds()
+        if idle > timeout:
+            logger.warning(f"Ingestion job {job_id} made no progress for {idle:.0f}s, marking it failed")
+            job.status = "failed"
+            job.message = f"Ingestion job stopped making progress (nothing recorded for {timeout}s)"
+            for file_status in job.files:
+                if file_status.status not in ("done", "failed"):
+                    file_status.status = "failed"
+                    file_status.error = "Timed out"
+            await _JobTracker(job_id, job, staging).save()
+    return job
+
+
+# ============== Submission ==============
+
+async def submit_job(files: list[UploadFile], metadata: dict) -> IngestResponse:
+    """
+    Stage uploaded files and queue them for ingestion.
+
+    Args:
+        files: Uploaded policy documents.
+        metadata: Metadata applied to every document (policy_name, ...).
+
+    Returns:
+        The queued job's initial status.
+    """
+    staging = get_staging_area()
+    job_id = uuid.uuid4().hex
+
+    staged = []
+    for index, file in enumerate(files):
+        filename = file.filename or "unknown"
+        staged_name = f"{index}_{os.path.basename(filename)}"
+        await asyncio.to_thread(staging.save_file, job_id, staged_name, file.file)
+        staged.append({"filename": filename, "staged_name": staged_name})
+
+    request = {"metadata": metadata, "files": staged}
+    await asyncio.to_thread(staging.write_text, job_id, REQUEST_FILE, json.dumps(request))
+
+    job = IngestResponse(
+        message=f"Accepted {len(files)} file(s) for ingestion",
+        job_id=job_id,
+        status="queued",
+        files=[IngestFileStatus(filename=f["filename"]) for f in staged],
+    )
+    await _JobTracker(job_id, job, staging).save()
+    await _dispatch(job_id)
+    return job
+
+
+async def _dispatch(job_id: str) -> None:
+    """Hand a staged job to a worker."""
+    settings = init_settings()
+    function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+
+    if function_name and settings.INGEST_ASYNC_INVOKE:
+        # The frozen container can't run background tasks, so the job runs in
+        # its own asynchronous invocation of this function (see handler.py)
+        import boto3
+
+        await asyncio.to_thread(
+            boto3.client("lambda").invoke,
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps({"ingest_job_id": job_id}).encode("utf-8"),
+        )
+        return
+
+    _get_queue().put_nowait(job_id)
+
+
+# ============== Worker ==============
+
+_queue: Optional[asyncio.Queue] = None
+_workers: list[asyncio.Task] = []
+
+
+def _get_queue() -> asyncio.Queue:
+    """Job queue of this event loop, starting the in-process workers on first use."""
+    global _queue
+    loop = asyncio.get_running_loop()
+    if _queue is None or not _workers or _workers[0].get_loop() is not loop:
+        _queue = asyncio.Queue()
+        _workers.clear()
+        for _ in range(max(1, init_settings().INGEST_WORKERS)):
+            _workers.append(loop.create_task(_worker(_queue)))
+    return _queue
+
+
+async def _worker(queue: asyncio.Queue) -> None:
+    while True:
+        job_id = await queue.get()
+        try:
+            with registry.in_use():
+                await run_job(job_id)
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {e}")
+        finally:
+            queue.task_done()
+
+
+async def run_job(job_id: str) -> Optional[IngestResponse]:
+    """Parse, split, embed and store every file of a staged job."""
+    staging = get_staging_area()
+    request = json.loads(await asyncio.to_thread(staging.read_text, job_id, REQUEST_FILE))
+    job = await get_job(job_id)
+    if job is None:
+        logger.warning(f"Ingestion job {job_id} has no status record, not running it")
+        return None
+    if job.status == "failed":
+        # Picked up after it was given up on (see INGEST_JOB_TIMEOUT_SECONDS)
+        logger.warning(f"Ingestion job {job_id} already failed, not running it")
+        return job
+    tracker = _JobTracker(job_id, job, staging)
+
+    job.status = "running"
+    await tracker.save()
+
+    # Files of a job share their policy metadata: earlier versions are pruned
+    # once, after all of them, so no file's prune deletes chunks another keeps.
+    # Files go one at a time: each already keeps INGEST_CONCURRENCY batches in flight
+    pruner = VersionPruner()
+    for index, entry in enumerate(request["files"]):
+        await _process_file(tracker, job.files[index], entry, request["metadata"], pruner)
+
+    failed = [f for f in job.files if f.status == "failed"]
+    if failed:
+        # A failed file's current chunks are missing: keep the older version's
+        if pruner.versions:
+            logger.warning(f"Ingestion job {job_id}: not pruning earlier policy versions, {len(failed)} file(s) failed")
+    else:
+        try:
+            await pruner.prune()
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id}: failed to prune earlier policy versions: {e}")
+    job.documents_processed = len(job.files) - len(failed)
+    job.chunks_created = sum(f.chunks_total for f in job.files if f.status == "done")
+    if not failed:
+        job.status = "completed"
+        job.message = f"Successfully processed {job.documents_processed} document(s)"
+    elif job.documents_processed:
+        job.status = "completed_with_errors"
+        job.message = (
+            f"Successfully processed {job.documents_processed} document(s)"
+            f". Warnings: {len(failed)} file(s) had issues"
+        )
+    else:
+        job.status = "failed"
+        job.message = "No documents could be ingested"
+    await tracker.save()
+
+    await asyncio.to_thread(staging.delete_files, job_id, [f["staged_name"] for f in request["files"]])
+    logger.info(f"Ingestion job {job_id} finished: {job.status}")
+    return job
+
+
+async def _process_file(
+    tracker: _JobTracker,
+    file_status: IngestFileStatus,
+    entry: dict,
+    metadata: dict,
+    pruner: VersionPruner,
+) -> None:
+    """Ingest one staged file, recording its progress on the job."""
+    file_status.status = "parsing"
+    await tracker.save()
+
+    path, is_temporary = await asyncio.to_thread(tracker.staging.local_path, tracker.job_id, entry["staged_name"])
+    # Pages are parsed, split and embedded as a stream; the file has to stay
+    # on disk until the whole stream has been consumed
+    documents = iter_file_documents(path, entry["filename"], metadata)
+    try:
+        async with aclosing(documents):
+            try:
+                first = await anext(documents, None)
+            except ValueError as e:
+                return await _fail(tracker, file_status, str(e))
+            except Exception as e:
+                return await _fail(tracker, file_status, f"Failed to parse - {str(e)}")
+
+            if first is None:
+                return await _fail(tracker, file_status, "No content could be extracted")
+
+            def on_progress(done: int, total: int) -> None:
+                file_status.chunks_done = done
+                file_status.chunks_total = total
+                tracker.save_soon()
+
+            file_status.status = "embedding"
+            await tracker.save()
+            try:
+                file_status.chunks_total = await add_documents_to_store(
+                    _prepend(first, documents), on_progress=on_progress, pruner=pruner
+                )
+            except Exception as e:
+                logger.error(f"Failed to add {entry['filename']} to vector store: {e}")
+                return await _fail(tracker, file_status, f"Failed to store documents - {str(e)}")
+    finally:
+        if is_temporary:
+            os.remove(path)
+
+    file_status.chunks_done = file_status.chunks_total
+    file_status.status = "done"
+    await tracker.save()
+
+
+async def _prepend(first: Document, rest: AsyncIterator[Document]) -> AsyncIterator[Document]:
+    yield first
+    async for document in rest:
+        yield document
+
+
+async def _fail(tracker: _JobTracker, file_status: IngestFileStatus, error: str) -> None:
+    file_status.status = "failed"
+    file_status.error = error
+    await tracker.save()
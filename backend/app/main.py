@@ -13,6 +13,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.endpoints import router as api_router
 from app.core.config import init_settings
+from app.core.resources import registry
 
 
 # Configure logging
@@ -23,6 +24,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def preload() -> None:
+    """Import the heavy modules and create the shared clients now rather than on first use."""
+    from app.agents.rag_agent import get_rag_agent
+    from app.ingestion import jobs  # noqa: F401
+    
+    get_rag_agent()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -33,10 +42,32 @@ async def lifespan(app: FastAPI):
     settings = init_settings()
     logger.info(f"Using Qdrant at: {settings.QDRANT_URL}")
     
+    # Create shared clients once; requests reuse them
+    try:
+        preload()
+    except Exception as e:
+        logger.warning(f"Shared resources not ready at startup, will retry lazily: {e}")
+    
     yield
     
     # Shutdown
     logger.info("Shutting down AML Policy FAQ Bot...")
+    registry.close()
+
+
+class ResourceUseMiddleware:
+    """Keep the shared clients a request may be using open until it has finished."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        # Covers streamed responses too: the call returns after the last chunk
+        with registry.in_use():
+            await self.app(scope, receive, send)
 
 
 # Create FastAPI application
@@ -58,6 +89,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Clients dropped by a config rotation are closed only after in-flight requests finish
+app.add_middleware(ResourceUseMiddleware)
+
 # Include API router (no tags here - endpoints have their own tags)
 app.include_router(api_router, prefix="/api/v1")
 
@@ -57,6 +57,48 @@ class QueryResponse(BaseModel):
         default=False,
         description="Whether this query should be escalated to a human"
     )
+    faq_id: Optional[str] = Field(
+        default=None,
+        description="ID of the curated FAQ entry that answered, if any"
+    )
+
+
+class BatchQueryRequest(BaseModel):
+    """Request schema for answering many questions in one call."""
+    
+    queries: list[QueryRequest] = Field(
+        ...,
+        description="Questions to answer; results stream back in completion order"
+    )
+
+
+class BatchQueryResult(BaseModel):
+    """One NDJSON line of a batch query response."""
+    
+    index: int = Field(
+        ...,
+        description="Position of the question in the request"
+    )
+    answer: str = Field(
+        default="",
+        description="The generated answer (empty on error)"
+    )
+    sources: list[SourceDocument] = Field(
+        default_factory=list,
+        description="Source documents used to generate the answer"
+    )
+    escalate: bool = Field(
+        default=False,
+        description="Whether this query should be escalated to a human"
+    )
+    faq_id: Optional[str] = Field(
+        default=None,
+        description="ID of the curated FAQ entry that answered, if any"
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="Why this question failed, if it did"
+    )
 
 
 class StreamChunk(BaseModel):
@@ -64,7 +106,7 @@ class StreamChunk(BaseModel):
     
     type: str = Field(
         ...,
-        description="Type of chunk: 'token', 'source', 'done', 'error'"
+        description="Type of chunk: 'token', 'source', 'done', 'error', 'cancelled'"
     )
     content: str = Field(
         default="",
@@ -74,25 +116,113 @@ class StreamChunk(BaseModel):
         default=None,
         description="Additional metadata for the chunk"
     )
+    request_id: Optional[str] = Field(
+        default=None,
+        description="WebSocket question this chunk belongs to"
+    )
+
+
+# ============== FAQ Schemas ==============
+
+class FaqEntryRequest(BaseModel):
+    """A curated question with its approved answer."""
+    
+    question: str = Field(
+        ...,
+        description="The canonical question",
+        min_length=1,
+        max_length=2000,
+        examples=["What documents are required for KYC?"]
+    )
+    variants: list[str] = Field(
+        default_factory=list,
+        description="Other phrasings of the question that should get the same answer"
+    )
+    answer: str = Field(
+        ...,
+        description="The approved answer, returned verbatim",
+        min_length=1
+    )
+    sources: list[SourceDocument] = Field(
+        default_factory=list,
+        description="Policy excerpts the answer rests on, returned as its sources"
+    )
+    jurisdiction: Optional[str] = Field(
+        default=None,
+        description="Only answer questions for this jurisdiction (or without one)"
+    )
+    policy_name: Optional[str] = Field(
+        default=None,
+        description="Policy the answer belongs to, matched against policy filters"
+    )
+
+
+class FaqEntry(FaqEntryRequest):
+    """A stored FAQ entry."""
+    
+    id: str = Field(
+        ...,
+        description="Entry ID",
+        pattern=r"^[A-Za-z0-9_.-]{1,100}$",
+        examples=["kyc-documents"]
+    )
 
 
 # ============== Document Ingestion Schemas ==============
 
+class IngestFileStatus(BaseModel):
+    """Progress of a single file within an ingestion job."""
+    
+    filename: str = Field(..., description="Original filename")
+    status: str = Field(
+        default="pending",
+        description="File status: 'pending', 'parsing', 'embedding', 'done', 'failed'"
+    )
+    chunks_total: int = Field(
+        default=0,
+        description="Number of text chunks the file was split into"
+    )
+    chunks_done: int = Field(
+        default=0,
+        description="Number of chunks embedded and stored so far"
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="Error message if the file failed"
+    )
+
+
 class IngestResponse(BaseModel):
-    """Response schema for document ingestion."""
+    """Response schema for document ingestion (and ingestion job status)."""
     
     message: str = Field(
         ...,
         description="Status message"
     )
     documents_processed: int = Field(
-        ...,
+        default=0,
         description="Number of documents successfully processed"
     )
     chunks_created: int = Field(
-        ...,
+        default=0,
         description="Total number of text chunks created"
     )
+    job_id: Optional[str] = Field(
+        default=None,
+        description="Ingestion job ID, for polling GET /ingest/{job_id}"
+    )
+    status: str = Field(
+        default="completed",
+        description="Job status: 'queued', 'running', 'completed', 'completed_with_errors', 'failed'"
+    )
+    files: list[IngestFileStatus] = Field(
+        default_factory=list,
+        description="Per-file progress"
+    )
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        description="When the job's status was last recorded"
+    )
 
 
 class DocumentMetadata(BaseModel):
@@ -122,3 +252,7 @@ class HealthResponse(BaseModel):
         default=True,
         description="Whether LLM service is accessible"
     )
+    errors: dict[str, str] = Field(
+        default_factory=dict,
+        description="Failure reason per unavailable dependency"
+    )
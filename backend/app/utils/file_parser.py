@@ -5,34 +5,40 @@ This module handles reading and parsing various document formats
 (PDF, DOCX, TXT, etc.) for ingestion into the vector store.
 """
 
+import asyncio
+import logging
+import multiprocessing
 import os
-from tempfile import NamedTemporaryFile
-import shutil
-from typing import Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
 
-from fastapi import UploadFile
 from langchain_core.documents import Document
-from langchain_community.document_loaders import (
-    TextLoader,
-    PyPDFLoader,
-    UnstructuredWordDocumentLoader,
-    UnstructuredHTMLLoader,
-    CSVLoader,
-)
 
+from app.core.config import init_settings
+from app.core.metrics import observe
+from app.core.resources import registry
+
+
+logger = logging.getLogger(__name__)
 
-# Mapping of file extensions to their loaders
+
+# Mapping of file extensions to their loaders in langchain_community.document_loaders
+# (by name: that package is only imported, inside the parse workers, when a file is loaded)
 LOADER_MAPPING = {
-    '.txt': TextLoader,
-    '.pdf': PyPDFLoader,
-    '.docx': UnstructuredWordDocumentLoader,
-    '.doc': UnstructuredWordDocumentLoader,
-    '.md': TextLoader,
-    '.html': UnstructuredHTMLLoader,
-    '.htm': UnstructuredHTMLLoader,
-    '.csv': CSVLoader,
-    '.rst': TextLoader,
-    '.log': TextLoader,
+    '.txt': 'TextLoader',
+    '.pdf': 'PyPDFLoader',
+    '.docx': 'UnstructuredWordDocumentLoader',
+    '.doc': 'UnstructuredWordDocumentLoader',
+    '.md': 'TextLoader',
+    '.html': 'UnstructuredHTMLLoader',
+    '.htm': 'UnstructuredHTMLLoader',
+    '.csv': 'CSVLoader',
+    '.rst': 'TextLoader',
+    '.log': 'TextLoader',
 }
 
 
@@ -41,88 +47,157 @@ def get_file_extension(filename: str) -> str:
     return os.path.splitext(filename)[1].lower()
 
 
-async def parse_uploaded_file(
-    file: UploadFile,
-    metadata: Optional[dict] = None
-) -> list[Document]:
-    """
-    Parse an uploaded file into LangChain Documents.
+def _create_parse_pool() -> Executor:
+    """Create the bounded worker pool that runs the (CPU-bound) loaders."""
+    settings = init_settings()
+    workers = settings.PARSE_MAX_WORKERS or os.cpu_count() or 1
+    if settings.PARSE_EXECUTOR == "process":
+        try:
+            # spawn: forking a process that already runs threads can deadlock
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        except (OSError, NotImplementedError) as e:
+            # e.g. AWS Lambda has no /dev/shm for the pool's semaphores
+            logger.warning(f"Process pool unavailable, parsing in threads: {e}")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+
+
+registry.register(
+    "parse_pool",
+    _create_parse_pool,
+    closer=lambda pool: pool.shutdown(wait=False, cancel_futures=True),
+)
+
+
+# ---- Worker functions (module-level so they can run in a process pool) ----
+
+def _load_file(path: str, extension: str) -> list[Document]:
+    """Load a whole file with its LangChain loader."""
+    from langchain_community import document_loaders
     
-    Args:
-        file: The uploaded file from FastAPI.
-        metadata: Optional metadata to attach to documents.
+    return getattr(document_loaders, LOADER_MAPPING[extension])(path).load()
+
+
+def _count_pdf_pages(path: str) -> int:
+    from pypdf import PdfReader
     
-    Returns:
-        List of Document objects.
+    return len(PdfReader(path).pages)
+
+
+def _load_pdf_pages(path: str, start: int, end: int) -> list[Document]:
+    """
+    Load pages [start, end) of a PDF exactly as PyPDFLoader would.
     
-    Raises:
-        ValueError: If file format is not supported.
+    PyPDFLoader only reads a PDF from its first page, so a later range takes
+    the document metadata from the loader's first page and reads its own
+    pages with pypdf; the loader's page text is pypdf's, stripped.
     """
-    filename = file.filename or "unknown"
-    extension = get_file_extension(filename)
+    from itertools import islice
     
-    if extension not in LOADER_MAPPING:
-        raise ValueError(f"Unsupported file format: {extension}")
+    from langchain_community.document_loaders import PyPDFLoader
+    from pypdf import PdfReader
     
-    # Save to temporary file
-    suffix = extension
-    with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
+    pages = PyPDFLoader(path).lazy_load()
+    if start == 0:
+        return list(islice(pages, end))
+    document_metadata = {k: v for k, v in next(pages).metadata.items() if k not in ("page", "page_label")}
+    pages.close()
     
+    reader = PdfReader(path)
+    return [
+        Document(
+            page_content=reader.pages[page].extract_text().strip(),
+            metadata={**document_metadata, "page": page, "page_label": reader.page_labels[page]},
+        )
+        for page in range(start, min(end, len(reader.pages)))
+    ]
+
+
+async def _iter_load_in_pool(path: str, extension: str) -> AsyncIterator[list[Document]]:
+    """
+    Load a file in the parse pool, part by part.
+    
+    Large PDFs are split into page ranges parsed in parallel, with only as
+    many ranges loaded ahead of the consumer as there are workers; parts are
+    yielded in page order. Other files are a single part.
+    """
+    loop = asyncio.get_running_loop()
+    pool = registry.get("parse_pool")
     try:
-        # Load using appropriate loader
-        loader_class = LOADER_MAPPING[extension]
-        loader = loader_class(tmp_path)
-        documents = loader.load()
-        
-        # Add metadata to each document
-        base_metadata = {
-            "filename": filename,
-            "source": filename,
-            **(metadata or {})
-        }
-        
-        for doc in documents:
-            doc.metadata.update(base_metadata)
-        
-        return documents
-        
-    finally:
-        # Clean up temporary file
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        if extension == ".pdf":
+            settings = init_settings()
+            pages_per_task = settings.PDF_PAGES_PER_TASK
+            page_count = await loop.run_in_executor(pool, _count_pdf_pages, path)
+            if page_count > pages_per_task:
+                lookahead = settings.PARSE_MAX_WORKERS or os.cpu_count() or 1
+                pending: deque[asyncio.Future] = deque()
+                try:
+                    for start in range(0, page_count, pages_per_task):
+                        pending.append(loop.run_in_executor(pool, _load_pdf_pages, path, start, start + pages_per_task))
+                        if len(pending) >= lookahead:
+                            yield await pending.popleft()
+                    while pending:
+                        yield await pending.popleft()
+                finally:
+                    for future in pending:
+                        future.cancel()
+                return
+        yield await loop.run_in_executor(pool, _load_file, path, extension)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool for later requests
+        registry.refresh("parse_pool")
+        raise
 
 
-async def parse_multiple_files(
-    files: list[UploadFile],
-    shared_metadata: Optional[dict] = None
-) -> tuple[list[Document], list[str]]:
+async def iter_file_documents(
+    path: str,
+    filename: str,
+    metadata: Optional[dict] = None
+) -> AsyncIterator[Document]:
     """
-    Parse multiple uploaded files.
+    Parse a file on local disk lazily into LangChain Documents.
+    
+    Pages of a large PDF are yielded as their range is parsed, so a consumer
+    that splits and embeds as it goes never holds the whole document.
     
     Args:
-        files: List of uploaded files.
-        shared_metadata: Metadata to apply to all documents.
+        path: Path of the file to load.
+        filename: Original filename (used for the loader and metadata).
+        metadata: Optional metadata to attach to documents.
+    
+    Yields:
+        Document objects, in page order.
     
-    Returns:
-        Tuple of (list of Documents, list of error messages).
+    Raises:
+        ValueError: If file format is not supported.
     """
-    all_documents: list[Document] = []
-    errors: list[str] = []
+    extension = get_file_extension(filename)
     
-    for file in files:
-        try:
-            docs = await parse_uploaded_file(file, shared_metadata)
-            all_documents.extend(docs)
-        except ValueError as e:
-            errors.append(f"{file.filename}: {str(e)}")
-        except Exception as e:
-            errors.append(f"{file.filename}: Failed to parse - {str(e)}")
+    if extension not in LOADER_MAPPING:
+        raise ValueError(f"Unsupported file format: {extension}")
+    
+    base_metadata = {
+        "filename": filename,
+        "source": filename,
+        **(metadata or {})
+    }
     
-    return all_documents, errors
+    # Time spent waiting on the loaders (not on the consumer)
+    parse_seconds = 0.0
+    parts = _iter_load_in_pool(path, extension)
+    async with aclosing(parts):
+        while True:
+            started = time.perf_counter()
+            part = await anext(parts, None)
+            parse_seconds += time.perf_counter() - started
+            if part is None:
+                break
+            for doc in part:
+                doc.metadata.update(base_metadata)
+                yield doc
+    observe("aml_ingest_parse_seconds", parse_seconds)
 
 
 def get_supported_extensions() -> list[str]:
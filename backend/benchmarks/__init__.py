@@ -0,0 +1 @@
+"""Offline latency and throughput benchmarks for the AML Policy FAQ Bot."""
@@ -0,0 +1,146 @@
+"""
+Import-time profile of the Lambda cold start.
+
+Imports `handler` (or another module) in fresh interpreters with
+`python -X importtime`, and reports the median init time, the packages
+that cost the most, and whether the heavy SDKs stayed deferred. The results
+can be written as JSON and compared with a baseline, like `benchmarks.run`.
+
+Usage (from backend/):
+    uv run python -m benchmarks.cold_start --runs 5 --output cold.json
+    uv run python -m benchmarks.cold_start --runs 5 --baseline cold.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+
+# Packages that should only be imported by the routes that need them
+DEFERRED_PACKAGES = (
+    "langchain_community",
+    "langgraph",
+    "langchain_nvidia_ai_endpoints",
+    "langchain_qdrant",
+    "qdrant_client",
+    "boto3",
+    "pypdf",
+)
+
+PROBE = (
+    "import time, sys\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(elapsed)\n"
+    "print(','.join(sorted(m for m in sys.modules if '.' not in m)))\n"
+)
+
+
+def profile_once(module: str) -> dict:
+    """Import `module` in a fresh interpreter and collect its import-time profile."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {k: v for k, v in os.environ.items() if k != "CONFIG_SECRET_NAME"}
+    env["PYTHONPATH"] = backend_dir
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        cwd=backend_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, loaded = completed.stdout.strip().splitlines()[-2:]
+
+    # stderr lines: "import time: <self us> | <cumulative us> | <indented name>"
+    package_seconds: dict[str, float] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        package = name.strip().split(".")[0]
+        package_seconds[package] = package_seconds.get(package, 0.0) + int(self_us) / 1e6
+
+    return {
+        "seconds": float(elapsed),
+        "packages": package_seconds,
+        "loaded": set(loaded.split(",")),
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print current vs baseline init time and the biggest per-package changes."""
+    print(f"\n{'metric':<42}{'baseline':>12}{'current':>12}{'change':>10}")
+    before, after = baseline["median_seconds"], results["median_seconds"]
+    change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+    print(f"{'median_seconds':<42}{before:>12.3f}{after:>12.3f}{change:>10}")
+    old_packages = baseline.get("packages", {})
+    names = set(old_packages) | set(results["packages"])
+    deltas = sorted(
+        names,
+        key=lambda n: abs(results["packages"].get(n, 0.0) - old_packages.get(n, 0.0)),
+        reverse=True,
+    )
+    for name in deltas[:10]:
+        print(f"{'  ' + name:<42}{old_packages.get(name, 0.0):>12.3f}{results['packages'].get(name, 0.0):>12.3f}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AML Policy FAQ Bot cold-start import profile")
+    parser.add_argument("--module", default="handler", help="Module to import (default: the Lambda handler)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to average over")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+    runs = [profile_once(args.module) for _ in range(max(1, args.runs))]
+
+    # Per-package cost of the median run (self times, so they add up to the total)
+    median_run = sorted(runs, key=lambda r: r["seconds"])[len(runs) // 2]
+    packages = dict(sorted(median_run["packages"].items(), key=lambda item: item[1], reverse=True))
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "module": args.module,
+        "runs": len(runs),
+        "median_seconds": statistics.median(r["seconds"] for r in runs),
+        "max_seconds": max(r["seconds"] for r in runs),
+        "packages": packages,
+        "eagerly_imported": [p for p in DEFERRED_PACKAGES if p in median_run["loaded"]],
+    }
+
+    print(f"import {args.module}: median {results['median_seconds']:.3f}s, max {results['max_seconds']:.3f}s "
+          f"over {results['runs']} run(s)")
+    print(f"\n{'package':<42}{'seconds':>12}")
+    for name, seconds in list(packages.items())[:args.top]:
+        print(f"{name:<42}{seconds:>12.3f}")
+    if results["eagerly_imported"]:
+        print(f"\nImported at startup (expected to be deferred): {', '.join(results['eagerly_imported'])}")
+    else:
+        print("\nAll heavy SDKs deferred to first use")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
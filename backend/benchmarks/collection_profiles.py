@@ -0,0 +1,221 @@
+"""
+Recall-vs-latency report for the Qdrant collection profiles.
+
+For each profile in `app.embeddings.profiles`, builds a scratch collection
+with the same points, runs the same queries with the profile's search
+parameters (and optionally a sweep of `hnsw_ef` values), and reports
+recall@k against exact search, p50/p95 search latency and the estimated RAM
+held by the vectors. Pick the cheapest profile whose recall is acceptable,
+then apply it with `python -m app.embeddings.migrate`.
+
+HNSW and quantization only exist in a Qdrant server, so this needs
+QDRANT_URL / QDRANT_API_KEY (a local `docker run qdrant/qdrant` works). The
+points come from the configured collection, or are synthetic clustered
+vectors with `--synthetic N`. Scratch collections are deleted afterwards.
+
+Usage (from backend/):
+    uv run python -m benchmarks.collection_profiles --points 20000 --queries 200 \\
+        --ef 32 64 128 --output profiles.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import OptimizersConfigDiff, PointStruct, SearchParams
+
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.embeddings.profiles import PROFILES, CollectionProfile, search_params
+from app.embeddings.vecstore import EMBEDDING_DIMENSION, create_collection
+
+
+# Bytes per dimension kept in RAM for HNSW search
+RAM_BYTES_PER_DIMENSION = {"none": 4.0, "scalar": 1.0, "binary": 1 / 8}
+
+
+def load_points(client: QdrantClient, collection_name: str, limit: int) -> np.ndarray:
+    """Dense vectors of up to `limit` points of an existing collection."""
+    vectors, offset = [], None
+    while len(vectors) < limit:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(256, limit - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=[""],
+        )
+        vectors.extend(p.vector.get("") if isinstance(p.vector, dict) else p.vector for p in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_points(count: int, dimension: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 200), dimension))
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.5 * rng.normal(size=(count, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Perturbed copies of stored vectors, standing in for question embeddings."""
+    rng = np.random.default_rng(seed + 1)
+    picked = vectors[rng.integers(len(vectors), size=count)]
+    noisy = picked + 0.1 * rng.normal(size=picked.shape)
+    return (noisy / np.linalg.norm(noisy, axis=1, keepdims=True)).astype(np.float32)
+
+
+def build_collection(client: QdrantClient, name: str, profile: CollectionProfile, vectors: np.ndarray) -> float:
+    """Create and fill a scratch collection; returns the seconds until it was fully indexed."""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    create_collection(client, name, profile)
+    # Index from the first point so small samples still exercise HNSW
+    client.update_collection(name, optimizers_config=OptimizersConfigDiff(indexing_threshold=1))
+    started = time.perf_counter()
+    for start in range(0, len(vectors), 256):
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(id=start + i, vector={"": v.tolist()})
+                for i, v in enumerate(vectors[start:start + 256])
+            ],
+        )
+    while client.get_collection(name).status.value != "green":
+        time.sleep(0.5)
+    return time.perf_counter() - started
+
+
+def run_queries(
+    client: QdrantClient,
+    name: str,
+    queries: np.ndarray,
+    k: int,
+    params: SearchParams,
+) -> tuple[list[list[int]], list[float]]:
+    """Result IDs and latency (ms) of every query."""
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        points = client.query_points(
+            collection_name=name, query=query.tolist(), using="", limit=k, search_params=params,
+        ).points
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([p.id for p in points])
+    return results, latencies
+
+
+def recall(results: list[list[int]], truth: list[list[int]]) -> float:
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / max(1, sum(len(t) for t in truth))
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print current vs baseline recall and p95 per profile / ef."""
+    print(f"\n{'profile / hnsw_ef':<28}{'recall':>18}{'p95 ms':>20}")
+    old = {(r["profile"], r["hnsw_ef"]): r for r in baseline.get("rows", [])}
+    for row in results["rows"]:
+        previous = old.get((row["profile"], row["hnsw_ef"]))
+        if previous is None:
+            continue
+        label = f"{row['profile']} / {row['hnsw_ef']}"
+        print(f"{label:<28}{previous['recall']:>8.3f} -> {row['recall']:<7.3f}"
+              f"{previous['p95_ms']:>9.2f} -> {row['p95_ms']:<8.2f}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recall vs latency of Qdrant collection profiles")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=[p for p in PROFILES if p != "exact"])
+    parser.add_argument("--points", type=int, default=10000, help="Points taken from the configured collection")
+    parser.add_argument("--synthetic", type=int, help="Use N synthetic vectors instead of the collection")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8, help="Results per query (RETRIEVAL_CANDIDATES)")
+    parser.add_argument("--ef", type=int, nargs="*", default=[], help="Extra hnsw_ef values to sweep")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--prefix", default="profile_bench", help="Scratch collection name prefix")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+    settings = init_settings()
+    client: QdrantClient = registry.get("qdrant_client")
+
+    if args.synthetic:
+        vectors = synthetic_points(args.synthetic, EMBEDDING_DIMENSION, args.seed)
+    else:
+        vectors = load_points(client, settings.QDRANT_COLLECTION_NAME, args.points)
+    if not len(vectors):
+        raise SystemExit("No vectors to benchmark; ingest documents or pass --synthetic N")
+    queries = make_queries(vectors, args.queries, args.seed)
+
+    rows = []
+    try:
+        # Ground truth: brute-force search over the unquantized vectors
+        truth_name = f"{args.prefix}_exact"
+        build_collection(client, truth_name, PROFILES["exact"], vectors)
+        truth, _ = run_queries(client, truth_name, queries, args.k, search_params(PROFILES["exact"]))
+
+        for name in args.profiles:
+            profile = PROFILES[name]
+            collection = f"{args.prefix}_{name}"
+            index_seconds = build_collection(client, collection, profile, vectors)
+            for ef in [profile.hnsw_ef] + [e for e in args.ef if e != profile.hnsw_ef]:
+                params = search_params(profile.model_copy(update={"hnsw_ef": ef}))
+                run_queries(client, collection, queries[:10], args.k, params)  # Warm up
+                results, latencies = run_queries(client, collection, queries, args.k, params)
+                latencies.sort()
+                rows.append({
+                    "profile": name,
+                    "hnsw_ef": ef,
+                    "recall": recall(results, truth),
+                    "p50_ms": statistics.median(latencies),
+                    "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+                    "index_seconds": index_seconds,
+                    "vector_ram_mb": len(vectors) * EMBEDDING_DIMENSION
+                    * RAM_BYTES_PER_DIMENSION[profile.quantization] / 2**20,
+                })
+    finally:
+        if not args.keep:
+            for name in ["exact", *args.profiles]:
+                client.delete_collection(f"{args.prefix}_{name}")
+        registry.close()
+
+    print(f"{'profile':<12}{'hnsw_ef':>9}{'recall@' + str(args.k):>11}{'p50 ms':>9}{'p95 ms':>9}{'vector RAM MB':>15}")
+    for row in rows:
+        print(f"{row['profile']:<12}{str(row['hnsw_ef']):>9}{row['recall']:>11.3f}"
+              f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['vector_ram_mb']:>15.1f}")
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "points": len(vectors),
+        "rows": rows,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Offline stand-ins for NVIDIA and Qdrant Cloud used by the benchmarks.
+
+The fakes are deterministic and have configurable latency, so runs are
+comparable across machines and need no credentials:
+
+- FakeChatNVIDIA: streams a fixed answer after a first-token delay, at a
+  fixed token rate.
+- FakeNVIDIAEmbeddings: hashed bag-of-words vectors after a per-call delay.
+- Qdrant runs in local in-memory mode (LockedLocalQdrant); LocalAsyncQdrant
+  gives the ingestion writer an async facade over that same client. With
+  VECTOR_BACKEND=local the app's embedded engine is used as is.
+"""
+
+import asyncio
+import functools
+import hashlib
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from qdrant_client import QdrantClient
+
+import app.agents.rag_agent  # noqa: F401 - registers the real factories overridden below
+from app.core.config import init_settings
+from app.core.resources import registry
+from app.embeddings.embedder import CachedEmbeddings
+from app.embeddings.vecstore import EMBEDDING_DIMENSION
+
+
+DEFAULT_ANSWER = (
+    "Enhanced due diligence is required for high-risk customers, including "
+    "source-of-funds verification and senior management approval."
+)
+
+
+class FakeChatNVIDIA(BaseChatModel):
+    """Chat model with ChatNVIDIA-like latency: a first-token delay, then a steady token rate."""
+
+    answer: str = DEFAULT_ANSWER
+    first_token_latency: float = 0.3  # seconds
+    tokens_per_second: float = 40.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-nvidia"
+
+    def _tokens(self) -> list[str]:
+        return re.findall(r"\S+\s*", self.answer)
+
+    def _total_latency(self) -> float:
+        return self.first_token_latency + len(self._tokens()) / self.tokens_per_second
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._total_latency())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._total_latency())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for token in self._tokens():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            time.sleep(1 / self.tokens_per_second)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._tokens():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            await asyncio.sleep(1 / self.tokens_per_second)
+
+
+class FakeNVIDIAEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words embeddings with a per-request delay."""
+
+    def __init__(self, latency: float = 0.05, dimension: int = EMBEDDING_DIMENSION):
+        self.latency = latency
+        self.dimension = dimension
+        self.requests = 0
+
+    def _vector(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.requests += 1
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def _aembed(self, texts: list[str], model_type: str) -> list[list[float]]:
+        # Same private hook as NVIDIAEmbeddings, used by CachedEmbeddings batching
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._aembed(texts, model_type="passage")
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self._aembed([text], model_type="query"))[0]
+
+
+class LockedLocalQdrant(QdrantClient):
+    """In-memory QdrantClient that can be shared across threads (local mode alone isn't thread-safe)."""
+
+    def __init__(self):
+        super().__init__(location=":memory:")
+        self._call_lock = threading.RLock()
+
+    def __getattribute__(self, name: str):
+        attr = super().__getattribute__(name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        lock = super().__getattribute__("_call_lock")
+
+        @functools.wraps(attr)
+        def locked(*args, **kwargs):
+            with lock:
+                return attr(*args, **kwargs)
+
+        return locked
+
+
+class LocalAsyncQdrant:
+    """Async facade over the shared in-memory client (in-memory stores aren't shared between clients)."""
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+    async def close(self) -> None:
+        pass
+
+
+def install_fakes(
+    llm_first_token_latency: float = 0.3,
+    llm_tokens_per_second: float = 40.0,
+    embed_latency: float = 0.05,
+) -> None:
+    """Point the shared resources at the offline stand-ins. Call before the app starts."""
+    settings = init_settings()
+    registry.refresh()
+    if settings.VECTOR_BACKEND != "local":
+        registry.register("qdrant_client", LockedLocalQdrant, closer=lambda c: c.close())
+        registry.register(
+            "async_qdrant_client",
+            lambda: LocalAsyncQdrant(registry.get("qdrant_client")),
+            depends_on=("qdrant_client",),
+        )
+    registry.register(
+        "embeddings",
+        lambda: CachedEmbeddings(
+            FakeNVIDIAEmbeddings(latency=embed_latency),
+            capacity=settings.EMBEDDING_CACHE_SIZE,
+            batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        ),
+    )
+    registry.register(
+        "llm",
+        lambda: FakeChatNVIDIA(
+            first_token_latency=llm_first_token_latency,
+            tokens_per_second=llm_tokens_per_second,
+        ),
+    )
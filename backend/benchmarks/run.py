@@ -0,0 +1,361 @@
+"""
+Latency and throughput benchmarks for the AML Policy FAQ Bot.
+
+Starts the real FastAPI app under uvicorn in this process, with NVIDIA and
+Qdrant Cloud replaced by the deterministic fakes in `benchmarks.fakes`, and
+drives `/api/v1/query`, `/api/v1/ws/query` and `/api/v1/ingest` at a given
+concurrency. Reports p50/p95/p99 latency, time-to-first-token, requests/sec
+and peak RSS, and writes the results as JSON for comparison with a baseline.
+
+Usage (from backend/):
+    uv run --extra dev python -m benchmarks.run --concurrency 8 --requests 200 \\
+        --output bench.json --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+
+SCENARIOS = ("query", "ws", "ingest")
+
+TOPICS = [
+    "enhanced due diligence", "politically exposed persons", "currency transaction reports",
+    "suspicious activity reports", "beneficial ownership", "sanctions screening",
+    "record keeping", "wire transfers", "customer risk rating", "correspondent banking",
+]
+SEGMENTS = ["high-risk", "retail", "corporate", "non-resident", "private banking", "trust"]
+
+
+# ============== Synthetic data ==============
+
+def make_policy_text(rng: random.Random, paragraphs: int) -> str:
+    """Generate a policy-like document."""
+    parts = []
+    for section in range(paragraphs):
+        topic = rng.choice(TOPICS)
+        segment = rng.choice(SEGMENTS)
+        parts.append(
+            f"Section {section + 1}. {topic.title()}.\n"
+            f"For {segment} customers the institution must apply {topic} controls, "
+            f"review the relationship every {rng.randint(1, 24)} months and escalate "
+            f"transactions above {rng.randint(1, 50) * 1000} USD to the compliance officer. "
+            f"Records relating to {topic} are retained for {rng.randint(5, 10)} years."
+        )
+    return "\n\n".join(parts)
+
+
+def make_question(i: int, distinct: bool) -> str:
+    topic = TOPICS[i % len(TOPICS)]
+    segment = SEGMENTS[(i // len(TOPICS)) % len(SEGMENTS)]
+    question = f"What are the {topic} requirements for {segment} customers?"
+    return f"{question} (case {i})" if distinct else question
+
+
+# ============== Measurement ==============
+
+def percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[dict], errors: int, wall_time: float) -> dict:
+    """Turn per-request samples (seconds) into a report (milliseconds)."""
+    def stats(key: str) -> dict:
+        values = [s[key] * 1000 for s in samples if s.get(key) is not None]
+        if not values:
+            return {}
+        return {
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "mean_ms": sum(values) / len(values),
+        }
+
+    report = {
+        "requests": len(samples) + errors,
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "requests_per_sec": len(samples) / wall_time if wall_time else 0.0,
+        "latency": stats("latency"),
+    }
+    if any("ttft" in s for s in samples):
+        report["time_to_first_token"] = stats("ttft")
+    if any("accept_latency" in s for s in samples):
+        report["accept_latency"] = stats("accept_latency")
+    return report
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_load(
+    requests: int,
+    concurrency: int,
+    one_request: Callable[[int], Awaitable[dict]],
+) -> dict:
+    """Run `requests` calls with at most `concurrency` in flight."""
+    samples: list[dict] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            try:
+                samples.append(await one_request(index))
+            except Exception as e:
+                errors += 1
+                print(f"  request {index} failed: {e}", file=sys.stderr)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+# ============== Scenarios ==============
+
+async def wait_for_job(client: httpx.AsyncClient, job: dict, poll_interval: float = 0.05) -> dict:
+    while job["status"] in ("queued", "running"):
+        await asyncio.sleep(poll_interval)
+        response = await client.get(f"/api/v1/ingest/{job['job_id']}")
+        response.raise_for_status()
+        job = response.json()
+    return job
+
+
+async def seed_corpus(client: httpx.AsyncClient, documents: int, paragraphs: int) -> None:
+    """Ingest a synthetic corpus through the real /ingest path."""
+    rng = random.Random(42)
+    files = [
+        ("files", (f"policy_{i}.txt", make_policy_text(rng, paragraphs).encode("utf-8"), "text/plain"))
+        for i in range(documents)
+    ]
+    response = await client.post("/api/v1/ingest", files=files, data={"policy_name": "Benchmark", "version": "1"})
+    response.raise_for_status()
+    job = await wait_for_job(client, response.json())
+    if job["status"] != "completed":
+        raise RuntimeError(f"Seeding failed: {job}")
+
+
+async def bench_query(client: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    async def one(i: int) -> dict:
+        start = time.perf_counter()
+        response = await client.post("/api/v1/query", json={"question": make_question(i, args.distinct_questions)})
+        response.raise_for_status()
+        return {"latency": time.perf_counter() - start}
+
+    return await run_load(args.requests, args.concurrency, one)
+
+
+async def bench_ws(base_url: str, args: argparse.Namespace) -> dict:
+    import websockets
+
+    ws_url = base_url.replace("http://", "ws://") + "/api/v1/ws/query"
+    connections: dict[int, object] = {}
+
+    async def one(i: int) -> dict:
+        # One connection per concurrent asker, reused like a chat session
+        key = id(asyncio.current_task())
+        if key not in connections:
+            connections[key] = await websockets.connect(ws_url)
+        ws = connections[key]
+
+        start = time.perf_counter()
+        # Offset so questions don't repeat the query scenario's (memoized) ones
+        await ws.send(json.dumps({"question": make_question(args.requests + i, args.distinct_questions)}))
+        ttft = None
+        while True:
+            chunk = json.loads(await ws.recv())
+            if chunk["type"] == "token" and ttft is None:
+                ttft = time.perf_counter() - start
+            elif chunk["type"] == "error":
+                raise RuntimeError(chunk["content"])
+            elif chunk["type"] == "done":
+                return {"latency": time.perf_counter() - start, "ttft": ttft}
+
+    try:
+        return await run_load(args.requests, args.concurrency, one)
+    finally:
+        for ws in connections.values():
+            await ws.close()
+
+
+async def bench_ingest(client: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    rng = random.Random(7)
+
+    async def one(i: int) -> dict:
+        text = make_policy_text(rng, args.ingest_paragraphs).encode("utf-8")
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/v1/ingest",
+            files=[("files", (f"upload_{i}.txt", text, "text/plain"))],
+            data={"policy_name": f"Upload {i}", "version": "1"},
+        )
+        response.raise_for_status()
+        accepted = time.perf_counter() - start
+        job = await wait_for_job(client, response.json())
+        if job["status"] != "completed":
+            raise RuntimeError(f"Ingestion failed: {job}")
+        return {"latency": time.perf_counter() - start, "accept_latency": accepted}
+
+    return await run_load(args.ingest_requests, args.concurrency, one)
+
+
+# ============== Server ==============
+
+def start_server(app) -> tuple[object, str]:
+    """Run the app under uvicorn in a background thread."""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Benchmark server did not start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+# ============== Reporting ==============
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print current vs baseline for the headline metrics."""
+    print(f"\n{'scenario / metric':<42}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        rows = [("requests_per_sec", current.get("requests_per_sec"), previous.get("requests_per_sec"))]
+        for group in ("latency", "time_to_first_token", "accept_latency"):
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                rows.append((
+                    f"{group}.{metric}",
+                    current.get(group, {}).get(metric),
+                    previous.get(group, {}).get(metric),
+                ))
+        for metric, now, before in rows:
+            if now is None or before is None:
+                continue
+            change = f"{(now - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{name + ' / ' + metric:<42}{before:>12.1f}{now:>12.1f}{change:>10}")
+    print(f"{'peak_rss_mb':<42}{baseline.get('peak_rss_mb', 0):>12.1f}{results['peak_rss_mb']:>12.1f}")
+
+
+async def run_benchmarks(args: argparse.Namespace, base_url: str) -> dict:
+    results: dict = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        print(f"Seeding {args.seed_documents} synthetic policy document(s)...")
+        await seed_corpus(client, args.seed_documents, args.seed_paragraphs)
+
+        for scenario in args.scenarios:
+            print(f"Running {scenario} (concurrency={args.concurrency})...")
+            if scenario == "query":
+                results[scenario] = await bench_query(client, args)
+            elif scenario == "ws":
+                results[scenario] = await bench_ws(base_url, args)
+            elif scenario == "ingest":
+                results[scenario] = await bench_ingest(client, args)
+    return results
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AML Policy FAQ Bot benchmarks (offline)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per query/ws scenario")
+    parser.add_argument("--ingest-requests", type=int, default=10)
+    parser.add_argument("--ingest-paragraphs", type=int, default=200, help="Paragraphs per uploaded document")
+    parser.add_argument("--seed-documents", type=int, default=20)
+    parser.add_argument("--seed-paragraphs", type=int, default=50)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0)
+    parser.add_argument("--distinct-questions", action=argparse.BooleanOptionalAction, default=True,
+                        help="Make every question unique so caches don't hide pipeline cost")
+    parser.add_argument("--with-cache", action="store_true", help="Leave the semantic answer cache enabled")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+
+    # Offline configuration - must be in place before settings are first read
+    os.environ["NVIDIA_API_KEY"] = "benchmark"
+    os.environ["S3_BUCKET"] = ""
+    os.environ["INGEST_STAGING_DIR"] = tempfile.mkdtemp(prefix="aml_bench_staging_")
+    os.environ["INGEST_ASYNC_INVOKE"] = "false"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "true" if args.with_cache else "false"
+
+    from benchmarks.fakes import install_fakes
+
+    install_fakes(
+        llm_first_token_latency=args.llm_first_token_ms / 1000,
+        llm_tokens_per_second=args.llm_tokens_per_sec,
+        embed_latency=args.embed_latency_ms / 1000,
+    )
+
+    from app.main import app
+
+    server, base_url = start_server(app)
+    try:
+        scenarios = asyncio.run(run_benchmarks(args, base_url))
+    finally:
+        server.should_exit = True
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "scenarios": scenarios,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(json.dumps(results["scenarios"], indent=2))
+    print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Accuracy of the chunker's token estimate against the real tokenizer.
+
+Splits a corpus with the ingestion chunker, then encodes every chunk - with
+the passage prefix and special tokens, as the embedding endpoint sees it -
+using the embedding model's WordPiece tokenizer, and reports how far
+`count_tokens` is from the real count: the share of underestimated chunks,
+the actual / estimated ratio, and the chunks that would not fit the model's
+EMBED_MAX_TOKENS. Exits with status 1 if any chunk overflows, so it can
+gate a change to `count_tokens` or MAX_CHUNK_TOKENS.
+
+The corpus is synthetic policy text plus citation-heavy sentences, or the
+given text files with `--input`. The tokenizer is fetched from the Hugging
+Face hub (nv-embedqa-e5-v5 is fine-tuned from e5-large-unsupervised and
+keeps its vocabulary), or read from a local tokenizer.json.
+
+Usage (from backend/):
+    uv run --with tokenizers python -m benchmarks.token_count --documents 200 \\
+        --output tokens.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from app.embeddings.chunking import EMBED_MAX_TOKENS, MAX_CHUNK_TOKENS, RESERVED_TOKENS, TokenChunker, count_tokens
+from benchmarks.run import make_policy_text
+
+
+PASSAGE_PREFIX = "passage: "
+
+# Text the synthetic policies lack: citations, amounts, codes and rare words
+HARD_SENTENCES = [
+    "Under 31 CFR 1010.230(b)(2) and FATF Recommendation 10, see s. 3.2.1(a)(iv).",
+    "Transfers of EUR 12,500.00 or more via SWIFT MT103/MT202COV require IBAN DE89370400440532013000.",
+    "Reference: AMLD5 (EU) 2018/843, art. 18a; BaFin-Rundschreiben 06/2019 (GW).",
+    "Beneficiaries such as Qiānjīn Hǎiyáng Màoyì Yǒuxiàn Gōngsī must be screened against OFAC SDN and HMT lists.",
+    "Escalate to compliance@bank.example.com or https://intranet.example.com/aml/sar-form?v=2.3.",
+    "Pseudonymisation, countersignatory, deconfliction and disintermediation are out of scope.",
+]
+
+
+# ============== Corpus ==============
+
+def synthetic_documents(count: int, seed: int) -> list[Document]:
+    """Policy-like pages with citation-heavy sentences mixed in."""
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        paragraphs = make_policy_text(rng, rng.randint(3, 12)).split("\n\n")
+        for _ in range(rng.randint(1, 4)):
+            paragraphs.insert(rng.randrange(len(paragraphs) + 1), " ".join(rng.sample(HARD_SENTENCES, 3)))
+        documents.append(Document(page_content="\n\n".join(paragraphs), metadata={"filename": f"synthetic_{i}.txt"}))
+    return documents
+
+
+def file_documents(paths: list[str]) -> list[Document]:
+    documents = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            documents.append(Document(page_content=f.read(), metadata={"filename": path}))
+    return documents
+
+
+def load_tokenizer(name: str, path: Optional[str]):
+    try:
+        from tokenizers import Tokenizer  # Deferred: only this benchmark needs it
+    except ImportError:
+        raise SystemExit("The tokenizers package is required: uv run --with tokenizers python -m benchmarks.token_count")
+    return Tokenizer.from_file(path) if path else Tokenizer.from_pretrained(name)
+
+
+# ============== Measurement ==============
+
+def measure(documents: list[Document], tokenizer, chunk_tokens: int) -> dict:
+    """Estimated vs actual tokens of every chunk."""
+    chunker = TokenChunker(chunk_tokens, 0)
+    ratios = []
+    underestimated = overflowing = 0
+    max_actual = 0
+    for document in documents:
+        for chunk in chunker.split(document):
+            estimate = count_tokens(chunk.page_content)
+            actual = len(tokenizer.encode(PASSAGE_PREFIX + chunk.page_content).ids)
+            # The estimate excludes what RESERVED_TOKENS covers
+            underestimated += actual - RESERVED_TOKENS > estimate
+            overflowing += actual > EMBED_MAX_TOKENS
+            max_actual = max(max_actual, actual)
+            ratios.append((actual - RESERVED_TOKENS) / max(estimate, 1))
+    ratios.sort()
+    return {
+        "chunk_tokens": chunk_tokens,
+        "chunks": len(ratios),
+        "underestimated": underestimated,
+        "overflowing": overflowing,
+        "max_actual_tokens": max_actual,
+        "ratio_p50": ratios[len(ratios) // 2] if ratios else None,
+        "ratio_p95": ratios[int(0.95 * (len(ratios) - 1))] if ratios else None,
+        "ratio_max": ratios[-1] if ratios else None,
+    }
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="count_tokens estimate vs the embedding model's tokenizer")
+    parser.add_argument("--tokenizer", default="intfloat/e5-large-unsupervised", help="Hugging Face hub tokenizer")
+    parser.add_argument("--tokenizer-file", help="Local tokenizer.json instead of the hub")
+    parser.add_argument("--input", nargs="+", help="Text files to chunk instead of the synthetic corpus")
+    parser.add_argument("--documents", type=int, default=200, help="Synthetic documents")
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[256, MAX_CHUNK_TOKENS])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+    tokenizer = load_tokenizer(args.tokenizer, args.tokenizer_file)
+    documents = file_documents(args.input) if args.input else synthetic_documents(args.documents, args.seed)
+
+    rows = [measure(documents, tokenizer, chunk_tokens) for chunk_tokens in args.chunk_tokens]
+
+    print(f"{'chunk tokens':>12}{'chunks':>8}{'under':>7}{'over ' + str(EMBED_MAX_TOKENS):>10}"
+          f"{'max actual':>12}{'p50':>7}{'p95':>7}{'max':>7}")
+    for row in rows:
+        print(f"{row['chunk_tokens']:>12}{row['chunks']:>8}{row['underestimated']:>7}{row['overflowing']:>10}"
+              f"{row['max_actual_tokens']:>12}{row['ratio_p50'] or 0:>7.2f}{row['ratio_p95'] or 0:>7.2f}"
+              f"{row['ratio_max'] or 0:>7.2f}")
+    print("Ratios are actual / estimated tokens; above 1.00 the estimate was low")
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "rows": rows,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if any(row["overflowing"] for row in rows):
+        sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
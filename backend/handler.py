@@ -1,35 +1,52 @@
 """
 AWS Lambda handler for the AML Policy FAQ Bot.
 
-Loads config from AWS Secrets Manager and initializes FastAPI with Mangum.
+Initializes FastAPI with Mangum; settings come from the AWS Secrets Manager
+secret named by CONFIG_SECRET_NAME (see app.core.secrets), fetched while the
+app is being imported. Asynchronous self-invocations carrying an
+`ingest_job_id` run a background ingestion job instead of an HTTP request.
 """
 
-import os
-import json
-import boto3
+import time
+
+_init_started = time.perf_counter()
+
+import asyncio
+
 from mangum import Mangum
 
+from app.core.secrets import prefetch_secret_config
+
+# Fetch the config secret in parallel with the app import below
+prefetch_secret_config()
+
+from app.main import app, preload
+from app.core import metrics
+from app.core.config import init_settings
+from app.core.resources import registry
 
-def load_config_from_secrets():
-    """Load config from AWS Secrets Manager and set as env vars."""
-    secret_name = os.environ.get("CONFIG_SECRET_NAME")
-    if not secret_name:
-        return  # Not on AWS, use local .env
-    
+# One event loop for the container's lifetime: Mangum runs requests on the
+# current loop, and ingestion jobs reuse it so shared async clients stay usable
+_loop = asyncio.new_event_loop()
+asyncio.set_event_loop(_loop)
+
+http_handler = Mangum(app, lifespan="off")
+
+if init_settings().STARTUP_MODE == "eager":
     try:
-        client = boto3.client('secretsmanager')
-        response = client.get_secret_value(SecretId=secret_name)
-        config = json.loads(response['SecretString'])
-        
-        for key, value in config.items():
-            os.environ[key] = str(value)
+        preload()
     except Exception as e:
-        print(f"Failed to load secrets: {e}")
+        print(f"Preload failed, resources will be created on first use: {e}")
 
+metrics.observe("aml_cold_start_seconds", time.perf_counter() - _init_started)
 
-# Load config before importing app
-load_config_from_secrets()
 
-from app.main import app
-
-handler = Mangum(app, lifespan="off")
+def handler(event, context):
+    """Route API Gateway events to FastAPI and ingestion events to the job worker."""
+    if isinstance(event, dict) and "ingest_job_id" in event:
+        from app.ingestion.jobs import run_job
+        
+        with registry.in_use():
+            job = _loop.run_until_complete(run_job(event["ingest_job_id"]))
+        return job.model_dump() if job is not None else None
+    return http_handler(event, context)
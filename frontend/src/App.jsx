@@ -2,6 +2,9 @@ import { useState, useEffect, useRef } from 'react';
 import './App.css';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+// Ingestion job polling: give up after 20 minutes (the server fails stuck jobs sooner)
+const INGEST_POLL_INTERVAL_MS = 2000;
+const INGEST_POLL_MAX_ATTEMPTS = 600;
 
 // Icons as components
 const SendIcon = () => (
@@ -121,8 +124,22 @@ function App() {
         throw new Error(error.detail || 'Upload failed');
       }
 
-      const data = await res.json();
-      showToast(`Successfully uploaded ${data.documents_processed} document(s)!`, 'success');
+      // Ingestion runs in the background; poll the job until it finishes
+      let job = await res.json();
+      for (let attempt = 0; job.status === 'queued' || job.status === 'running'; attempt++) {
+        if (attempt >= INGEST_POLL_MAX_ATTEMPTS) {
+          throw new Error('Upload is taking too long. Check back later to see whether it finished.');
+        }
+        await new Promise(resolve => setTimeout(resolve, INGEST_POLL_INTERVAL_MS));
+        const statusRes = await fetch(`${API_URL}/api/v1/ingest/${job.job_id}`);
+        if (!statusRes.ok) throw new Error('Failed to check upload status');
+        job = await statusRes.json();
+      }
+
+      if (job.status === 'failed') {
+        throw new Error(job.files.map(f => f.error).filter(Boolean).join('; ') || job.message);
+      }
+      showToast(`Successfully uploaded ${job.documents_processed} document(s)!`, 'success');
     } catch (error) {
       showToast(error.message || 'Failed to upload documents', 'error');
       console.error('Upload error:', error);
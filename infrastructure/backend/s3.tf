@@ -41,5 +41,9 @@ resource "aws_secretsmanager_secret_version" "app_config" {
     # Qdrant Cloud
     QDRANT_URL     = var.qdrant_url
     QDRANT_API_KEY = var.qdrant_api_key
+    # Text splitting, in embedding model tokens (CHUNK_SIZE / CHUNK_OVERLAP
+    # in characters are no longer read; the app refuses to start with them)
+    CHUNK_TOKENS         = var.chunk_tokens
+    CHUNK_OVERLAP_TOKENS = var.chunk_overlap_tokens
   })
 }
@@ -49,3 +49,14 @@ variable "qdrant_api_key" {
   sensitive = true
   default   = ""
 }
+
+# Text splitting (embedding model tokens per chunk, max 504)
+variable "chunk_tokens" {
+  type    = number
+  default = 256
+}
+
+variable "chunk_overlap_tokens" {
+  type    = number
+  default = 48
+}